@@ -0,0 +1,7 @@
+"""
+Health Check Common: modules shared by the exchange, waas2 and pigo health checks
+
+- query_cache: persistent step-aligned Prometheus query cache + run memo
+- prom_stream: streaming Prometheus response decoder
+- run_profile: per-stage timing spans, JSON run profile and textfile metrics
+"""
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Streaming Prometheus Response Decoder
+
+Decodes a Prometheus API response from a file-like object chunk by chunk.
+`data.result[*]` entries are parsed one at a time and the consumed text is
+dropped right away, so the raw body, the decoded string and the full object
+tree never exist at the same time. Range query samples are stored in
+compact `Samples` (two float64 arrays) instead of [[ts, "value"], ...] lists.
+
+Stdlib only; used by the exchange, waas2 and pigo Prometheus clients.
+"""
+
+import re
+import json
+import codecs
+from array import array
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+RESULT_PATTERN = re.compile(r'"result"\s*:\s*\[')
+STATUS_PATTERN = re.compile(r'"status"\s*:\s*"(\w+)"')
+RESULT_TYPE_PATTERN = re.compile(r'"resultType"\s*:\s*"(\w+)"')
+
+
+class Samples:
+    """Range query samples as parallel float64 arrays (epoch seconds, values)"""
+
+    __slots__ = ('timestamps', 'values')
+
+    def __init__(self, timestamps: Optional[array] = None, values: Optional[array] = None):
+        self.timestamps = timestamps if timestamps is not None else array('d')
+        self.values = values if values is not None else array('d')
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable) -> 'Samples':
+        """Build from [[ts, "value"], ...] / (ts, value) pairs"""
+        samples = cls()
+        for timestamp, value in pairs:
+            samples.timestamps.append(float(timestamp))
+            samples.values.append(float(value))
+        return samples
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __iter__(self) -> Iterator[Tuple[float, float]]:
+        return zip(self.timestamps, self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Samples(self.timestamps[index], self.values[index])
+        return self.timestamps[index], self.values[index]
+
+    def __repr__(self) -> str:
+        return f"Samples(points={len(self)})"
+
+    def extend(self, other: 'Samples'):
+        """Append another Samples (caller keeps timestamps ordered)"""
+        self.timestamps.extend(other.timestamps)
+        self.values.extend(other.values)
+
+    def between(self, start: float, end: float) -> 'Samples':
+        """Samples with start <= timestamp <= end"""
+        return Samples.from_pairs((t, v) for t, v in self if start <= t <= end)
+
+    def to_list(self) -> list:
+        """JSON-compatible [[ts, value], ...] form"""
+        return [[t, v] for t, v in self]
+
+
+def as_samples(values: Iterable) -> Samples:
+    """Return values as Samples, converting [[ts, "value"], ...] lists"""
+    return values if isinstance(values, Samples) else Samples.from_pairs(values)
+
+
+def compact_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace a matrix entry's 'values' list with Samples (other entries unchanged)"""
+    if 'values' in item:
+        item['values'] = as_samples(item['values'])
+    return item
+
+
+def json_default(obj: Any) -> Any:
+    """json.dumps default hook serializing Samples"""
+    if isinstance(obj, Samples):
+        return obj.to_list()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def decode_response(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Decode a Prometheus API response body incrementally
+
+    Args:
+        stream: File-like object with a read(size) method returning bytes
+        chunk_size: Bytes read per call
+
+    Returns:
+        {'status': ..., 'data': {'resultType': ..., 'result': [...]}} with
+        matrix 'values' compacted to Samples, or the parsed body as-is when it
+        has no data.result (errors)
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    json_decoder = json.JSONDecoder()
+
+    def read(size: int = chunk_size) -> Optional[str]:
+        chunk = stream.read(size)
+        if not chunk:
+            tail = decoder.decode(b'', final=True)
+            return tail or None
+        return decoder.decode(chunk)
+
+    # Header: everything up to the opening bracket of data.result
+    buffer = ''
+    match = None
+    while match is None:
+        chunk = read()
+        if chunk is None:
+            return json.loads(buffer) if buffer.strip() else {'status': 'error', 'error': 'empty response'}
+        buffer += chunk
+        match = RESULT_PATTERN.search(buffer)
+
+    header = buffer[:match.start()]
+    status = STATUS_PATTERN.search(header)
+    result_type = RESULT_TYPE_PATTERN.search(header)
+    buffer = buffer[match.end():]
+
+    result = []
+    pos = 0
+    exhausted = False
+    while True:
+        # Skip separators between entries
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or exhausted:
+                break
+            chunk = read()
+            if chunk is None:
+                exhausted = True
+            else:
+                buffer, pos = buffer[pos:] + chunk, 0
+
+        if pos >= len(buffer):
+            raise ValueError("Truncated Prometheus response")
+        if buffer[pos] == ']':
+            break
+
+        try:
+            entry, end = json_decoder.raw_decode(buffer, pos)
+            # A complete entry is always followed by ',' or ']'; a number cut at
+            # the chunk boundary ("1700000000.") would otherwise decode as a shorter value
+            if not exhausted and (end >= len(buffer) or buffer[end] not in ' \t\r\n,]'):
+                raise json.JSONDecodeError("Entry may continue in next chunk", buffer, end)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise ValueError("Truncated Prometheus response")
+            # Read at least as much as is already buffered so large entries are
+            # re-parsed O(log n) times rather than once per chunk
+            chunk = read(max(chunk_size, len(buffer) - pos))
+            if chunk is None:
+                exhausted = True
+            else:
+                buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        result.append(compact_item(entry) if isinstance(entry, dict) else entry)
+        # Release the consumed text
+        buffer, pos = buffer[end:], 0
+
+    # Drain the remainder (closing braces, warnings) so keep-alive connections stay usable
+    while read() is not None:
+        pass
+
+    return {
+        'status': status.group(1) if status else 'success',
+        'data': {
+            'resultType': result_type.group(1) if result_type else '',
+            'result': result,
+        },
+    }
@@ -0,0 +1,840 @@
+#!/usr/bin/env python3
+"""
+Persistent Prometheus Query Cache
+
+On-disk (SQLite) cache for Prometheus query results, shared by the exchange,
+waas2 and pigo Prometheus clients.
+
+- Range queries are aligned to step boundaries and split into fixed blocks
+  of `block_points` steps. Blocks that are complete and older than
+  `settle_seconds` are kept for `stable_ttl`; the newest (partial) block
+  expires after `fresh_ttl`, so a rerun only re-fetches the head of the window.
+- Instant queries without an explicit time are evaluated at `now` rounded
+  down to `instant_align` seconds so back-to-back runs share results.
+- Total size is capped at `max_bytes`; least recently used entries are evicted
+  (down to 90% of the cap). The stored size is kept as a running total and
+  only re-measured when a run starts or the cap is exceeded.
+- SQLite runs in WAL mode on local disks. WAL needs shared memory on one
+  host, so on a network filesystem (NFS / CIFS / FUSE mounts, e.g. a NAS
+  PVC) the rollback journal is used instead (QUERY_CACHE_JOURNAL).
+- `query_range_incremental` keeps the fetched samples per series (series
+  store) and on later runs only queries the part of the window that is not
+  stored yet, re-fetching the last `settle_seconds` that may still change.
+- Each helper has an async twin (`aquery`, `aquery_range`,
+  `aquery_range_incremental`) taking a coroutine fetch function; both share
+  the same planning code, which yields the ranges it needs fetched.
+- Every helper goes through a run-scoped memo (`RunMemo`): identical
+  requests within one run (same normalized PromQL, step and step-aligned
+  window) are answered once, and concurrent callers of a request that is
+  already in flight wait for it instead of sending their own. Independent of
+  QUERY_CACHE_MODE; `start_run()` clears it, `memo.report()` lists what it saved.
+
+Environment:
+    QUERY_CACHE_MODE   on (default) | off (bypass) | refresh (ignore reads, rewrite)
+    QUERY_MEMO         on (default) | off (disable run-scoped memo / coalescing)
+    QUERY_CACHE_PATH   SQLite file (default ~/.cache/prometheus-query-cache/cache.sqlite3)
+    QUERY_CACHE_MAX_MB Size cap in MB (default 256)
+    SERIES_STORE_RETENTION_DAYS  Samples kept by the series store (default 35)
+    QUERY_CACHE_JOURNAL auto (default: wal, delete on network mounts) | wal | delete
+
+CLI:
+    python3 -m health_check_common.query_cache stats
+    python3 -m health_check_common.query_cache clear [PROMQL_SUBSTRING]
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Generator, List, Optional
+
+from .prom_stream import Samples, as_samples, compact_item, json_default
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'prometheus-query-cache', 'cache.sqlite3')
+CACHE_MODES = ('on', 'off', 'refresh')
+JOURNAL_MODES = ('auto', 'wal', 'delete')
+# Filesystem types (/proc/mounts) on which WAL's shared-memory index is unsafe; fuse.* is also treated as remote
+NETWORK_FILESYSTEMS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ceph', 'glusterfs', 'lustre', 'afs', '9p')
+# Eviction frees space down to this fraction of max_bytes so the next writes do not evict again
+EVICT_TARGET = 0.9
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# Planning generator: yields fetch arguments, receives fetched results, returns the answer
+Plan = Generator[tuple, List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def parse_duration(value: Any) -> float:
+    """
+    Convert a Prometheus duration ('30s', '5m', '1h') or number to seconds
+
+    Args:
+        value: Duration string or number of seconds
+
+    Returns:
+        Seconds as float
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = str(value).strip()
+    unit = DURATION_UNITS.get(text[-1:])
+    if unit:
+        return float(text[:-1]) * unit
+    return float(text)
+
+
+def network_filesystem(path: str) -> Optional[str]:
+    """Filesystem type of the mount holding path if it is a network filesystem (Linux only), else None"""
+    try:
+        with open('/proc/mounts', encoding='utf-8') as f:
+            mounts = [line.split()[1:3] for line in f if len(line.split()) >= 3]
+    except OSError:
+        return None
+
+    path = os.path.realpath(path)
+    mount_point, fstype = '', ''
+    for point, kind in mounts:
+        point = point.replace('\\040', ' ')
+        inside = path == point or path.startswith(point.rstrip('/') + '/')
+        if inside and len(point) > len(mount_point):
+            mount_point, fstype = point, kind
+    if fstype in NETWORK_FILESYSTEMS or fstype.startswith('fuse.'):
+        return fstype
+    return None
+
+
+def normalize_query(promql: str) -> str:
+    """Collapse whitespace so formatting differences share a cache key"""
+    return ' '.join(promql.split())
+
+
+class RunMemo:
+    """
+    Run-scoped result memo with in-flight request coalescing
+
+    Keys are built by QueryCache (kind, source, normalized PromQL, step and
+    window aligned to the step grid). Results live until reset(); failures
+    are never stored, so a later caller retries. Callers get a copy of the
+    result list.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._results: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._pending: Dict[tuple, Future] = {}
+        self._apending: Dict[tuple, asyncio.Future] = {}
+        self._calls: Dict[tuple, Dict[str, Any]] = {}
+
+    def reset(self):
+        """Forget all results and counters (start of a new run)"""
+        with self._lock:
+            self._results.clear()
+            self._calls.clear()
+
+    def _enter(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Count a call and return its stored result, if any (lock held)"""
+        calls = self._calls.setdefault(key, {'kind': key[0], 'query': key[2], 'calls': 0, 'hits': 0, 'coalesced': 0})
+        calls['calls'] += 1
+        if key in self._results:
+            calls['hits'] += 1
+            return self._results[key]
+        return None
+
+    def call(self, key: tuple, fetch: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Return the memoized result for key, running fetch() at most once at a time"""
+        if not self.enabled:
+            return fetch()
+
+        with self._lock:
+            result = self._enter(key)
+            if result is not None:
+                return list(result)
+            future = self._pending.get(key)
+            leader = future is None
+            if leader:
+                future = self._pending[key] = Future()
+            else:
+                self._calls[key]['coalesced'] += 1
+
+        if not leader:
+            return list(future.result())
+
+        try:
+            result = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._results[key] = result
+            del self._pending[key]
+        future.set_result(result)
+        return list(result)
+
+    async def acall(
+        self,
+        key: tuple,
+        fetch: Callable[[], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """call() for coroutine fetch functions (coalesces tasks of the running loop)"""
+        if not self.enabled:
+            return await fetch()
+
+        with self._lock:
+            result = self._enter(key)
+            if result is not None:
+                return list(result)
+            future = self._apending.get(key)
+            leader = future is None
+            if leader:
+                future = self._apending[key] = asyncio.get_running_loop().create_future()
+                # Nobody may be waiting; mark a failure as retrieved
+                future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            else:
+                self._calls[key]['coalesced'] += 1
+
+        if not leader:
+            # A waiter timing out must not cancel the leader's request
+            return list(await asyncio.shield(future))
+
+        try:
+            result = await fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._apending[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._results[key] = result
+            del self._apending[key]
+        future.set_result(result)
+        return list(result)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Calls answered by the memo during this run
+
+        Returns:
+            Totals (requests, executed, memo_hits, coalesced) and 'queries':
+            every request served at least once from the memo, most saved first
+        """
+        with self._lock:
+            calls = [dict(entry) for entry in self._calls.values()]
+
+        hits = sum(entry['hits'] for entry in calls)
+        coalesced = sum(entry['coalesced'] for entry in calls)
+        requests = sum(entry['calls'] for entry in calls)
+        served = [entry for entry in calls if entry['hits'] or entry['coalesced']]
+        served.sort(key=lambda entry: entry['hits'] + entry['coalesced'], reverse=True)
+        return {'enabled': self.enabled, 'requests': requests, 'executed': requests - hits - coalesced,
+                'memo_hits': hits, 'coalesced': coalesced, 'queries': served}
+
+
+class QueryCache:
+    """Step-aligned, TTL + LRU bounded Prometheus result cache"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        mode: str = 'on',
+        max_bytes: int = 256 * 1024 * 1024,
+        block_points: int = 120,
+        settle_seconds: int = 300,
+        fresh_ttl: int = 300,
+        stable_ttl: int = 7 * 86400,
+        instant_align: int = 300,
+        retention_seconds: int = 35 * 86400,
+        memo: bool = True,
+        journal: str = 'auto'
+    ):
+        """
+        Initialize query cache
+
+        Args:
+            path: SQLite file path (created if missing)
+            mode: 'on', 'off' (no reads/writes) or 'refresh' (writes only)
+            max_bytes: Size cap for stored (compressed) results
+            block_points: Steps per cached range block
+            settle_seconds: Age after which a sample is assumed final (ingest lag)
+            fresh_ttl: TTL for blocks/instant results that may still change
+            stable_ttl: TTL for settled blocks
+            instant_align: Rounding of instant query evaluation time (0 disables instant caching)
+            retention_seconds: How far back the series store keeps samples
+            memo: Enable the run-scoped memo / in-flight coalescing (see RunMemo)
+            journal: SQLite journal: 'auto' (WAL, rollback journal on network
+                     filesystems), 'wal' or 'delete'
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Invalid cache mode '{mode}', expected one of {CACHE_MODES}")
+        if journal not in JOURNAL_MODES:
+            raise ValueError(f"Invalid journal mode '{journal}', expected one of {JOURNAL_MODES}")
+
+        self.path = path or DEFAULT_PATH
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.block_points = max(1, block_points)
+        self.settle_seconds = settle_seconds
+        self.fresh_ttl = fresh_ttl
+        self.stable_ttl = stable_ttl
+        self.instant_align = instant_align
+        self.retention_seconds = retention_seconds
+        self.journal = journal
+        self.hits = 0
+        self.misses = 0
+        self.memo = RunMemo(memo)
+        self._lock = threading.Lock()
+        self._conn = None
+        # Running total of stored bytes (entries + series); see _measure()
+        self._stored_bytes = 0
+
+        if self.mode != 'off':
+            self._conn = self._open()
+
+    @classmethod
+    def from_env(cls) -> 'QueryCache':
+        """Create cache configured from QUERY_CACHE_* environment variables"""
+        return cls(
+            path=os.getenv('QUERY_CACHE_PATH') or None,
+            mode=os.getenv('QUERY_CACHE_MODE', 'on').lower(),
+            max_bytes=int(float(os.getenv('QUERY_CACHE_MAX_MB', '256')) * 1024 * 1024),
+            retention_seconds=int(float(os.getenv('SERIES_STORE_RETENTION_DAYS', '35')) * 86400),
+            memo=os.getenv('QUERY_MEMO', 'on').lower() != 'off',
+            journal=os.getenv('QUERY_CACHE_JOURNAL', 'auto').lower(),
+        )
+
+    def _journal_mode(self) -> str:
+        """WAL unless configured otherwise or the cache directory is on a network filesystem"""
+        if self.journal != 'auto':
+            return self.journal.upper()
+        fstype = network_filesystem(os.path.dirname(os.path.abspath(self.path)))
+        if fstype:
+            logger.info(f"Query cache {self.path} is on a {fstype} mount, using the rollback journal")
+            return 'DELETE'
+        return 'WAL'
+
+    def _open(self) -> Optional[sqlite3.Connection]:
+        """Open (and create) the SQLite store; caching is disabled on failure"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute(f'PRAGMA journal_mode={self._journal_mode()}')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' key TEXT PRIMARY KEY,'
+                ' query TEXT NOT NULL,'
+                ' payload BLOB NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' expires REAL NOT NULL,'
+                ' accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS series ('
+                ' key TEXT PRIMARY KEY,'
+                ' query TEXT NOT NULL,'
+                ' payload BLOB NOT NULL,'
+                ' first_ts REAL NOT NULL,'
+                ' last_ts REAL NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' accessed REAL NOT NULL)'
+            )
+            self._measure(conn, time.time())
+            return conn
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Query cache disabled, cannot open {self.path}: {e}")
+            self.mode = 'off'
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None and self.mode != 'off'
+
+    def start_run(self):
+        """Begin a new run: results memoized by earlier runs are no longer served, stored size re-measured"""
+        self.memo.reset()
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._measure(self._conn, time.time())
+                except sqlite3.Error as e:
+                    logger.warning(f"Query cache maintenance failed: {e}")
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _key(*parts: Any) -> str:
+        return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached result for key, or None when missing/expired/bypassed"""
+        if not self.enabled or self.mode == 'refresh':
+            return None
+
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    'SELECT payload FROM entries WHERE key = ? AND expires > ?', (key, now)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            except sqlite3.Error as e:
+                logger.warning(f"Query cache read failed: {e}")
+                return None
+
+        self.hits += 1
+        return [compact_item(item) for item in json.loads(zlib.decompress(row[0]))]
+
+    def put(self, key: str, promql: str, result: List[Dict[str, Any]], ttl: float):
+        """Store a result and evict least recently used entries over the size cap"""
+        if not self.enabled or ttl <= 0:
+            return
+
+        payload = zlib.compress(json.dumps(result, separators=(',', ':'), default=json_default).encode())
+        now = time.time()
+        with self._lock:
+            try:
+                replaced = self._conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, query, payload, size, expires, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, promql, payload, len(payload), now + ttl, now)
+                )
+                self._stored_bytes += len(payload) - (replaced[0] if replaced else 0)
+                if self._stored_bytes > self.max_bytes:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                logger.warning(f"Query cache write failed: {e}")
+
+    def _measure(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries and re-read the stored size (lock held; other processes may share the file)"""
+        conn.execute('DELETE FROM entries WHERE expires <= ?', (now,))
+        self._stored_bytes = sum(
+            conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM {table}').fetchone()[0]
+            for table in ('entries', 'series')
+        )
+
+    def _evict(self, now: float):
+        """Over max_bytes: drop expired entries, then LRU entries/stored series down to EVICT_TARGET (lock held)"""
+        self._measure(self._conn, now)
+        if self._stored_bytes <= self.max_bytes:
+            return
+
+        target = self.max_bytes * EVICT_TARGET
+        candidates = self._conn.execute(
+            "SELECT 'entries', key, size, accessed FROM entries "
+            "UNION ALL SELECT 'series', key, size, accessed FROM series ORDER BY 4"
+        ).fetchall()
+        for table, key, size, _ in candidates:
+            self._conn.execute(f'DELETE FROM {table} WHERE key = ?', (key,))
+            self._stored_bytes -= size
+            if self._stored_bytes <= target:
+                break
+
+    def invalidate(self, query_substring: Optional[str] = None) -> int:
+        """
+        Remove cached entries
+
+        Args:
+            query_substring: Only drop entries whose PromQL contains this text (all when None)
+
+        Returns:
+            Number of entries removed
+        """
+        if self._conn is None:
+            return 0
+
+        removed = 0
+        with self._lock:
+            for table in ('entries', 'series'):
+                if query_substring:
+                    cursor = self._conn.execute(
+                        f'DELETE FROM {table} WHERE instr(query, ?) > 0', (normalize_query(query_substring),)
+                    )
+                else:
+                    cursor = self._conn.execute(f'DELETE FROM {table}')
+                removed += cursor.rowcount
+            self._measure(self._conn, time.time())
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, stored bytes and hit/miss counters of this process"""
+        entries, size, stored, stored_size = 0, 0, 0, 0
+        if self._conn is not None:
+            with self._lock:
+                entries, size = self._conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE expires > ?', (time.time(),)
+                ).fetchone()
+                stored, stored_size = self._conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM series'
+                ).fetchone()
+        return {'path': self.path, 'mode': self.mode, 'entries': entries, 'bytes': size,
+                'stored_queries': stored, 'stored_bytes': stored_size,
+                'hits': self.hits, 'misses': self.misses}
+
+    # ------------------------------------------------------------------
+    # Query helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _memo_key(kind: str, source: str, promql: str, *window: Any) -> tuple:
+        """
+        Run memo key: normalized PromQL plus the time parameters
+
+        window is (at,) for instant queries (None means "now" and is shared
+        within the run) or (start, end, step) for range queries, where start
+        and end are aligned down to the step so calls a few ms apart match.
+        """
+        if len(window) == 3:
+            start, end, step = window
+            step_seconds = parse_duration(step)
+            if step_seconds > 0:
+                start, end = start - start % step_seconds, end - end % step_seconds
+            window = (start, end, step_seconds)
+        return (kind, source, normalize_query(promql)) + tuple(window)
+
+    def query(
+        self,
+        source: str,
+        promql: str,
+        fetch: Callable[[float], List[Dict[str, Any]]],
+        at: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Cached instant query
+
+        Args:
+            source: Prometheus identity (base URL, namespace/context) for the key
+            promql: PromQL query
+            fetch: Callable(eval_time) performing the real query; must raise on failure
+            at: Evaluation time (epoch seconds); now rounded to instant_align when None
+
+        Returns:
+            Result list
+        """
+        return self.memo.call(
+            self._memo_key('query', source, promql, at),
+            lambda: _run_plan(self._plan_query(source, promql, at), fetch)
+        )
+
+    async def aquery(
+        self,
+        source: str,
+        promql: str,
+        fetch: Callable[[float], Awaitable[List[Dict[str, Any]]]],
+        at: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """query() with a coroutine fetch function"""
+        return await self.memo.acall(
+            self._memo_key('query', source, promql, at),
+            lambda: _arun_plan(self._plan_query(source, promql, at), fetch)
+        )
+
+    def _plan_query(self, source: str, promql: str, at: Optional[float]) -> Plan:
+        now = time.time()
+        if at is None:
+            if not self.enabled or self.instant_align <= 0:
+                return (yield (now,))
+            at = now - now % self.instant_align
+
+        if not self.enabled:
+            return (yield (at,))
+
+        promql = normalize_query(promql)
+        key = self._key('query', source, promql, at)
+        result = self.get(key)
+        if result is None:
+            result = yield (at,)
+            settled = at < now - self.settle_seconds
+            ttl = self.stable_ttl if settled else max(self.instant_align, self.fresh_ttl)
+            self.put(key, promql, result, ttl)
+        return result
+
+    def query_range(
+        self,
+        source: str,
+        promql: str,
+        start: float,
+        end: float,
+        step: Any,
+        fetch: Callable[[float, float], List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Cached range query, fetched block by block
+
+        Start/end are aligned down to multiples of step, so the returned
+        samples sit on the same grid every run.
+
+        Args:
+            source: Prometheus identity (base URL, namespace/context) for the key
+            promql: PromQL query
+            start: Window start (epoch seconds)
+            end: Window end (epoch seconds)
+            step: Step as seconds or duration string
+            fetch: Callable(block_start, block_end) performing the real query; must raise on failure
+
+        Returns:
+            Result list (matrix) covering [start, end]
+        """
+        return self.memo.call(
+            self._memo_key('query_range', source, promql, start, end, step),
+            lambda: _run_plan(self._plan_query_range(source, promql, start, end, step), fetch)
+        )
+
+    async def aquery_range(
+        self,
+        source: str,
+        promql: str,
+        start: float,
+        end: float,
+        step: Any,
+        fetch: Callable[[float, float], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """query_range() with a coroutine fetch function"""
+        return await self.memo.acall(
+            self._memo_key('query_range', source, promql, start, end, step),
+            lambda: _arun_plan(self._plan_query_range(source, promql, start, end, step), fetch)
+        )
+
+    def _plan_query_range(self, source: str, promql: str, start: float, end: float, step: Any) -> Plan:
+        step_seconds = parse_duration(step)
+        if not self.enabled or step_seconds <= 0:
+            return (yield (start, end))
+
+        promql = normalize_query(promql)
+        start = start - start % step_seconds
+        end = end - end % step_seconds
+        block = step_seconds * self.block_points
+        settled_before = time.time() - self.settle_seconds
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        block_start = start - start % block
+        while block_start <= end:
+            block_last = block_start + block - step_seconds
+            complete = block_last <= end
+            fetch_end = block_last if complete else end
+
+            key = self._key('query_range', source, promql, step_seconds, block_start, fetch_end)
+            result = self.get(key)
+            if result is None:
+                result = yield (block_start, fetch_end)
+                ttl = self.stable_ttl if complete and block_last < settled_before else self.fresh_ttl
+                self.put(key, promql, result, ttl)
+
+            for item in result:
+                values = as_samples(item.get('values', [])).between(start, end)
+                if not values:
+                    continue
+                labels = item.get('metric', {})
+                series = merged.setdefault(
+                    json.dumps(labels, sort_keys=True), {'metric': labels, 'values': Samples()}
+                )
+                series['values'].extend(values)
+
+            block_start += block
+
+        return list(merged.values())
+
+    def query_range_incremental(
+        self,
+        source: str,
+        promql: str,
+        start: float,
+        end: float,
+        step: Any,
+        fetch: Callable[[float, float], List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Range query answered from the series store plus a delta fetch
+
+        The stored samples for (source, query, step) are extended with
+        [last_ts - settle_seconds, end] (and [start, first_ts) when a longer
+        window than before is requested) and written back. Stored samples
+        older than the retention are dropped.
+
+        Args:
+            source: Prometheus identity (base URL, namespace/context) for the key
+            promql: PromQL query
+            start: Window start (epoch seconds)
+            end: Window end (epoch seconds)
+            step: Step as seconds or duration string
+            fetch: Callable(range_start, range_end) performing the real query; must raise on failure
+
+        Returns:
+            Result list (matrix) covering [start, end]
+        """
+        return self.memo.call(
+            self._memo_key('series', source, promql, start, end, step),
+            lambda: _run_plan(self._plan_query_range_incremental(source, promql, start, end, step), fetch)
+        )
+
+    async def aquery_range_incremental(
+        self,
+        source: str,
+        promql: str,
+        start: float,
+        end: float,
+        step: Any,
+        fetch: Callable[[float, float], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """query_range_incremental() with a coroutine fetch function"""
+        return await self.memo.acall(
+            self._memo_key('series', source, promql, start, end, step),
+            lambda: _arun_plan(self._plan_query_range_incremental(source, promql, start, end, step), fetch)
+        )
+
+    def _plan_query_range_incremental(self, source: str, promql: str, start: float, end: float, step: Any) -> Plan:
+        step_seconds = parse_duration(step)
+        if not self.enabled or step_seconds <= 0:
+            return (yield (start, end))
+
+        promql = normalize_query(promql)
+        start = start - start % step_seconds
+        end = end - end % step_seconds
+        key = self._key('series', source, promql, step_seconds)
+
+        stored = None if self.mode == 'refresh' else self._load_series(key)
+        if stored and (stored['last_ts'] < start - step_seconds or stored['first_ts'] > end):
+            stored = None  # Disjoint from the requested window, start over
+
+        ranges = [(start, end)]
+        if stored:
+            refetch_from = stored['last_ts'] - self.settle_seconds
+            refetch_from = max(start, refetch_from - refetch_from % step_seconds)
+            ranges = [(start, stored['first_ts'] - step_seconds)] if start < stored['first_ts'] else []
+            if refetch_from <= end:
+                ranges.append((refetch_from, end))
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        series = stored['series'] if stored else {}
+        for range_start, range_end in ranges:
+            for item in (yield (range_start, range_end)):
+                labels = item.get('metric', {})
+                entry = series.setdefault(json.dumps(labels, sort_keys=True), {'metric': labels, 'values': Samples()})
+                kept = [(t, v) for t, v in entry['values'] if not range_start <= t <= range_end]
+                entry['values'] = Samples.from_pairs(sorted(kept + list(as_samples(item.get('values', [])))))
+
+        # Retention covers at least the requested window
+        oldest = min(start, time.time() - self.retention_seconds)
+        result = []
+        for label_key in list(series):
+            entry = series[label_key]
+            entry['values'] = entry['values'].between(oldest, float('inf'))
+            if not entry['values']:
+                del series[label_key]
+                continue
+            values = entry['values'].between(start, end)
+            if values:
+                result.append({'metric': entry['metric'], 'values': values})
+
+        self._save_series(key, promql, series)
+        logger.debug(f"Series store fetched {len(ranges)} range(s) for {promql[:100]}")
+        return result
+
+    def _load_series(self, key: str) -> Optional[Dict[str, Any]]:
+        """Load stored series for key (None when missing)"""
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    'SELECT payload, first_ts, last_ts FROM series WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._conn.execute('UPDATE series SET accessed = ? WHERE key = ?', (time.time(), key))
+            except sqlite3.Error as e:
+                logger.warning(f"Series store read failed: {e}")
+                return None
+        series = {label_key: compact_item(entry) for label_key, entry in json.loads(zlib.decompress(row[0])).items()}
+        return {'series': series, 'first_ts': row[1], 'last_ts': row[2]}
+
+    def _save_series(self, key: str, promql: str, series: Dict[str, Dict[str, Any]]):
+        """Write stored series for key; empty series sets are removed"""
+        timestamps = [ts for entry in series.values() for ts in (entry['values'].timestamps[0], entry['values'].timestamps[-1])]
+        with self._lock:
+            try:
+                replaced = self._conn.execute('SELECT size FROM series WHERE key = ?', (key,)).fetchone()
+                replaced_size = replaced[0] if replaced else 0
+                if not timestamps:
+                    self._conn.execute('DELETE FROM series WHERE key = ?', (key,))
+                    self._stored_bytes -= replaced_size
+                    return
+                payload = zlib.compress(json.dumps(series, separators=(',', ':'), default=json_default).encode())
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO series (key, query, payload, first_ts, last_ts, size, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (key, promql, payload, min(timestamps), max(timestamps), len(payload), time.time())
+                )
+                self._stored_bytes += len(payload) - replaced_size
+                if self._stored_bytes > self.max_bytes:
+                    self._evict(time.time())
+            except sqlite3.Error as e:
+                logger.warning(f"Series store write failed: {e}")
+
+
+def _run_plan(plan: Plan, fetch: Callable[..., List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Drive a planning generator with a blocking fetch function"""
+    try:
+        request = next(plan)
+        while True:
+            request = plan.send(fetch(*request))
+    except StopIteration as done:
+        return done.value
+
+
+async def _arun_plan(plan: Plan, fetch: Callable[..., Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """Drive a planning generator with a coroutine fetch function"""
+    try:
+        request = next(plan)
+        while True:
+            request = plan.send(await fetch(*request))
+    except StopIteration as done:
+        return done.value
+
+
+def main():
+    """Small maintenance CLI: stats / clear"""
+    cache = QueryCache.from_env()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+
+    if command == 'stats':
+        print(json.dumps(cache.stats(), indent=2))
+    elif command == 'clear':
+        removed = cache.invalidate(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Removed {removed} cached entries")
+    else:
+        print(f"Usage: {sys.argv[0]} [stats | clear [PROMQL_SUBSTRING]]", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
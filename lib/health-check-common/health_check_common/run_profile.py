@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Run Profile: per-stage timing spans for the health check workflows
+
+Lightweight span / timer instrumentation shared by the exchange, waas2 and
+pigo health checks.
+
+- A run creates one `RunProfile` and activates it. Code wraps a stage in
+  `with span('prometheus.query', query=...)` or decorates a function with
+  `@timed('k8s.get_pods')` (sync or async). Without an active profile both
+  are no-ops, so library modules can be instrumented unconditionally.
+- Spans nest per thread / asyncio task (contextvars): every span records its
+  parent, start offset, duration, thread, attributes and whether it raised.
+  Pool threads start with an empty context, so their spans have no parent
+  unless the task is submitted via contextvars.copy_context().run (as
+  PrometheusClient.query_batch does).
+- Per-stage totals (calls, total / max seconds, errors) are exact and
+  include nested stages; concurrent calls each count their own wall time,
+  so a stage total can exceed the run duration. The span list itself is
+  capped at `max_spans` (fleet runs produce thousands).
+- `finish()` stamps the run, `write()` saves:
+    JSON run profile (RUN_PROFILE_PATH): run metadata, stage totals, spans
+    Prometheus text format (RUN_PROFILE_TEXTFILE): run and stage gauges for
+    node-exporter's textfile collector, written atomically (tmp + rename)
+
+Stage names are dotted: config.load, prometheus.query, prometheus.query_range,
+k8s.<call>, kubectl.<verb>, analysis.<step>, report.render, report.save,
+slack.send. Keep them low-cardinality; per-call detail (the PromQL, kubectl
+arguments) goes into span attributes, which only the JSON profile carries.
+
+Environment:
+    RUN_PROFILE           on (default) | off (record nothing)
+    RUN_PROFILE_PATH      JSON run profile file (unset: not written)
+    RUN_PROFILE_TEXTFILE  .prom file for the textfile collector (unset: not written),
+                          e.g. /var/lib/node_exporter/textfile/health_check_<workflow>.prom
+
+CLI:
+    python3 -m health_check_common.run_profile summary PROFILE_JSON
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'health_check'
+ATTRIBUTE_MAX_CHARS = 300
+
+# Span id of the innermost open span in this thread / task
+_current_span: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('run_profile_span', default=None)
+# Profile that span() / timed() record into
+_active: Optional['RunProfile'] = None
+
+
+class RunProfile:
+    """Timing spans and per-stage totals of one run"""
+
+    def __init__(
+        self,
+        workflow: str,
+        json_path: str = '',
+        textfile_path: str = '',
+        enabled: bool = True,
+        max_spans: int = 20000,
+        **labels: str
+    ):
+        """
+        Initialize run profile
+
+        Args:
+            workflow: Workflow name (exchange / waas2 / pigo), a label on every metric
+            json_path: JSON run profile file ('' = not written)
+            textfile_path: Prometheus text-format file ('' = not written)
+            enabled: False records nothing
+            max_spans: Spans kept for the JSON profile (stage totals stay exact)
+            **labels: Extra run labels (e.g., mode='fleet')
+        """
+        self.workflow = workflow
+        self.json_path = json_path
+        self.textfile_path = textfile_path
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self.labels = {'workflow': workflow, **labels}
+        self.started_at = time.time()
+        self.status: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.dropped_spans = 0
+        self._origin = time.perf_counter()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, workflow: str, **labels: str) -> 'RunProfile':
+        """Profile configured from RUN_PROFILE / RUN_PROFILE_PATH / RUN_PROFILE_TEXTFILE"""
+        return cls(
+            workflow,
+            json_path=os.getenv('RUN_PROFILE_PATH', ''),
+            textfile_path=os.getenv('RUN_PROFILE_TEXTFILE', ''),
+            enabled=os.getenv('RUN_PROFILE', 'on').lower() != 'off',
+            **labels
+        )
+
+    def activate(self) -> 'RunProfile':
+        """Make this the profile span() / timed() record into"""
+        global _active
+        _active = self
+        return self
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time the enclosed block as stage `name`
+
+        Yields the span's attribute dict, so the block can add results
+        (e.g., attrs['series'] = len(result)). An exception marks the span
+        as an error and propagates.
+        """
+        if not self.enabled:
+            yield {}
+            return
+
+        with self._lock:
+            span_id = self._next_id
+            self._next_id += 1
+        parent = _current_span.get()
+        token = _current_span.set(span_id)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self._add({
+                'id': span_id,
+                'parent': parent,
+                'name': name,
+                'start': round(start - self._origin, 6),
+                'duration': round(duration, 6),
+                'thread': threading.current_thread().name,
+                'attrs': {key: _attribute(value) for key, value in attrs.items()},
+                **({'error': error} if error else {}),
+            })
+
+    def _add(self, record: Dict[str, Any]):
+        with self._lock:
+            stage = self.stages.setdefault(
+                record['name'], {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'errors': 0}
+            )
+            stage['calls'] += 1
+            stage['total_seconds'] += record['duration']
+            stage['max_seconds'] = max(stage['max_seconds'], record['duration'])
+            stage['errors'] += int('error' in record)
+            if len(self.spans) < self.max_spans:
+                self.spans.append(record)
+            else:
+                self.dropped_spans += 1
+
+    def finish(self, status: str = 'success'):
+        """Stamp the run as finished ('success' / 'error')"""
+        self.status = status
+        self.duration = time.perf_counter() - self._origin
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON run profile"""
+        duration = self.duration if self.duration is not None else time.perf_counter() - self._origin
+        return {
+            'workflow': self.workflow,
+            'labels': self.labels,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'duration_seconds': round(duration, 6),
+            'status': self.status or 'running',
+            'stages': {
+                name: {**stage, 'total_seconds': round(stage['total_seconds'], 6), 'max_seconds': round(stage['max_seconds'], 6)}
+                for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['total_seconds'])
+            },
+            'spans': self.spans,
+            'dropped_spans': self.dropped_spans,
+        }
+
+    def prometheus_text(self) -> str:
+        """Run and per-stage gauges in Prometheus text exposition format"""
+        run_labels = _labels(self.labels)
+        duration = self.duration if self.duration is not None else time.perf_counter() - self._origin
+        lines = []
+
+        def metric(name: str, help_text: str, samples: List[tuple]):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            for labels, value in samples:
+                lines.append(f"{METRIC_PREFIX}_{name}{labels} {value:.15g}")
+
+        metric('run_duration_seconds', 'Wall time of the last run.', [(run_labels, duration)])
+        metric('run_timestamp_seconds', 'Unix time the last run started.', [(run_labels, self.started_at)])
+        metric('run_success', '1 if the last run completed, 0 if it failed.', [(run_labels, int(self.status == 'success'))])
+
+        stages = sorted(self.stages.items())
+        stage_labels = {name: _labels({**self.labels, 'stage': name}) for name, _ in stages}
+        metric('stage_duration_seconds', 'Time spent in a stage during the last run, summed over calls.',
+               [(stage_labels[name], stage['total_seconds']) for name, stage in stages])
+        metric('stage_max_seconds', 'Slowest single call of a stage during the last run.',
+               [(stage_labels[name], stage['max_seconds']) for name, stage in stages])
+        metric('stage_calls', 'Calls of a stage during the last run.',
+               [(stage_labels[name], stage['calls']) for name, stage in stages])
+        metric('stage_errors', 'Calls of a stage that raised during the last run.',
+               [(stage_labels[name], stage['errors']) for name, stage in stages])
+        return '\n'.join(lines) + '\n'
+
+    def summary_lines(self, limit: int = 12) -> List[str]:
+        """Slowest stages by total time, one line each"""
+        return [format_stage(name, stage) for name, stage in list(self.to_dict()['stages'].items())[:limit]]
+
+    def write(self) -> List[str]:
+        """
+        Write the JSON profile and textfile (whichever paths are set)
+
+        Failures are logged, never raised: profiling must not fail a run.
+
+        Returns:
+            Paths written
+        """
+        written = []
+        if not self.enabled:
+            return written
+        for path, render in ((self.json_path, lambda: json.dumps(self.to_dict(), indent=2, default=str)),
+                             (self.textfile_path, self.prometheus_text)):
+            if not path:
+                continue
+            try:
+                _write_atomic(path, render())
+                written.append(path)
+            except OSError as e:
+                logger.warning(f"Failed to write run profile {path}: {e}")
+        return written
+
+
+class _NullSpan:
+    """Context manager used when no profile is active"""
+
+    def __enter__(self) -> Dict[str, Any]:
+        return {}
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def current() -> Optional[RunProfile]:
+    """The active profile (None outside a run)"""
+    return _active
+
+
+def span(name: str, **attrs: Any):
+    """RunProfile.span() on the active profile; a no-op without one"""
+    if _active is None or not _active.enabled:
+        return _NULL_SPAN
+    return _active.span(name, **attrs)
+
+
+def timed(name: str) -> Callable:
+    """Decorator: time every call of a function (or coroutine function) as stage `name`"""
+    def decorate(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def format_stage(name: str, stage: Dict[str, Any]) -> str:
+    """One summary line for a stage"""
+    errors = f"  {stage['errors']} errors" if stage['errors'] else ''
+    return f"{name:<32} {stage['total_seconds']:>9.3f}s  {stage['calls']:>5} calls  max {stage['max_seconds']:.3f}s{errors}"
+
+
+def _attribute(value: Any) -> Any:
+    """JSON-safe, length-capped span attribute"""
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = ' '.join(str(value).split())
+    return text if len(text) <= ATTRIBUTE_MAX_CHARS else text[:ATTRIBUTE_MAX_CHARS] + '...'
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    """{k="v",...} with Prometheus label value escaping"""
+    escaped = (
+        f'{key}="' + str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+        for key, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _write_atomic(path: str, text: str):
+    """Write via a temporary file in the same directory and rename (no partial reads)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def main():
+    """CLI: summarize a JSON run profile"""
+    if len(sys.argv) != 3 or sys.argv[1] != 'summary':
+        print(__doc__.split('CLI:')[1].strip())
+        sys.exit(2)
+
+    with open(sys.argv[2], encoding='utf-8') as f:
+        profile = json.load(f)
+    print(f"{profile['workflow']} {profile['started_at']}  {profile['duration_seconds']:.3f}s  {profile['status']}")
+    for name, stage in profile['stages'].items():
+        print(f"  {format_stage(name, stage)}")
+    if profile.get('dropped_spans'):
+        print(f"  ({profile['dropped_spans']} spans not kept; stage totals include them)")
+
+
+if __name__ == '__main__':
+    main()
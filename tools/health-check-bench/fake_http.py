@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP plumbing for the fake Prometheus and fake Kubernetes API
+
+FakeServer is a ThreadingHTTPServer (keep-alive, one thread per connection)
+that injects latency and errors and counts what it served. Handlers
+implement route(path, params) and return (status, body).
+"""
+
+import json
+import time
+import random
+import threading
+from urllib.parse import parse_qsl, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+
+class FakeServer(ThreadingHTTPServer):
+    """HTTP server with latency / error injection and request counters"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, port: int, handler, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, seed: int = 0, host: str = '127.0.0.1'):
+        """
+        Args:
+            port: Listen port (0 picks a free one; see self.port)
+            handler: FakeHandler subclass
+            latency_ms: Added delay per request
+            jitter_ms: Uniform random extra delay (0 - jitter_ms)
+            error_rate: Fraction of requests answered with 503
+            seed: Random seed for jitter and error injection
+        """
+        super().__init__((host, port), handler)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.reset_stats()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.port}"
+
+    def reset_stats(self):
+        """Zero the request counters"""
+        with self.lock:
+            self.stats = {'requests': 0, 'errors_injected': 0, 'bytes_sent': 0, 'by_route': {}}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of the request counters"""
+        with self.lock:
+            return json.loads(json.dumps(self.stats))
+
+    def start(self) -> 'FakeServer':
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+
+    def _draw(self) -> Tuple[float, bool]:
+        with self.lock:
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+            fail = self.error_rate > 0 and self.random.random() < self.error_rate
+        return delay, fail
+
+    def _count(self, route: str, size: int, injected: bool):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes_sent'] += size
+            self.stats['errors_injected'] += int(injected)
+            self.stats['by_route'][route] = self.stats['by_route'].get(route, 0) + 1
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Request handler base: parses GET / POST parameters and writes JSON"""
+
+    protocol_version = 'HTTP/1.1'
+    server: FakeServer
+
+    # Body of injected errors
+    ERROR_BODY: Dict[str, Any] = {'status': 'error', 'error': 'injected failure'}
+
+    def route(self, path: str, params: Dict[str, str]) -> Tuple[int, Any, str]:
+        """Return (status code, JSON body, route name for the counters)"""
+        raise NotImplementedError
+
+    def do_GET(self):
+        self._handle({})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = dict(parse_qsl(self.rfile.read(length).decode())) if length else {}
+        self._handle(form)
+
+    def _handle(self, form: Dict[str, str]):
+        url = urlparse(self.path)
+        params = {**dict(parse_qsl(url.query, keep_blank_values=True)), **form}
+        delay, fail = self.server._draw()
+        if delay:
+            time.sleep(delay)
+
+        if fail:
+            status, body, route = 503, self.ERROR_BODY, 'injected_error'
+        else:
+            try:
+                status, body, route = self.route(url.path, params)
+            except Exception as e:  # a bug in the fake must not hang the client
+                status, body, route = 500, {'status': 'error', 'error': f"fake server: {e}"}, 'fake_error'
+
+        payload = json.dumps(body, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server._count(route, len(payload), fail)
+
+    def log_message(self, format, *args):
+        pass
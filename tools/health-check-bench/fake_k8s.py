@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Fake Kubernetes API server returning generated deployments, pods, events and HPAs
+
+Serves the read-only endpoints the health checks use, for any namespace,
+from an Inventory:
+
+    /apis/apps/v1/namespaces/{ns}/deployments[/{name}]
+    /api/v1/namespaces/{ns}/pods[/{name}]
+    /api/v1/namespaces/{ns}/events
+    /apis/autoscaling/v{1,2}/namespaces/{ns}/horizontalpodautoscalers[/{name}]
+
+Lists honour labelSelector (`k=v`, `k!=v`, `k in (a,b)`), fieldSelector
+(`reason=...`, `involvedObject.name=...`, `metadata.name=...`) and
+limit / continue paging like the real API server. Plain HTTP, no auth:
+point a kubeconfig `server:` (see run_bench.write_kubeconfig) or the
+kubectl shim (bin/kubectl, BENCH_K8S_URL) at it.
+
+Usage:
+    python3 fake_k8s.py --port 8001 --services 100 --pods-per-service 2
+"""
+
+import re
+import argparse
+from typing import Any, Callable, Dict, List
+
+from fake_http import FakeHandler, FakeServer
+from inventory import Inventory, service_names
+
+ROUTE = re.compile(
+    r'^/(?:api/v1|apis/apps/v1|apis/autoscaling/v[12])/namespaces/([^/]+)/'
+    r'(deployments|pods|events|horizontalpodautoscalers)(?:/([^/]+))?$'
+)
+SELECTOR_TERM = re.compile(r'\s*([\w./-]+)\s*(?:(!=|==|=)\s*([\w./-]*)|(in|notin)\s*\(([^)]*)\))\s*(?:,|$)')
+KINDS = {
+    'deployments': 'DeploymentList',
+    'pods': 'PodList',
+    'events': 'EventList',
+    'horizontalpodautoscalers': 'HorizontalPodAutoscalerList',
+}
+
+
+def parse_selector(selector: str) -> List[Callable[[Callable[[str], Any]], bool]]:
+    """
+    Label / field selector -> predicates over a key lookup function
+
+    Raises:
+        ValueError: Unparseable selector
+    """
+    predicates = []
+    position = 0
+    selector = selector.strip()
+    while position < len(selector):
+        match = SELECTOR_TERM.match(selector, position)
+        if not match:
+            raise ValueError(f"unable to parse selector: {selector}")
+        key, op, value, set_op, values = match.groups()
+        if set_op:
+            members = {v.strip() for v in values.split(',')}
+            predicates.append(lambda get, k=key, m=members, neg=(set_op == 'notin'): (get(k) in m) != neg)
+        else:
+            predicates.append(lambda get, k=key, v=value, neg=(op == '!='): (get(k) == v) != neg)
+        position = match.end()
+    return predicates
+
+
+def field(item: Dict[str, Any], path: str) -> Any:
+    """Dotted field lookup ('involvedObject.name')"""
+    value = item
+    for part in path.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+class K8sHandler(FakeHandler):
+    """Read-only Kubernetes REST subset"""
+
+    ERROR_BODY = {'kind': 'Status', 'apiVersion': 'v1', 'status': 'Failure', 'reason': 'ServiceUnavailable',
+                  'message': 'injected failure', 'code': 503}
+
+    def route(self, path: str, params: Dict[str, str]):
+        match = ROUTE.match(path)
+        if not match:
+            return 404, self.status(404, 'NotFound', path), 'not_found'
+
+        namespace, resource, name = match.groups()
+        inventory: Inventory = self.server.inventory
+        if name:
+            item = inventory.find(namespace, resource, name)
+            if item is None:
+                return 404, self.status(404, 'NotFound', f'{resource} "{name}" not found'), f"get_{resource}"
+            return 200, item, f"get_{resource}"
+
+        items = inventory.namespace_objects(namespace)[resource]
+        try:
+            labels = parse_selector(params.get('labelSelector', ''))
+            fields = parse_selector(params.get('fieldSelector', ''))
+        except ValueError as e:
+            return 400, self.status(400, 'BadRequest', str(e)), f"list_{resource}"
+        if labels or fields:
+            items = [
+                item for item in items
+                if all(p(lambda k: (item['metadata'].get('labels') or {}).get(k)) for p in labels)
+                and all(p(lambda k: field(item, k)) for p in fields)
+            ]
+
+        start = int(params.get('continue') or 0)
+        limit = int(params.get('limit') or 0) or len(items)
+        end = start + limit
+        metadata = {'resourceVersion': '1000'}
+        if end < len(items):
+            metadata['continue'] = str(end)
+        body = {'kind': KINDS[resource], 'apiVersion': 'v1', 'metadata': metadata, 'items': items[start:end]}
+        return 200, body, f"list_{resource}"
+
+    @staticmethod
+    def status(code: int, reason: str, message: str) -> Dict[str, Any]:
+        return {'kind': 'Status', 'apiVersion': 'v1', 'status': 'Failure', 'reason': reason, 'message': message, 'code': code}
+
+
+def start_k8s(inventory: Inventory, port: int = 0, **options) -> FakeServer:
+    """Start a fake Kubernetes API in a background thread (options: see FakeServer)"""
+    server = FakeServer(port, K8sHandler, **options)
+    server.inventory = inventory
+    return server.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--services', type=int, default=100, help='Deployments per namespace')
+    parser.add_argument('--pods-per-service', type=int, default=2)
+    parser.add_argument('--service', action='append', default=[], help='Real service name to include (repeatable)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    inventory = Inventory(service_names(args.services, args.service), args.pods_per_service)
+    server = start_k8s(inventory, args.port, latency_ms=args.latency_ms,
+                       jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    print(f"Fake Kubernetes API on {server.url} ({len(inventory.services)} deployments per namespace)")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
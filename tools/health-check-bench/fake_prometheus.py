@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Fake Prometheus HTTP API serving synthetic series
+
+Answers /api/v1/query and /api/v1/query_range (GET or POST) from an
+Inventory instead of a TSDB. PromQL is not evaluated; the fake looks at
+what the health checks actually send:
+
+- the metric name picks the value (working set / CPU rate / limits /
+  requests / restarts / replicas ...), window functions scale it
+  (max_over_time > quantile_over_time > avg), `offset` queries return the
+  slightly lower "earlier" value so growth checks see a trend
+- namespace / pod / container / resource matchers (=, !=, =~, !~) select the
+  series; recorded-series lookups (a selector on __name__ or a
+  pod_container: recording rule name) return nothing
+- an outer sum / avg / max / min / count, with or without `by (...)`, is
+  applied to the selected series
+- range queries return one point per step between start and end
+
+Cardinality is the inventory size (services x pods_per_service containers
+per namespace); latency and 503 errors are injected by FakeServer.
+
+Usage:
+    python3 fake_prometheus.py --port 9090 --services 100 --pods-per-service 2 --latency-ms 20
+"""
+
+import re
+import math
+import time
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from fake_http import FakeHandler, FakeServer
+from inventory import CPU_LIMIT, CPU_REQUEST, MEMORY_LIMIT, MEMORY_REQUEST, Inventory, fraction, service_names
+
+MATCHER = re.compile(r'(\w+)\s*(=~|!~|!=|=)\s*"((?:[^"\\]|\\.)*)"')
+AGGREGATION = re.compile(r'^\s*(sum|avg|max|min|count)\s*(?:by\s*\(([^)]*)\)\s*)?\(')
+TRAILING_BY = re.compile(r'\)\s*by\s*\(([^)]*)\)\s*$')
+DURATION = re.compile(r'(\d+(?:\.\d+)?)([smhdw]?)')
+UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+MAX_POINTS = 11000
+
+
+def unescape(value: str) -> str:
+    """PromQL double-quoted string -> raw value"""
+    return re.sub(r'\\(.)', r'\1', value)
+
+
+def parse_seconds(value: str) -> float:
+    """'300', '300s', '5m', '1.5h' -> seconds"""
+    match = DURATION.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"bad duration: {value}")
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+
+def parse_time(value: Optional[str], default: float) -> float:
+    """Unix timestamp or RFC 3339 time -> seconds since epoch"""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        from datetime import datetime
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def matches(labels: Dict[str, str], matchers: List[Tuple[str, str, str]]) -> bool:
+    """Whether a label set satisfies every matcher on a label it carries"""
+    for name, op, value in matchers:
+        if name not in labels:
+            continue
+        actual = labels[name]
+        if op == '=' and actual != value:
+            return False
+        if op == '!=' and actual == value:
+            return False
+        if op == '=~' and not re.fullmatch(value, actual):
+            return False
+        if op == '!~' and re.fullmatch(value, actual):
+            return False
+    return True
+
+
+class PromQLFake:
+    """Turns a query string into synthetic series for an Inventory"""
+
+    def __init__(self, inventory: Inventory):
+        self.inventory = inventory
+
+    def namespaces(self, matchers: List[Tuple[str, str, str]]) -> List[str]:
+        """Namespaces the query selects (literal alternations of =~ are expanded)"""
+        for name, op, value in matchers:
+            if name == 'namespace' and op == '=':
+                return [value]
+            if name == 'namespace' and op == '=~':
+                return [v for v in value.strip('()').split('|') if re.fullmatch(r'[\w.-]+', v)] or ['default']
+        return ['default']
+
+    def base_series(self, metric: str, namespace: str, matchers) -> List[Tuple[Dict[str, str], float]]:
+        """(labels, value) for every series of a metric selected by the matchers"""
+        inventory = self.inventory
+        resource = next((v for n, op, v in matchers if n == 'resource' and op == '='), 'memory')
+
+        if metric.startswith('kube_deployment_') or metric.startswith('kube_horizontalpodautoscaler_'):
+            label = 'deployment' if metric.startswith('kube_deployment_') else 'horizontalpodautoscaler'
+            value = {
+                'kube_deployment_status_replicas_unavailable': 0,
+                'kube_horizontalpodautoscaler_spec_max_replicas': inventory.pods_per_service * 5,
+            }.get(metric, inventory.pods_per_service)
+            series = [({'namespace': namespace, label: s}, float(value)) for s in inventory.services]
+            return [(labels, value) for labels, value in series if matches(labels, matchers)]
+
+        series = []
+        for container in inventory.containers():
+            labels = {'namespace': namespace, 'pod': container['pod'], 'container': container['container']}
+            if not matches(labels, matchers):
+                continue
+            pod = container['pod']
+            if metric == 'container_memory_working_set_bytes':
+                value = MEMORY_LIMIT * inventory.memory_fraction(pod)
+            elif metric == 'jvm_memory_used_bytes':
+                value = 0.6 * MEMORY_LIMIT * inventory.memory_fraction(pod)
+            elif metric == 'container_cpu_usage_seconds_total':
+                value = CPU_LIMIT * inventory.cpu_fraction(pod)
+            elif metric == 'kube_pod_container_resource_limits':
+                value = CPU_LIMIT if resource == 'cpu' else MEMORY_LIMIT
+                labels['resource'] = resource
+            elif metric == 'kube_pod_container_resource_requests':
+                value = CPU_REQUEST if resource == 'cpu' else MEMORY_REQUEST
+                labels['resource'] = resource
+            elif metric == 'kube_pod_container_status_restarts_total':
+                value = inventory.restarts(pod)
+            elif metric == 'kube_pod_container_status_terminated_reason':
+                continue
+            else:
+                value = 1.0
+            series.append((labels, float(value)))
+        return series
+
+    def evaluate(self, query: str) -> List[Tuple[Dict[str, str], float]]:
+        """Instant (labels, value) results of a query"""
+        matchers = [(name, op, unescape(value)) for name, op, value in MATCHER.findall(query)]
+        if any(name == '__name__' for name, _, _ in matchers) or 'pod_container:' in query:
+            return []
+
+        metric_match = re.search(r'\b((?:container|kube|jvm)_[a-z_]+)', query)
+        metric = metric_match.group(1) if metric_match else 'up'
+
+        scale = 1.0
+        if 'max_over_time' in query or re.search(r'\bmax\b', query):
+            scale = 1.10
+        elif 'quantile_over_time' in query:
+            scale = 1.05
+        if re.search(r'\boffset\b', query):
+            scale *= 0.97
+
+        series = []
+        for namespace in self.namespaces(matchers):
+            series += [(labels, value * scale) for labels, value in self.base_series(metric, namespace, matchers)]
+        return self.aggregate(query, series)
+
+    def aggregate(self, query: str, series):
+        """Apply the outermost aggregation operator, if any"""
+        match = AGGREGATION.match(query)
+        if not match:
+            return series
+        op, by = match.group(1), match.group(2)
+        if by is None:
+            trailing = TRAILING_BY.search(query)
+            by = trailing.group(1) if trailing else ''
+        keys = [k.strip() for k in by.split(',') if k.strip()]
+
+        groups: Dict[Tuple, List[float]] = {}
+        group_labels: Dict[Tuple, Dict[str, str]] = {}
+        for labels, value in series:
+            key = tuple(labels.get(k, '') for k in keys)
+            groups.setdefault(key, []).append(value)
+            group_labels[key] = {k: labels[k] for k in keys if k in labels}
+
+        reduce = {
+            'sum': sum,
+            'avg': lambda values: sum(values) / len(values),
+            'max': max,
+            'min': min,
+            'count': len,
+        }[op]
+        return [(group_labels[key], float(reduce(values))) for key, values in groups.items()]
+
+
+class PrometheusHandler(FakeHandler):
+    """Prometheus HTTP API subset used by the health checks"""
+
+    ERROR_BODY = {'status': 'error', 'errorType': 'unavailable', 'error': 'injected failure'}
+
+    def route(self, path: str, params: Dict[str, str]):
+        fake = self.server.promql
+        now = time.time()
+
+        if path == '/api/v1/query':
+            at = parse_time(params.get('time'), now)
+            result = [
+                {'metric': labels, 'value': [at, repr(value)]}
+                for labels, value in fake.evaluate(params.get('query', ''))
+            ]
+            return 200, {'status': 'success', 'data': {'resultType': 'vector', 'result': result}}, 'query'
+
+        if path == '/api/v1/query_range':
+            start = parse_time(params.get('start'), now - 3600)
+            end = parse_time(params.get('end'), now)
+            step = parse_seconds(params.get('step', '60'))
+            if (end - start) / step > MAX_POINTS:
+                return 400, {
+                    'status': 'error', 'errorType': 'bad_data',
+                    'error': 'exceeded maximum resolution of 11,000 points per timeseries',
+                }, 'query_range'
+
+            timestamps = [start + i * step for i in range(int((end - start) // step) + 1)]
+            span = max(end - start, 1)
+            result = []
+            for labels, value in fake.evaluate(params.get('query', '')):
+                phase = 2 * math.pi * fraction(*labels.values())
+                result.append({
+                    'metric': labels,
+                    'values': [
+                        [t, repr(value * (0.97 + 0.03 * (t - start) / span + 0.02 * math.sin(t / 3600 + phase)))]
+                        for t in timestamps
+                    ],
+                })
+            return 200, {'status': 'success', 'data': {'resultType': 'matrix', 'result': result}}, 'query_range'
+
+        if path in ('/api/v1/status/buildinfo', '/-/ready', '/-/healthy'):
+            return 200, {'status': 'success', 'data': {'version': 'fake'}}, 'status'
+
+        return 404, {'status': 'error', 'errorType': 'not_found', 'error': path}, 'not_found'
+
+
+def start_prometheus(inventory: Inventory, port: int = 0, **options) -> FakeServer:
+    """Start a fake Prometheus in a background thread (options: see FakeServer)"""
+    server = FakeServer(port, PrometheusHandler, **options)
+    server.promql = PromQLFake(inventory)
+    return server.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--services', type=int, default=100, help='Services per namespace')
+    parser.add_argument('--pods-per-service', type=int, default=2)
+    parser.add_argument('--service', action='append', default=[], help='Real service name to include (repeatable)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    inventory = Inventory(service_names(args.services, args.service), args.pods_per_service)
+    server = start_prometheus(inventory, args.port, latency_ms=args.latency_ms,
+                              jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    print(f"Fake Prometheus on {server.url} ({len(inventory.containers())} containers per namespace)")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Synthetic cluster inventory shared by the fake Prometheus and fake Kubernetes API
+
+An Inventory is a deterministic set of services (one Deployment, one HPA and
+`pods_per_service` pods each) that looks the same in every namespace that is
+asked for. Service names start with the real names a workflow checks
+(e.g., waas2 SERVICES) and are padded with svc-0001, svc-0002, ... up to the
+requested count, so the workflows find their own services plus realistic
+amounts of unrelated objects.
+
+Per-container values (memory / CPU usage as a fraction of the limit, restart
+counts, OOM events) derive from a hash of the pod name, so two runs at the
+same scale see identical data.
+"""
+
+import uuid
+import hashlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+MEMORY_LIMIT = 4 * 1024 ** 3
+MEMORY_REQUEST = 2 * 1024 ** 3
+CPU_LIMIT = 2.0
+CPU_REQUEST = 1.0
+CREATED = '2026-01-01T00:00:00Z'
+EVENT_TIME = '2026-10-18T00:00:00Z'
+
+
+def fraction(*parts: str) -> float:
+    """Stable pseudo-random number in [0, 1) for the given strings"""
+    digest = hashlib.blake2b('/'.join(parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def object_uid(namespace: str, resource: str, name: str) -> str:
+    """Stable metadata.uid of an object (the client models require one on owner references)"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{namespace}/{resource}/{name}"))
+
+
+def service_names(count: int, real: Iterable[str] = ()) -> List[str]:
+    """`count` service names: the real ones first, then svc-0001, svc-0002, ..."""
+    names = list(dict.fromkeys(real))[:count]
+    index = 1
+    while len(names) < count:
+        name = f"svc-{index:04d}"
+        if name not in names:
+            names.append(name)
+        index += 1
+    return names
+
+
+class Inventory:
+    """Services, pods and events of one synthetic namespace layout"""
+
+    def __init__(self, services: List[str], pods_per_service: int = 2, oom_every: int = 10):
+        """
+        Args:
+            services: Service names (Deployment / HPA / container / app label)
+            pods_per_service: Pods per Deployment
+            oom_every: Every n-th service gets OOMKilling / BackOff events (0 disables)
+        """
+        self.services = services
+        self.pods_per_service = pods_per_service
+        self.oom_every = oom_every
+
+    @lru_cache(maxsize=None)
+    def pod_names(self, service: str) -> List[str]:
+        """Pod names of a service (<service>-<template hash>-<suffix>)"""
+        template_hash = hashlib.md5(service.encode()).hexdigest()[:10]
+        return [
+            f"{service}-{template_hash}-{hashlib.md5(f'{service}{i}'.encode()).hexdigest()[:5]}"
+            for i in range(self.pods_per_service)
+        ]
+
+    @lru_cache(maxsize=1)
+    def containers(self) -> List[Dict[str, str]]:
+        """Every (pod, container) pair, the label sets Prometheus series carry"""
+        return [
+            {'pod': pod, 'container': service, 'app': service}
+            for service in self.services
+            for pod in self.pod_names(service)
+        ]
+
+    def memory_fraction(self, pod: str) -> float:
+        """Working set as a fraction of the memory limit (0.30 - 0.95)"""
+        return 0.30 + 0.65 * fraction(pod, 'memory')
+
+    def cpu_fraction(self, pod: str) -> float:
+        """CPU usage as a fraction of the CPU limit (0.05 - 0.60)"""
+        return 0.05 + 0.55 * fraction(pod, 'cpu')
+
+    def restarts(self, pod: str) -> int:
+        """Container restart count (mostly 0)"""
+        return int(fraction(pod, 'restarts') * 20) // 17
+
+    def has_incidents(self, service: str) -> bool:
+        """Whether a service gets OOMKilling / BackOff events"""
+        return bool(self.oom_every) and self.services.index(service) % self.oom_every == 0
+
+    # Kubernetes objects (raw JSON, as the API server returns them)
+
+    def deployment(self, namespace: str, service: str) -> Dict[str, Any]:
+        """Deployment object"""
+        replicas = self.pods_per_service
+        return {
+            'apiVersion': 'apps/v1',
+            'kind': 'Deployment',
+            'metadata': {
+                'name': service,
+                'namespace': namespace,
+                'uid': object_uid(namespace, 'deployments', service),
+                'labels': {'app': service},
+                'creationTimestamp': CREATED,
+                'generation': 3,
+            },
+            'spec': {
+                'replicas': replicas,
+                'selector': {'matchLabels': {'app': service}},
+                'template': {
+                    'metadata': {'labels': {'app': service}},
+                    'spec': {'containers': [self._container_spec(service)]},
+                },
+            },
+            'status': {
+                'replicas': replicas,
+                'updatedReplicas': replicas,
+                'readyReplicas': replicas,
+                'availableReplicas': replicas,
+                'observedGeneration': 3,
+                'conditions': [
+                    {'type': 'Available', 'status': 'True', 'reason': 'MinimumReplicasAvailable'},
+                    {'type': 'Progressing', 'status': 'True', 'reason': 'NewReplicaSetAvailable'},
+                ],
+            },
+        }
+
+    def pod(self, namespace: str, service: str, name: str) -> Dict[str, Any]:
+        """Pod object"""
+        template_hash = name.split('-')[-2]
+        replica_set = f"{service}-{template_hash}"
+        return {
+            'apiVersion': 'v1',
+            'kind': 'Pod',
+            'metadata': {
+                'name': name,
+                'namespace': namespace,
+                'uid': object_uid(namespace, 'pods', name),
+                'labels': {'app': service, 'pod-template-hash': template_hash},
+                'creationTimestamp': CREATED,
+                'ownerReferences': [{
+                    'apiVersion': 'apps/v1', 'kind': 'ReplicaSet',
+                    'name': replica_set, 'uid': object_uid(namespace, 'replicasets', replica_set),
+                    'controller': True,
+                }],
+            },
+            'spec': {
+                'nodeName': f"node-{int(fraction(name, 'node') * 16):02d}",
+                'containers': [self._container_spec(service)],
+            },
+            'status': {
+                'phase': 'Running',
+                'podIP': f"10.0.{int(fraction(name, 'ip') * 250)}.{int(fraction(name, 'host') * 250) + 2}",
+                'startTime': CREATED,
+                'conditions': [
+                    {'type': 'Ready', 'status': 'True', 'lastTransitionTime': CREATED},
+                    {'type': 'ContainersReady', 'status': 'True', 'lastTransitionTime': CREATED},
+                ],
+                'containerStatuses': [{
+                    'name': service,
+                    'ready': True,
+                    'started': True,
+                    'restartCount': self.restarts(name),
+                    'image': f"registry.local/{service}:1.0.0",
+                    'imageID': f"registry.local/{service}@sha256:{hashlib.sha256(service.encode()).hexdigest()}",
+                    'state': {'running': {'startedAt': CREATED}},
+                }],
+            },
+        }
+
+    def hpa(self, namespace: str, service: str) -> Dict[str, Any]:
+        """HorizontalPodAutoscaler (autoscaling/v2) object"""
+        replicas = self.pods_per_service
+        return {
+            'apiVersion': 'autoscaling/v2',
+            'kind': 'HorizontalPodAutoscaler',
+            'metadata': {
+                'name': service,
+                'namespace': namespace,
+                'uid': object_uid(namespace, 'horizontalpodautoscalers', service),
+                'creationTimestamp': CREATED,
+            },
+            'spec': {
+                'scaleTargetRef': {'apiVersion': 'apps/v1', 'kind': 'Deployment', 'name': service},
+                'minReplicas': replicas,
+                'maxReplicas': replicas * 5,
+                'metrics': [
+                    {'type': 'Resource', 'resource': {'name': 'cpu', 'target': {'type': 'Utilization', 'averageUtilization': 70}}},
+                    {'type': 'Resource', 'resource': {'name': 'memory', 'target': {'type': 'Utilization', 'averageUtilization': 80}}},
+                ],
+            },
+            'status': {
+                'currentReplicas': replicas,
+                'desiredReplicas': replicas,
+                'currentMetrics': [{
+                    'type': 'Resource',
+                    'resource': {'name': 'cpu', 'current': {'averageUtilization': 40, 'averageValue': '400m'}},
+                }],
+            },
+        }
+
+    def events(self, namespace: str, service: str) -> List[Dict[str, Any]]:
+        """Events of a service's pods: Normal lifecycle events, plus OOM / BackOff on incident services"""
+        reasons = [('Normal', 'Scheduled', 'Successfully assigned pod'), ('Normal', 'Pulled', 'Container image already present')]
+        if self.has_incidents(service):
+            reasons += [
+                ('Warning', 'OOMKilling', 'Memory cgroup out of memory: Killed process (java)'),
+                ('Warning', 'BackOff', 'Back-off restarting failed container'),
+            ]
+
+        events = []
+        for pod in self.pod_names(service):
+            for event_type, reason, message in reasons:
+                events.append({
+                    'apiVersion': 'v1',
+                    'kind': 'Event',
+                    'metadata': {
+                        'name': f"{pod}.{reason.lower()}",
+                        'namespace': namespace,
+                        'uid': object_uid(namespace, 'events', f"{pod}.{reason.lower()}"),
+                    },
+                    'type': event_type,
+                    'reason': reason,
+                    'message': message,
+                    'count': 1,
+                    'firstTimestamp': EVENT_TIME,
+                    'lastTimestamp': EVENT_TIME,
+                    'source': {'component': 'kubelet'},
+                    'involvedObject': {
+                        'kind': 'Pod', 'name': pod, 'namespace': namespace, 'uid': object_uid(namespace, 'pods', pod),
+                    },
+                })
+        return events
+
+    @lru_cache(maxsize=32)
+    def namespace_objects(self, namespace: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Every object of a namespace by resource type (built once per namespace)"""
+        return {
+            'deployments': [self.deployment(namespace, s) for s in self.services],
+            'pods': [self.pod(namespace, s, p) for s in self.services for p in self.pod_names(s)],
+            'events': [e for s in self.services for e in self.events(namespace, s)],
+            'horizontalpodautoscalers': [self.hpa(namespace, s) for s in self.services],
+        }
+
+    def find(self, namespace: str, resource: str, name: str) -> Optional[Dict[str, Any]]:
+        """One object by name (None if absent)"""
+        for item in self.namespace_objects(namespace).get(resource, []):
+            if item['metadata']['name'] == name:
+                return item
+        return None
+
+    def _container_spec(self, service: str) -> Dict[str, Any]:
+        return {
+            'name': service,
+            'image': f"registry.local/{service}:1.0.0",
+            'resources': {
+                'requests': {'cpu': f"{int(CPU_REQUEST * 1000)}m", 'memory': f"{MEMORY_REQUEST // 1024 ** 2}Mi"},
+                'limits': {'cpu': f"{int(CPU_LIMIT * 1000)}m", 'memory': f"{MEMORY_LIMIT // 1024 ** 2}Mi"},
+            },
+        }
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark of the three health-check workflows
+
+For each workflow and scale, starts a fake Prometheus and a fake Kubernetes
+API (in this process) over the same synthetic inventory, puts the kubectl
+shim first on PATH and runs the real script as a subprocess:
+
+    exchange  healthcheck.py --fleet <generated fleet.yaml>   (every service is a target;
+              kubernetes client via a generated kubeconfig, K8S_IN_CLUSTER=false)
+    waas2     health-check-v2.py                               (its 11 SERVICES; the rest of the
+              namespace is unrelated objects the snapshot lists still parse)
+    pigo      memory_inspection.py                             (discovers every deployment;
+              Prometheus through the port-forward shim)
+
+Scale = services (Deployments / HPAs) per namespace, each with
+--pods-per-service pods. Reported per (workflow, scale): median and min wall
+time of the whole process (interpreter start to exit), peak RSS of the
+workflow process (kubectl shim children excluded), and the Prometheus /
+Kubernetes requests and bytes it caused.
+Query caches are disabled (QUERY_CACHE_MODE=off) so every run is cold.
+
+Usage:
+    python3 run_bench.py                                    # all workflows at 10 / 100 / 1000
+    python3 run_bench.py -w pigo --scales 100 --runs 5 --latency-ms 20
+    python3 run_bench.py --error-rate 0.05 --json bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+from inventory import Inventory, service_names
+from fake_k8s import start_k8s
+from fake_prometheus import start_prometheus
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent.parent
+WORKFLOWS_DIR = REPO_ROOT / 'workflows'
+EXCHANGE_DIR = WORKFLOWS_DIR / 'WF-20251224-exchange-health-monitoring' / 'scripts'
+WAAS2_DIR = WORKFLOWS_DIR / 'WF-20251225-waas2-health-monitor' / 'scripts'
+PIGO_DIR = WORKFLOWS_DIR / 'WF-20251226-pigo-memory-inspection' / 'script'
+# Shared health_check_common package, importable without installing it
+COMMON_DIR = REPO_ROOT / 'lib' / 'health-check-common'
+
+WAAS2_SERVICES = [
+    'service-admin', 'service-api', 'service-eth', 'service-exchange', 'service-gateway', 'service-notice',
+    'service-pol', 'service-search', 'service-setting', 'service-tron', 'service-user',
+]
+
+
+def write_kubeconfig(path: Path, server_url: str) -> Path:
+    """kubeconfig pointing the kubernetes client at the fake API"""
+    path.write_text(yaml.safe_dump({
+        'apiVersion': 'v1',
+        'kind': 'Config',
+        'clusters': [{'name': 'bench', 'cluster': {'server': server_url}}],
+        'users': [{'name': 'bench', 'user': {'token': 'bench'}}],
+        'contexts': [{'name': 'bench', 'context': {'cluster': 'bench', 'user': 'bench'}}],
+        'current-context': 'bench',
+    }))
+    return path
+
+
+def exchange_setup(work: Path, services: List[str], k8s_url: str, prom_url: str) -> Dict[str, Any]:
+    fleet = work / 'fleet.yaml'
+    fleet.write_text(yaml.safe_dump({'targets': [{'service_name': s, 'namespace': 'forex-prod'} for s in services]}))
+    return {
+        'cwd': EXCHANGE_DIR,
+        'argv': [sys.executable, 'healthcheck.py', '--fleet', str(fleet)],
+        'env': {
+            'PROMETHEUS_URL': prom_url,
+            'K8S_IN_CLUSTER': 'false',
+            'KUBECONFIG': str(write_kubeconfig(work / 'kubeconfig', k8s_url)),
+            'SERVICE_NAMESPACE': 'forex-prod',
+            'SERVICE_NAME': 'exchange-service',
+            'DEPLOYMENT_NAME': 'exchange-service',
+            'HPA_NAME': 'exchange-service',
+            'CONTAINER_NAME': 'exchange-service',
+        },
+    }
+
+
+def waas2_setup(work: Path, services: List[str], k8s_url: str, prom_url: str) -> Dict[str, Any]:
+    return {
+        'cwd': WAAS2_DIR,
+        'argv': [sys.executable, 'health-check-v2.py'],
+        'env': {'PROMETHEUS_URL': prom_url},
+    }
+
+
+def pigo_setup(work: Path, services: List[str], k8s_url: str, prom_url: str) -> Dict[str, Any]:
+    return {
+        'cwd': PIGO_DIR,
+        'argv': [sys.executable, 'memory_inspection.py'],
+        'env': {'PROMETHEUS_TRANSPORT': os.getenv('PROMETHEUS_TRANSPORT', 'port-forward')},
+    }
+
+
+# name -> (real service names to include, setup function)
+WORKFLOWS: Dict[str, Any] = {
+    'exchange': (['exchange-service'], exchange_setup),
+    'waas2': (WAAS2_SERVICES, waas2_setup),
+    'pigo': ([], pigo_setup),
+}
+
+
+def read_hwm_mb(pid: int) -> float:
+    """Peak RSS (VmHWM) of a live process in MB, 0 if unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def run_once(argv: List[str], cwd: Path, env: Dict[str, str], log: Path, timeout: float) -> Dict[str, Any]:
+    """
+    Run one process to completion; wall time from the parent, peak RSS of the child
+
+    On Linux wait4()'s ru_maxrss carries this (large) process's high-water
+    mark across fork + exec, so VmHWM of the child is sampled from /proc
+    instead; elsewhere ru_maxrss is used.
+    """
+    with open(log, 'wb') as output:
+        started = time.perf_counter()
+        process = subprocess.Popen(argv, cwd=cwd, env=env, stdout=output, stderr=subprocess.STDOUT)
+        timer = threading.Timer(timeout, process.kill)
+        timer.start()
+        peak = [0.0]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(0.02):
+                peak[0] = max(peak[0], read_hwm_mb(process.pid))
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        finally:
+            done.set()
+            timer.cancel()
+        wall = time.perf_counter() - started
+        sampler.join()
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    if not peak[0]:
+        peak[0] = usage.ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+    text = log.read_text(errors='replace')
+    return {
+        'wall_seconds': wall,
+        'max_rss_mb': peak[0],
+        'returncode': process.returncode,
+        'aborted': 'Traceback (most recent call last)' in text or process.returncode < 0,
+    }
+
+
+def bench(name: str, scale: int, args, work: Path) -> Dict[str, Any]:
+    """Benchmark one workflow at one scale"""
+    real, setup = WORKFLOWS[name]
+    inventory = Inventory(service_names(scale, real), args.pods_per_service)
+    fault = {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'error_rate': args.error_rate}
+    prometheus = start_prometheus(inventory, **fault)
+    k8s = start_k8s(inventory, **fault)
+
+    run_dir = work / f"{name}-{scale}"
+    (run_dir / 'reports').mkdir(parents=True)
+    spec = setup(run_dir, inventory.services, k8s.url, prometheus.url)
+    env = {
+        **os.environ,
+        'PATH': f"{BENCH_DIR / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}",
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(COMMON_DIR), os.environ.get('PYTHONPATH')])),
+        'BENCH_K8S_URL': k8s.url,
+        'BENCH_PROMETHEUS_URL': prometheus.url,
+        'QUERY_CACHE_MODE': 'off',
+        'REPORT_DIR': str(run_dir / 'reports'),
+        'SLACK_WEBHOOK_URL': '',
+        'SLACK_BOT_TOKEN': '',
+        'PYTHONUNBUFFERED': '1',
+        **spec['env'],
+    }
+
+    runs = []
+    try:
+        for index in range(args.runs):
+            prometheus.reset_stats()
+            k8s.reset_stats()
+            run = run_once(spec['argv'], spec['cwd'], env, run_dir / f"run-{index}.log", args.timeout)
+            run['prometheus'] = prometheus.snapshot()
+            run['k8s'] = k8s.snapshot()
+            runs.append(run)
+            if run['aborted']:
+                print(f"  {name}@{scale}: run {index} aborted, see {run_dir / f'run-{index}.log'}", file=sys.stderr)
+    finally:
+        prometheus.stop()
+        k8s.stop()
+
+    walls = [r['wall_seconds'] for r in runs]
+    return {
+        'workflow': name,
+        'scale': scale,
+        'pods': len(inventory.containers()),
+        'runs': len(runs),
+        'wall_p50': statistics.median(walls),
+        'wall_min': min(walls),
+        'max_rss_mb': max(r['max_rss_mb'] for r in runs),
+        'prom_requests': statistics.median(r['prometheus']['requests'] for r in runs),
+        'prom_mb': statistics.median(r['prometheus']['bytes_sent'] for r in runs) / 1024 ** 2,
+        'k8s_requests': statistics.median(r['k8s']['requests'] for r in runs),
+        'k8s_mb': statistics.median(r['k8s']['bytes_sent'] for r in runs) / 1024 ** 2,
+        'errors_injected': statistics.median(
+            r['prometheus']['errors_injected'] + r['k8s']['errors_injected'] for r in runs
+        ),
+        'returncodes': sorted({r['returncode'] for r in runs}),
+        'aborted': any(r['aborted'] for r in runs),
+        'detail': runs,
+    }
+
+
+def print_table(results: List[Dict[str, Any]]):
+    header = f"{'workflow':<10} {'svc':>5} {'pods':>5} {'wall p50':>9} {'min':>7} {'RSS MB':>7} " \
+             f"{'prom req':>8} {'prom MB':>8} {'k8s req':>7} {'k8s MB':>7} {'503s':>5}  exit"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        exit_codes = ','.join(map(str, r['returncodes'])) + (' ABORTED' if r['aborted'] else '')
+        print(f"{r['workflow']:<10} {r['scale']:>5} {r['pods']:>5} {r['wall_p50']:>8.2f}s {r['wall_min']:>6.2f}s "
+              f"{r['max_rss_mb']:>7.1f} {r['prom_requests']:>8.0f} {r['prom_mb']:>8.2f} "
+              f"{r['k8s_requests']:>7.0f} {r['k8s_mb']:>7.2f} {r['errors_injected']:>5.0f}  {exit_codes}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-w', '--workflow', action='append', choices=list(WORKFLOWS),
+                        help='Workflow to run (repeatable, default all)')
+    parser.add_argument('--scales', default='10,100,1000', help='Comma-separated services per namespace')
+    parser.add_argument('--pods-per-service', type=int, default=2)
+    parser.add_argument('--runs', type=int, default=3, help='Runs per (workflow, scale); median reported')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added latency per fake API request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Uniform random extra latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of fake API requests answered 503')
+    parser.add_argument('--timeout', type=float, default=900, help='Per-run timeout in seconds')
+    parser.add_argument('--json', metavar='FILE', help='Also write results (with per-run detail) as JSON')
+    parser.add_argument('--keep', action='store_true', help='Keep the work directory (logs, reports)')
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    work = Path(tempfile.mkdtemp(prefix='health-check-bench-'))
+    results = []
+    try:
+        for name in args.workflow or list(WORKFLOWS):
+            for scale in scales:
+                print(f"Running {name} at {scale} services x {args.pods_per_service} pods ...", file=sys.stderr)
+                results.append(bench(name, scale, args, work))
+    finally:
+        if args.keep:
+            print(f"Work directory kept: {work}", file=sys.stderr)
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            'settings': {k: v for k, v in vars(args).items() if k not in ('json', 'keep')},
+            'results': results,
+        }, indent=2))
+
+    # Aborts are expected when errors are injected; without injection they are a regression
+    sys.exit(1 if not args.error_rate and any(r['aborted'] for r in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Pod list benchmark: kubernetes model deserialization vs raw-JSON fast path
+
+Serves a pod list from a local HTTP server that speaks the list API
+(limit / continue), then times:
+
+- model: CoreV1Api.list_namespaced_pod() + field extraction from V1Pod
+- raw:   K8sClient.get_pods() (_preload_content=False, lean dict parser, paged)
+
+Both paths go through the same HTTP round trips. Without --fixture a
+1,000-pod list shaped like a real cluster's (managedFields, probes, env,
+volumes, conditions) is generated; pass a recorded list to use real data:
+
+    kubectl get pods -n forex-prod -o json > pods.json
+
+Usage:
+    python3 benchmarks/k8s_list_benchmark.py [--fixture pods.json] [--pods 1000] [--runs 5]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+import tracemalloc
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from kubernetes import client  # noqa: E402
+from k8s_client import K8sClient  # noqa: E402
+
+NAMESPACE = 'forex-prod'
+
+
+def synthetic_pod(index: int) -> dict:
+    """One pod object with the fields a production pod typically carries"""
+    name = f"exchange-service-7d9f8c6b5-{index:05d}"
+    container = {
+        'name': 'exchange-service',
+        'image': 'asia-east2-docker.pkg.dev/uu-prod/uu-prod/forex/exchange-service:1.42.0',
+        'ports': [{'containerPort': 8080, 'protocol': 'TCP'}, {'containerPort': 9404, 'name': 'jmx', 'protocol': 'TCP'}],
+        'env': [{'name': f'ENV_{i}', 'value': f'value-{i}'} for i in range(20)],
+        'resources': {'requests': {'cpu': '1', 'memory': '2Gi'}, 'limits': {'cpu': '2', 'memory': '4Gi'}},
+        'livenessProbe': {'httpGet': {'path': '/health', 'port': 8080, 'scheme': 'HTTP'}, 'periodSeconds': 10},
+        'readinessProbe': {'httpGet': {'path': '/ready', 'port': 8080, 'scheme': 'HTTP'}, 'periodSeconds': 5},
+        'volumeMounts': [{'name': f'vol-{i}', 'mountPath': f'/mnt/vol-{i}'} for i in range(4)],
+        'terminationMessagePath': '/dev/termination-log',
+        'imagePullPolicy': 'IfNotPresent',
+    }
+    return {
+        'metadata': {
+            'name': name,
+            'generateName': 'exchange-service-7d9f8c6b5-',
+            'namespace': NAMESPACE,
+            'uid': f'00000000-0000-0000-0000-{index:012d}',
+            'resourceVersion': str(1000000 + index),
+            'creationTimestamp': '2026-10-01T08:00:00Z',
+            'labels': {'app': 'exchange-service', 'pod-template-hash': '7d9f8c6b5', 'version': '1.42.0'},
+            'annotations': {'prometheus.io/scrape': 'true', 'prometheus.io/port': '9404'},
+            'ownerReferences': [{
+                'apiVersion': 'apps/v1', 'kind': 'ReplicaSet', 'name': 'exchange-service-7d9f8c6b5',
+                'uid': '11111111-1111-1111-1111-111111111111', 'controller': True, 'blockOwnerDeletion': True,
+            }],
+            'managedFields': [{
+                'manager': 'kube-controller-manager', 'operation': 'Update', 'apiVersion': 'v1',
+                'time': '2026-10-01T08:00:00Z', 'fieldsType': 'FieldsV1',
+                'fieldsV1': {'f:metadata': {'f:labels': {f'f:label-{i}': {} for i in range(10)}}},
+            }],
+        },
+        'spec': {
+            'containers': [container],
+            'volumes': [{'name': f'vol-{i}', 'configMap': {'name': f'config-{i}', 'defaultMode': 420}} for i in range(4)],
+            'nodeName': f'gke-prod-pool-{index % 40:02d}',
+            'serviceAccountName': 'exchange-service',
+            'restartPolicy': 'Always',
+            'dnsPolicy': 'ClusterFirst',
+            'tolerations': [
+                {'key': 'node.kubernetes.io/not-ready', 'operator': 'Exists', 'effect': 'NoExecute', 'tolerationSeconds': 300},
+            ],
+        },
+        'status': {
+            'phase': 'Running',
+            'podIP': f'10.4.{index // 250}.{index % 250}',
+            'hostIP': f'10.128.0.{index % 40}',
+            'startTime': '2026-10-01T08:00:01Z',
+            'qosClass': 'Burstable',
+            'conditions': [
+                {'type': t, 'status': 'True', 'lastTransitionTime': '2026-10-01T08:00:30Z'}
+                for t in ('Initialized', 'Ready', 'ContainersReady', 'PodScheduled')
+            ],
+            'containerStatuses': [{
+                'name': 'exchange-service', 'ready': True, 'started': True, 'restartCount': index % 3,
+                'image': container['image'], 'imageID': 'docker-pullable://sha256:' + 'a' * 64,
+                'containerID': 'containerd://' + 'b' * 64,
+                'state': {'running': {'startedAt': '2026-10-01T08:00:10Z'}},
+            }],
+        },
+    }
+
+
+def start_server(pods: list) -> ThreadingHTTPServer:
+    """Serve pods as /api/v1/namespaces/<ns>/pods with limit/continue paging"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+            start = int(query.get('continue', 0))
+            limit = int(query.get('limit', 0)) or len(pods)
+            end = start + limit
+            metadata = {'resourceVersion': '2000000'}
+            if end < len(pods):
+                metadata['continue'] = str(end)
+            body = json.dumps({'kind': 'PodList', 'apiVersion': 'v1', 'metadata': metadata, 'items': pods[start:end]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(func, runs: int) -> dict:
+    """Median wall time and tracemalloc peak of func()"""
+    func()  # warm up connections
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': statistics.median(seconds), 'peak_mb': peak / 1024 ** 2, 'result': result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixture', help='Recorded pod list (kubectl get pods -o json)')
+    parser.add_argument('--pods', type=int, default=1000, help='Synthetic pod count when no fixture is given')
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs per path (median reported)')
+    args = parser.parse_args()
+
+    if args.fixture:
+        with open(args.fixture) as f:
+            pods = json.load(f)['items']
+    else:
+        pods = [synthetic_pod(i) for i in range(args.pods)]
+
+    server = start_server(pods)
+    configuration = client.Configuration()
+    configuration.host = f"http://127.0.0.1:{server.server_address[1]}"
+    api_client = client.ApiClient(configuration)
+
+    k8s = K8sClient.__new__(K8sClient)
+    k8s.informers = {}
+    k8s.core_v1 = client.CoreV1Api(api_client)
+
+    def model_path():
+        pod_list = k8s.core_v1.list_namespaced_pod(NAMESPACE)
+        return [k8s._format_pod(pod) for pod in pod_list.items]
+
+    def raw_path():
+        return k8s.get_pods(NAMESPACE, label_selector=None)
+
+    size_mb = len(json.dumps({'items': pods})) / 1024 ** 2
+    print(f"{len(pods)} pods, {size_mb:.1f} MB JSON, {args.runs} runs\n")
+    print(f"{'path':<8} {'median ms':>10} {'peak alloc MB':>14}")
+    print('-' * 34)
+    results = {}
+    for name, func in (('model', model_path), ('raw', raw_path)):
+        results[name] = measure(func, args.runs)
+        print(f"{name:<8} {results[name]['seconds'] * 1000:>10.1f} {results[name]['peak_mb']:>14.1f}")
+
+    speedup = results['model']['seconds'] / results['raw']['seconds']
+    identical = results['model']['result'] == results['raw']['result']
+    print(f"\nspeedup: {speedup:.1f}x, identical output: {identical}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
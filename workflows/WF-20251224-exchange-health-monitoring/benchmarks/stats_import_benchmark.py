@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Import-time and RSS benchmark: stats_kernel vs scipy.stats
+
+Each candidate is imported in a fresh interpreter (cold start, like a
+CronJob pod) and timed; peak RSS is read from getrusage in the child.
+Reports the median over several runs.
+
+Usage:
+    python3 benchmarks/stats_import_benchmark.py [--runs 7]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+
+# Code run in the child; {import_stmt} is the candidate import
+CHILD_TEMPLATE = '''
+import sys, time, json, resource
+sys.path.insert(0, {scripts_dir!r})
+start = time.perf_counter()
+{import_stmt}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print(json.dumps({{'seconds': elapsed, 'rss_kb': rss_kb}}))
+'''
+
+CANDIDATES = {
+    'python (baseline)': 'pass',
+    'numpy': 'import numpy',
+    'stats_kernel': 'import stats_kernel',
+    'analyzer': 'import analyzer',
+    'scipy.stats': 'from scipy import stats',
+}
+
+
+def measure(import_stmt: str) -> dict:
+    """Run one cold import in a subprocess and return its timing/RSS"""
+    code = CHILD_TEMPLATE.format(scripts_dir=SCRIPTS_DIR, import_stmt=import_stmt)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7, help='Cold imports per candidate (median reported)')
+    args = parser.parse_args()
+
+    print(f"{'candidate':<20} {'import ms':>10} {'peak RSS MB':>12}")
+    print('-' * 44)
+    for name, import_stmt in CANDIDATES.items():
+        try:
+            samples = [measure(import_stmt) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<20} {'n/a':>10} {'n/a':>12}  ({e.stderr.strip().splitlines()[-1]})")
+            continue
+
+        seconds = statistics.median(s['seconds'] for s in samples)
+        rss_mb = statistics.median(s['rss_kb'] for s in samples) / 1024
+        print(f"{name:<20} {seconds * 1000:>10.1f} {rss_mb:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
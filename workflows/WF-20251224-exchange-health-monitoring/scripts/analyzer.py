@@ -7,12 +7,17 @@ Analyzes metrics to detect issues and provide recommendations.
 
 import logging
 import numpy as np
-from scipy import stats
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+from timeseries import TimeSeries
+from stats_kernel import linregress_batch
+
 logger = logging.getLogger(__name__)
 
+# Minimum samples per pod for a trend fit
+MIN_TREND_POINTS = 10
+
 
 class HealthAnalyzer:
     """Analyzes service health metrics"""
@@ -28,60 +33,101 @@ class HealthAnalyzer:
 
     def analyze_memory_trend(
         self,
-        time_series: Dict[str, List[Tuple[datetime, float]]]
+        time_series: Dict[str, TimeSeries]
     ) -> Dict[str, Any]:
         """
         Analyze memory trend for leak detection using linear regression
 
+        Every pod is fitted separately (one batched kernel call) so a leak in a
+        single replica is not averaged away by the others; the pooled fit over
+        all pods is kept as the fleet-level result.
+
         Args:
-            time_series: Dict mapping pod name to list of (timestamp, memory_bytes) tuples
+            time_series: Dict mapping pod name to TimeSeries of memory bytes
 
         Returns:
-            Analysis result with leak detection
+            Analysis result with fleet-level fit, per-pod fits ('pods'),
+            'leaking_pods', 'excluded_pods' (name -> sample count of pods with
+            fewer than MIN_TREND_POINTS samples, left out of every fit) and 'issues'
         """
+        empty = {'leak_detected': False, 'slope_mb_per_hour': 0, 'r_squared': 0, 'pods': {}, 'leaking_pods': [], 'excluded_pods': {}, 'issues': []}
         if not time_series:
-            return {'leak_detected': False, 'slope_mb_per_hour': 0, 'r_squared': 0}
-
-        # Aggregate data across all pods
-        all_points = []
-        for pod_name, series in time_series.items():
-            all_points.extend(series)
-
-        if len(all_points) < 10:
+            return empty
+
+        # Pods with too few samples cannot be fitted meaningfully (typically
+        # replicas started late in the window); report them instead of dropping silently
+        pods = {name: series for name, series in time_series.items() if len(series) >= MIN_TREND_POINTS}
+        excluded = {name: len(series) for name, series in time_series.items() if len(series) < MIN_TREND_POINTS}
+        if excluded:
+            logger.info(
+                f"Memory trend: {len(excluded)} of {len(time_series)} pods have fewer than "
+                f"{MIN_TREND_POINTS} samples and are excluded from the fit: {', '.join(sorted(excluded))}"
+            )
+        if not pods:
             logger.warning("Insufficient data points for trend analysis")
-            return {'leak_detected': False, 'slope_mb_per_hour': 0, 'r_squared': 0}
+            return {**empty, 'excluded_pods': excluded}
 
-        # Sort by timestamp
-        all_points.sort(key=lambda x: x[0])
+        # Ragged layout: all samples concatenated, one segment per pod
+        origin = min(series.timestamps[0] for series in pods.values())
+        hours = np.concatenate([series.timestamps for series in pods.values()]) - origin
+        hours /= 3600.0
+        memory_mb = np.concatenate([series.values for series in pods.values()]) / (1024 ** 2)
+        counts = np.array([len(series) for series in pods.values()])
 
-        # Convert to arrays for regression
-        timestamps = np.array([(dt - all_points[0][0]).total_seconds() / 3600.0 for dt, _ in all_points])
-        memory_mb = np.array([value / (1024 ** 2) for _, value in all_points])
-
-        # Perform linear regression
-        slope, intercept, r_value, p_value, std_err = stats.linregress(timestamps, memory_mb)
-
-        r_squared = r_value ** 2
+        per_pod = linregress_batch(hours, memory_mb, counts)
+        fleet = linregress_batch(hours, memory_mb, np.array([len(hours)]))
 
         # Check leak conditions
         slope_threshold = self.thresholds.get('memory', {}).get('leak_slope_threshold', 10)
         r_squared_threshold = self.thresholds.get('memory', {}).get('leak_r_squared_threshold', 0.7)
         p_value_threshold = self.thresholds.get('memory', {}).get('leak_p_value_threshold', 0.05)
 
-        leak_detected = (
-            slope > slope_threshold and
-            r_squared > r_squared_threshold and
-            p_value < p_value_threshold
-        )
+        def is_leak(slope, r_squared, p_value):
+            # Element-wise so it applies to the per-pod arrays as well as the fleet scalars
+            return (
+                (slope > slope_threshold) &
+                (r_squared > r_squared_threshold) &
+                (p_value < p_value_threshold)
+            )
+
+        pod_leaks = is_leak(per_pod['slope'], per_pod['r'] ** 2, per_pod['p_value'])
+
+        pod_results = {}
+        leaking_pods = []
+        issues = []
+        for i, name in enumerate(pods):
+            pod_results[name] = {
+                'leak_detected': bool(pod_leaks[i]),
+                'slope_mb_per_hour': round(float(per_pod['slope'][i]), 2),
+                'r_squared': round(float(per_pod['r'][i] ** 2), 3),
+                'p_value': round(float(per_pod['p_value'][i]), 4),
+                'data_points': int(counts[i]),
+            }
+            if pod_leaks[i]:
+                leaking_pods.append(name)
+                issues.append({
+                    'severity': 'HIGH',
+                    'category': 'MEMORY_LEAK',
+                    'message': f'Pod {name} memory growing {per_pod["slope"][i]:.1f} MB/h (R² {per_pod["r"][i] ** 2:.2f})',
+                    'suggestion': 'Check heap usage and recent changes on this replica; restart if it nears the limit'
+                })
+
+        slope = float(fleet['slope'][0])
+        r_squared = float(fleet['r'][0] ** 2)
+        p_value = float(fleet['p_value'][0])
 
         return {
-            'leak_detected': leak_detected,
+            'leak_detected': bool(is_leak(slope, r_squared, p_value)) or bool(leaking_pods),
             'slope_mb_per_hour': round(slope, 2),
             'r_squared': round(r_squared, 3),
             'p_value': round(p_value, 4),
-            'intercept_mb': round(intercept, 2),
-            'std_err': round(std_err, 2),
-            'data_points': len(all_points),
+            'intercept_mb': round(float(fleet['intercept'][0]), 2),
+            'std_err': round(float(fleet['stderr'][0]), 2),
+            'data_points': len(hours),
+            'pods': pod_results,
+            'leaking_pods': leaking_pods,
+            'excluded_pods': excluded,
+            'issues': issues,
         }
 
     def analyze_resource_allocation(
@@ -355,13 +401,14 @@ if __name__ == '__main__':
 
     # Test memory trend analysis
     print("=== Memory Trend Analysis ===")
-    from datetime import timedelta
-    base_time = datetime.now()
+    base_time = datetime.now().timestamp()
+    hours = np.arange(24, dtype=np.float64)
     time_series = {
-        'pod-1': [
-            (base_time + timedelta(hours=i), 3000 * (1024**2) + i * 50 * (1024**2))
-            for i in range(24)
-        ]
+        'pod-1': TimeSeries(
+            {'pod': 'pod-1'},
+            base_time + hours * 3600,
+            3000 * (1024**2) + hours * 50 * (1024**2)
+        )
     }
     result = analyzer.analyze_memory_trend(time_series)
     print(f"Leak detected: {result['leak_detected']}")
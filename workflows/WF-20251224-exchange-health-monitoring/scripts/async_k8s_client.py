@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Async Kubernetes Client for Exchange Service Health Check
+
+asyncio variant of K8sClient. Cluster credentials are loaded exactly like
+K8sClient (in-cluster service account or kubeconfig); requests then go
+straight to the REST API over aiohttp and the raw JSON is converted with
+K8sClient's lean parsers, so results are identical to the synchronous
+client. Getters are coroutines with the same names and arguments.
+"""
+
+import ssl
+import json
+import logging
+import aiohttp
+from typing import Dict, List, Any, Optional
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+from k8s_client import K8sClient, LIST_PAGE_SIZE
+from health_check_common.run_profile import timed
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncK8sClient(K8sClient):
+    """asyncio client for querying Kubernetes resources"""
+
+    def __init__(self, in_cluster: bool = True, timeout: int = 30, pool_size: int = 10):
+        """
+        Initialize async Kubernetes client
+
+        Args:
+            in_cluster: True if running inside cluster, False for local kubeconfig
+            timeout: Per-request timeout in seconds
+            pool_size: Keep-alive connections kept to the API server
+        """
+        super().__init__(in_cluster)
+        self.configuration = client.Configuration.get_default_copy()
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _ssl_context(self) -> Any:
+        """TLS settings from the loaded configuration (False disables verification)"""
+        if not self.configuration.host.startswith('https'):
+            return None
+
+        context = ssl.create_default_context(cafile=self.configuration.ssl_ca_cert)
+        if not self.configuration.verify_ssl:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        if self.configuration.cert_file:
+            context.load_cert_chain(self.configuration.cert_file, self.configuration.key_file)
+        return context
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Pooled keep-alive session, created on first use inside the running loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ssl=self._ssl_context()),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncK8sClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        GET an API path and return the decoded JSON body
+
+        Raises:
+            ApiException: Non-2xx response (same type as the synchronous client)
+            aiohttp.ClientError: Connection failure
+        """
+        headers = {'Accept': 'application/json'}
+        # Re-read per request: refresh hooks (exec plugins, projected tokens) update the token
+        bearer = self.configuration.auth_settings().get('BearerToken')
+        if bearer and bearer.get('value'):
+            headers['Authorization'] = bearer['value']
+
+        params = {key: str(value) for key, value in (params or {}).items() if value is not None}
+        async with self._get_session().get(self.configuration.host + path, params=params, headers=headers) as response:
+            body = await response.read()
+            if not 200 <= response.status <= 299:
+                raise ApiException(status=response.status, reason=response.reason)
+        return json.loads(body)
+
+    async def _list_raw_async(self, path: str, page_size: int = LIST_PAGE_SIZE, **params) -> List[Dict[str, Any]]:
+        """Page through a list endpoint (limit / continue), returning raw JSON items"""
+        items = []
+        token = None
+        while True:
+            page = await self._get_json(path, {**params, 'limit': page_size, 'continue': token})
+            items.extend(page.get('items') or [])
+            token = (page.get('metadata') or {}).get('continue')
+            if not token:
+                return items
+
+    @timed('k8s.get_deployment')
+    async def get_deployment(self, name: str, namespace: str) -> Optional[Dict[str, Any]]:
+        """Get deployment information (None if not found)"""
+        try:
+            deployment = await self._get_json(f"/apis/apps/v1/namespaces/{namespace}/deployments/{quote(name)}")
+            return self._format_raw_deployment(deployment)
+
+        except ApiException as e:
+            if e.status == 404:
+                logger.warning(f"Deployment not found: {namespace}/{name}")
+            else:
+                logger.error(f"Failed to get deployment: {e}")
+            return None
+        except aiohttp.ClientError as e:
+            logger.error(f"Failed to get deployment: {e}")
+            return None
+
+    @timed('k8s.get_pods')
+    async def get_pods(self, namespace: str, label_selector: str) -> List[Dict[str, Any]]:
+        """Get pods matching label selector"""
+        try:
+            pods = await self._list_raw_async(f"/api/v1/namespaces/{namespace}/pods", labelSelector=label_selector)
+            return [self._format_raw_pod(pod) for pod in pods]
+
+        except (ApiException, aiohttp.ClientError) as e:
+            logger.error(f"Failed to list pods: {e}")
+            return []
+
+    @timed('k8s.get_hpa')
+    async def get_hpa(self, name: str, namespace: str) -> Optional[Dict[str, Any]]:
+        """Get HorizontalPodAutoscaler information (None if not found)"""
+        try:
+            hpa = await self._get_json(
+                f"/apis/autoscaling/v2/namespaces/{namespace}/horizontalpodautoscalers/{quote(name)}"
+            )
+            return self._format_raw_hpa(hpa)
+
+        except ApiException as e:
+            if e.status == 404:
+                logger.warning(f"HPA not found: {namespace}/{name}")
+            else:
+                logger.error(f"Failed to get HPA: {e}")
+            return None
+        except aiohttp.ClientError as e:
+            logger.error(f"Failed to get HPA: {e}")
+            return None
+
+    @timed('k8s.get_events')
+    async def get_events(
+        self,
+        namespace: str,
+        field_selector: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Get events from namespace, optionally filtered by field selector and time"""
+        try:
+            items = await self._list_raw_async(f"/api/v1/namespaces/{namespace}/events", fieldSelector=field_selector)
+        except (ApiException, aiohttp.ClientError) as e:
+            logger.error(f"Failed to list events: {e}")
+            return []
+
+        event_list = [self._format_raw_event(item) for item in items]
+        if since:
+            since_utc = since.replace(tzinfo=timezone.utc)
+            event_list = [
+                event for event in event_list
+                if not event['last_timestamp'] or event['last_timestamp'].replace(tzinfo=timezone.utc) >= since_utc
+            ]
+        return event_list
+
+    @timed('k8s.get_oom_events')
+    async def get_oom_events(self, namespace: str, pod_prefix: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Get OOMKilled events for pods with specific prefix (reason filtered server-side)"""
+        events = await self.get_events(namespace, field_selector='reason=OOMKilling', since=since)
+        return [event for event in events if (event['involved_object']['name'] or '').startswith(pod_prefix)]
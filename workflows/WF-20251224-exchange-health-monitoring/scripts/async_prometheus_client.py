@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Async Prometheus Client for Exchange Service Health Check
+
+asyncio variant of PrometheusClient built on aiohttp. Same method names and
+return values, but every network method is a coroutine, so a whole batch of
+queries runs concurrently on one event loop without worker threads. Shares
+the query cache (via its async helpers), response decoder and result
+conversions with the synchronous client.
+"""
+
+import io
+import asyncio
+import logging
+import aiohttp
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple, Union
+from datetime import datetime
+from urllib.parse import urljoin
+
+from health_check_common.prom_stream import decode_response
+from prometheus_client import PrometheusClient
+from timeseries import TimeSeries
+from health_check_common.query_cache import QueryCache, parse_duration
+from health_check_common.run_profile import span
+
+logger = logging.getLogger(__name__)
+
+# Same status codes the synchronous client's urllib3 Retry treats as retryable
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AsyncPrometheusClient(PrometheusClient):
+    """asyncio client for querying Prometheus metrics"""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int = 30,
+        max_workers: int = 6,
+        pool_size: Optional[int] = None,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_points: int = 288,
+        cache: Optional[QueryCache] = None
+    ):
+        """
+        Initialize async Prometheus client (arguments as PrometheusClient)
+
+        Args:
+            base_url: Prometheus server URL (e.g., http://prometheus:9090)
+            timeout: Per-request timeout in seconds
+            max_workers: Maximum queries in flight in query_batch
+            pool_size: Keep-alive connections kept per host (defaults to max_workers)
+            max_retries: Retries for connection errors and 429/5xx responses
+            backoff_factor: Exponential backoff factor between retries in seconds
+            max_points: Default number of points per series for range queries without explicit step
+            cache: Optional persistent query cache (see health_check_common.query_cache)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.max_points = max(1, max_points)
+        self.api_base = urljoin(self.base_url, '/api/v1/')
+        self.pool_size = max(1, pool_size or self.max_workers)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Pooled keep-alive session, created on first use inside the running loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncPrometheusClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def request_budget(self, requests: int = 1) -> float:
+        """Worst-case seconds for `requests` sequential API calls, retries and backoff included"""
+        backoff = sum(self.backoff_factor * (2 ** attempt) for attempt in range(self.max_retries))
+        return requests * (self.timeout * (self.max_retries + 1) + backoff)
+
+    def range_requests(
+        self,
+        start: datetime,
+        end: datetime,
+        step: Optional[str] = None,
+        max_points: Optional[int] = None,
+        incremental: bool = False
+    ) -> int:
+        """Worst-case number of sequential API calls behind one query_range()"""
+        if not self.cache or not self.cache.enabled:
+            return 1
+        if incremental:
+            # Delta since the last run, plus the front when the window grew
+            return 2
+        # One request per uncached block of the window
+        block = parse_duration(step or self.adaptive_step(start, end, max_points)) * self.cache.block_points
+        return int((end - start).total_seconds() // block) + 2 if block > 0 else 1
+
+    async def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Make HTTP request to Prometheus API
+
+        Args:
+            endpoint: API endpoint (e.g., 'query', 'query_range')
+            params: Query parameters
+
+        Returns:
+            Response data
+
+        Raises:
+            Exception: If request fails after retries
+        """
+        url = urljoin(self.api_base, endpoint)
+        params = {key: str(value) for key, value in params.items()}
+
+        with span(f"prometheus.{endpoint}", query=params.get('query', '')) as attrs:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self._get_session().get(url, params=params) as response:
+                        if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                            continue
+                        response.raise_for_status()
+                        body = await response.read()
+                    break
+
+                except asyncio.TimeoutError:
+                    logger.error(f"Prometheus query timeout after {self.timeout}s")
+                    raise Exception(f"Prometheus query timeout (>{self.timeout}s)")
+                except aiohttp.ClientResponseError as e:
+                    logger.error(f"Prometheus request failed: {e}")
+                    raise Exception(f"Prometheus request failed: {e}")
+                except aiohttp.ClientError as e:
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                        continue
+                    logger.error(f"Prometheus request failed: {e}")
+                    raise Exception(f"Prometheus request failed: {e}")
+
+            try:
+                # Body is already in memory; still decode into compact Samples
+                data = decode_response(io.BytesIO(body))
+            except ValueError as e:
+                logger.error(f"Prometheus response read failed: {e}")
+                raise Exception(f"Prometheus response read failed: {e}")
+
+            if data.get('status') != 'success':
+                error_msg = data.get('error', 'Unknown error')
+                raise Exception(f"Prometheus query failed: {error_msg}")
+
+            attrs['series'] = len(data.get('data', {}).get('result') or [])
+            return data.get('data', {})
+
+    async def query(self, promql: str, time: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Execute instant query
+
+        Args:
+            promql: PromQL query string
+            time: Optional evaluation timestamp (defaults to now)
+
+        Returns:
+            List of result items with metrics and values
+        """
+        async def fetch(at: Optional[float]) -> List[Dict[str, Any]]:
+            params = {'query': promql}
+            if at is not None:
+                params['time'] = at
+            return (await self._make_request('query', params)).get('result', [])
+
+        try:
+            at = time.timestamp() if time else None
+            if self.cache:
+                result = await self.cache.aquery(self.base_url, promql, fetch, at)
+            else:
+                result = await fetch(at)
+
+            logger.debug(f"Query returned {len(result)} results: {promql[:100]}...")
+            return result
+
+        except Exception as e:
+            logger.error(f"Instant query failed: {e}")
+            return []
+
+    async def query_range(
+        self,
+        promql: str,
+        start: datetime,
+        end: datetime,
+        step: Optional[str] = None,
+        max_points: Optional[int] = None,
+        incremental: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute range query
+
+        Args:
+            promql: PromQL query string
+            start: Start time
+            end: End time
+            step: Query resolution step (e.g., '5m', '1h'); chosen from the window when omitted
+            max_points: Points per series used to pick the step when step is omitted
+            incremental: Serve from the cache's series store and only fetch the delta since the last run
+
+        Returns:
+            List of result items with time series data
+        """
+        step = step or self.adaptive_step(start, end, max_points)
+
+        async def fetch(range_start: float, range_end: float) -> List[Dict[str, Any]]:
+            params = {
+                'query': promql,
+                'start': range_start,
+                'end': range_end,
+                'step': step,
+            }
+            return (await self._make_request('query_range', params)).get('result', [])
+
+        try:
+            if self.cache and incremental:
+                result = await self.cache.aquery_range_incremental(
+                    self.base_url, promql, start.timestamp(), end.timestamp(), step, fetch
+                )
+            elif self.cache:
+                result = await self.cache.aquery_range(
+                    self.base_url, promql, start.timestamp(), end.timestamp(), step, fetch
+                )
+            else:
+                result = await fetch(start.timestamp(), end.timestamp())
+
+            logger.debug(f"Range query returned {len(result)} series: {promql[:100]}...")
+            return result
+
+        except Exception as e:
+            logger.error(f"Range query failed: {e}")
+            return []
+
+    async def get_scalar_value(self, promql: str) -> Optional[float]:
+        """Execute query and return single scalar value (None if no result)"""
+        return self.to_scalar(await self.query(promql), promql)
+
+    async def get_vector_values(self, promql: str) -> List[Tuple[Dict[str, str], float]]:
+        """Execute query and return vector of (labels, value) tuples"""
+        vector = []
+        for item in await self.query(promql):
+            try:
+                vector.append((item.get('metric', {}), float(item['value'][1])))
+            except (KeyError, ValueError, IndexError) as e:
+                logger.warning(f"Failed to parse vector item: {e}")
+        return vector
+
+    async def get_time_series(
+        self,
+        promql: str,
+        start: datetime,
+        end: datetime,
+        step: Optional[str] = None,
+        max_points: Optional[int] = None
+    ) -> Dict[str, TimeSeries]:
+        """Execute range query (incremental when cached) and return per-pod TimeSeries"""
+        return self.to_time_series(await self.query_range(promql, start, end, step, max_points, incremental=True))
+
+    async def query_batch(
+        self,
+        queries: Dict[str, Union[str, Dict[str, Any]]],
+        max_workers: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Execute a named set of queries concurrently
+
+        Args:
+            queries: Mapping of name to either a PromQL string (instant query) or
+                     a dict with 'query', 'start', 'end' and optional 'step',
+                     'max_points' or 'incremental' (range query)
+            max_workers: Maximum queries in flight (defaults to the client setting)
+
+        Returns:
+            Dict mapping each name to its raw result list (empty list on failure)
+        """
+        if not queries:
+            return {}
+
+        limit = asyncio.Semaphore(min(max_workers or self.max_workers, len(queries)))
+
+        async def run(spec: Union[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with limit:
+                if isinstance(spec, str):
+                    return await self.query(spec)
+                return await self.query_range(
+                    spec['query'], spec['start'], spec['end'], spec.get('step'), spec.get('max_points'),
+                    spec.get('incremental', False)
+                )
+
+        results = await asyncio.gather(*(run(spec) for spec in queries.values()))
+        logger.debug(f"Batch of {len(queries)} queries completed")
+        return dict(zip(queries, results))
+
+    async def get_scalar_values(self, queries: Dict[str, str], max_workers: Optional[int] = None) -> Dict[str, Optional[float]]:
+        """Execute a named set of scalar queries concurrently"""
+        results = await self.query_batch(queries, max_workers)
+        return {name: self.to_scalar(results[name], promql) for name, promql in queries.items()}
+
+    async def check_connection(self) -> bool:
+        """
+        Check if Prometheus is reachable
+
+        Returns:
+            True if connection successful
+        """
+        try:
+            await self._make_request('query', {'query': 'up'})
+            logger.info(f"Successfully connected to Prometheus at {self.base_url}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to Prometheus: {e}")
+            return False
+
+    async def get_metric_aggregation(
+        self,
+        promql: str,
+        start: datetime,
+        end: datetime,
+        step: Optional[str] = None
+    ) -> Dict[str, float]:
+        """Aggregated statistics (min, max, avg, current) across all pods' series"""
+        series_data = await self.get_time_series(promql, start, end, step)
+        all_values = np.concatenate([s.values for s in series_data.values()]) if series_data else np.empty(0)
+        if not all_values.size:
+            return {'min': 0.0, 'max': 0.0, 'avg': 0.0, 'current': 0.0}
+
+        current_values = [series.last for series in series_data.values() if len(series)]
+        return {
+            'min': float(all_values.min()),
+            'max': float(all_values.max()),
+            'avg': float(all_values.mean()),
+            'current': sum(current_values) / len(current_values) if current_values else 0.0,
+        }
@@ -6,13 +6,31 @@ Loads configuration from YAML files and environment variables.
 """
 
 import os
+import re
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Set
 import logging
 
 logger = logging.getLogger(__name__)
 
+# {name} placeholders in PromQL templates (label matcher braces never match: they hold quotes/newlines)
+TEMPLATE_VARIABLE = re.compile(r'\{(\w+)\}')
+
+# Label selector of a rendered query (the braces holding namespace=...)
+QUERY_SELECTOR = re.compile(r'\{([^{}]*\bnamespace\s*=[^{}]*)\}')
+
+# Recording rules generated by recording_rules.py are named <prefix><category>_<query>:<lookback>
+RECORD_PREFIX = 'pod_container:'
+
+
+def alternation(values: List[str]) -> str:
+    """Regex matching any of the literal values, escaped for a double-quoted PromQL string"""
+    unique = sorted(set(values))
+    # re.escape emits '\-' etc.; PromQL strings need the backslash itself escaped
+    escaped = [re.escape(value).replace('\\', '\\\\') for value in unique]
+    return escaped[0] if len(escaped) == 1 else f"({'|'.join(escaped)})"
+
 
 class ConfigLoader:
     """Loads and manages configuration from YAML files and environment variables"""
@@ -33,6 +51,8 @@ class ConfigLoader:
         self.thresholds: Dict[str, Any] = {}
         self.promql_queries: Dict[str, Any] = {}
         self.env_config: Dict[str, Any] = {}
+        # Namespace -> recorded series known to exist in Prometheus (see set_recorded_series)
+        self.recorded_series: Dict[str, Set[str]] = {}
 
         # Load configurations
         self._load_thresholds()
@@ -84,6 +104,9 @@ class ConfigLoader:
             'hpa_name': os.getenv('HPA_NAME', 'exchange-service'),
             'container_name': os.getenv('CONTAINER_NAME', 'exchange-service'),
 
+            # Kubernetes credentials: service account (true) or KUBECONFIG / ~/.kube/config (false)
+            'k8s_in_cluster': os.getenv('K8S_IN_CLUSTER', 'true').lower() != 'false',
+
             # Slack
             'slack_bot_token': os.getenv('SLACK_BOT_TOKEN', ''),
             'slack_webhook_url': os.getenv('SLACK_WEBHOOK_URL', ''),
@@ -95,6 +118,23 @@ class ConfigLoader:
             # Collection settings
             'lookback_hours': int(os.getenv('LOOKBACK_HOURS', '24')),
             'query_timeout': int(os.getenv('QUERY_TIMEOUT', '30')),
+            'query_concurrency': int(os.getenv('QUERY_CONCURRENCY', '6')),
+            'prometheus_pool_size': int(os.getenv('PROMETHEUS_POOL_SIZE', '6')),
+            'prometheus_max_retries': int(os.getenv('PROMETHEUS_MAX_RETRIES', '3')),
+            'prometheus_retry_backoff': float(os.getenv('PROMETHEUS_RETRY_BACKOFF', '0.5')),
+            # Gather all Prometheus / Kubernetes calls on one asyncio event loop
+            'async_io': os.getenv('ASYNC_IO', 'false').lower() == 'true',
+
+            # Read precomputed recording-rule series when present (auto) or never (off)
+            'recorded_series': os.getenv('RECORDED_SERIES', 'auto').lower(),
+
+            # Fleet mode (--fleet): YAML listing the target services
+            'fleet_config': os.getenv('FLEET_CONFIG', ''),
+
+            # Daemon mode (RUN_MODE=daemon)
+            'daemon_interval_seconds': int(os.getenv('DAEMON_INTERVAL_SECONDS', '300')),
+            'daemon_host': os.getenv('DAEMON_HOST', '127.0.0.1'),
+            'daemon_port': int(os.getenv('DAEMON_PORT', '8080')),
         }
 
         logger.info(f"Loaded environment configuration: {self.env_config.keys()}")
@@ -137,6 +177,7 @@ class ConfigLoader:
             'collection': {
                 'lookback_hours': 24,
                 'step': '5m',
+                'max_points': 288,
                 'timeout': 30,
             }
         }
@@ -159,13 +200,14 @@ class ConfigLoader:
         except Exception:
             return default
 
-    def get_promql_query(self, category: str, query_name: str, **kwargs) -> str:
+    def get_promql_query(self, category: str, query_name: str, recorded: bool = True, **kwargs) -> str:
         """
         Get a PromQL query template and format with provided variables
 
         Args:
             category: Query category (e.g., 'memory', 'cpu')
             query_name: Query name within category
+            recorded: Read the recording rule's series instead when it exists (see set_recorded_series)
             **kwargs: Variables to format into the query template
 
         Returns:
@@ -191,12 +233,61 @@ class ConfigLoader:
             # Override with provided kwargs
             format_vars.update(kwargs)
 
-            # Format the template
-            return template.format(**format_vars)
+            # Substitute placeholders only; str.format would trip over PromQL's own braces
+            def substitute(match: re.Match) -> str:
+                return str(format_vars[match.group(1)])
+
+            query = TEMPLATE_VARIABLE.sub(substitute, template)
+
+            # Same result from the recording rule's precomputed series, when Prometheus has it.
+            # The rules may run less often than the 5m lookback of an instant query,
+            # so the latest recorded sample is taken from the last rule interval.
+            record = self.recording_rule_name(category, query_name, format_vars['lookback'])
+            selector = QUERY_SELECTOR.search(query)
+            if recorded and selector and record in self.recorded_series.get(format_vars['namespace'], ()):
+                return (
+                    f"last_over_time({record}{{{' '.join(selector.group(1).split())}}}"
+                    f"[{self.recording_rule_interval()}])"
+                )
+
+            return query
         except Exception as e:
             logger.error(f"Failed to format query {category}.{query_name}: {e}")
             return ''
 
+    def get_recording_rules(self) -> Dict[str, List[str]]:
+        """Queries precomputed by recording rules (category -> query names)"""
+        return (self.promql_queries.get('recording_rules') or {}).get('queries') or {}
+
+    def recording_rule_interval(self) -> str:
+        """Evaluation interval of the window recording rules"""
+        return (self.promql_queries.get('recording_rules') or {}).get('interval', '1h')
+
+    def recording_rule_name(self, category: str, query_name: str, lookback: str) -> Optional[str]:
+        """
+        Series name the recording rule for a query records into
+
+        Args:
+            category: Query category (e.g., 'memory')
+            query_name: Query name within category
+            lookback: Window the query is rendered with (e.g., '24h')
+
+        Returns:
+            Record name, or None if the query has no recording rule
+        """
+        if query_name not in self.get_recording_rules().get(category, []):
+            return None
+        return f"{RECORD_PREFIX}{category}_{query_name}:{lookback}"
+
+    def set_recorded_series(self, namespace: str, names: Iterable[str]):
+        """
+        Record which recording-rule series exist for a namespace
+
+        get_promql_query() rewrites a query to its recorded series only when
+        the series is listed here, otherwise the raw expression is used.
+        """
+        self.recorded_series[namespace] = set(names)
+
     def get_env(self, key: str, default: Any = None) -> Any:
         """Get environment configuration value"""
         return self.env_config.get(key, default)
@@ -215,6 +306,38 @@ class ConfigLoader:
             'container_name': self.env_config['container_name'],
         }
 
+    def get_fleet_targets(self, fleet_file: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Load fleet mode targets
+
+        Each target needs service_name and namespace; deployment_name,
+        hpa_name and container_name default to service_name.
+
+        Args:
+            fleet_file: Fleet YAML (defaults to FLEET_CONFIG, then config/fleet.yaml)
+
+        Returns:
+            List of service configs (same keys as get_service_config)
+        """
+        fleet_file = Path(fleet_file or self.env_config['fleet_config'] or self.config_dir / "fleet.yaml")
+
+        with open(fleet_file, 'r') as f:
+            fleet = yaml.safe_load(f) or {}
+
+        targets = []
+        for entry in fleet.get('targets', []):
+            service_name = entry['service_name']
+            targets.append({
+                'namespace': entry.get('namespace', self.env_config['namespace']),
+                'service_name': service_name,
+                'deployment_name': entry.get('deployment_name', service_name),
+                'hpa_name': entry.get('hpa_name', service_name),
+                'container_name': entry.get('container_name', service_name),
+            })
+
+        logger.info(f"Loaded {len(targets)} fleet targets from {fleet_file}")
+        return targets
+
 
 # Singleton instance
 _config_instance: Optional[ConfigLoader] = None
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Daemon Mode for Exchange Service Health Check
+
+Runs the health check cycle on a fixed interval inside one long-lived
+process, so clients, connection pools, the query cache and informers are
+reused between cycles. The latest results are served over HTTP:
+
+    GET /healthz   200 while the last cycle succeeded recently, else 503
+    GET /livez     200 while cycles keep completing (success or failure), else 503
+    GET /results   Latest report (JSON)
+    GET /report    Latest report (Markdown)
+    GET /status    Daemon state (cycle count, timings, last error)
+"""
+
+import json
+import time
+import signal
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# A cycle older than this many intervals marks /healthz unhealthy and /livez dead
+STALE_INTERVALS = 3
+
+
+class CycleResult:
+    """Output of one health check cycle"""
+
+    def __init__(self, report_data: Dict[str, Any], markdown: str, json_report: str):
+        self.report_data = report_data
+        self.markdown = markdown
+        self.json_report = json_report
+
+
+class HealthCheckDaemon:
+    """Runs a health check cycle on an interval and serves the latest result"""
+
+    def __init__(
+        self,
+        cycle: Callable[[], CycleResult],
+        interval_seconds: int,
+        host: str = '127.0.0.1',
+        port: int = 8080
+    ):
+        """
+        Initialize daemon
+
+        Args:
+            cycle: Callable running one full check and returning its CycleResult
+            interval_seconds: Seconds between cycle starts
+            host: HTTP bind address
+            port: HTTP port (0 picks a free port)
+        """
+        self.cycle = cycle
+        self.interval_seconds = interval_seconds
+        self.host = host
+        self.port = port
+
+        self.latest: Optional[CycleResult] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self.last_completed: Optional[float] = None
+        self.cycles = 0
+        self.failures = 0
+        self.started_at = time.time()
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def is_healthy(self) -> bool:
+        """Last cycle succeeded and is not stale"""
+        with self._lock:
+            if self.last_success is None or self.last_error:
+                return False
+            return time.time() - self.last_success < STALE_INTERVALS * self.interval_seconds
+
+    def is_alive(self) -> bool:
+        """A cycle completed recently (or the first one is still within its grace period)
+
+        Failed cycles count: an unreachable Prometheus is reported by /healthz,
+        restarting the pod would not fix it. Only a loop that stopped completing
+        cycles (hung request, deadlock) fails liveness.
+        """
+        with self._lock:
+            since = self.last_completed if self.last_completed is not None else self.started_at
+            return time.time() - since < STALE_INTERVALS * self.interval_seconds
+
+    def status(self) -> Dict[str, Any]:
+        """Daemon state for /status"""
+        with self._lock:
+            summary = self.latest.report_data.get('summary', {}) if self.latest else {}
+            return {
+                'healthy': self.last_success is not None and not self.last_error,
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+                'interval_seconds': self.interval_seconds,
+                'cycles': self.cycles,
+                'failures': self.failures,
+                'last_success': datetime.fromtimestamp(self.last_success).isoformat() if self.last_success else None,
+                'last_completed': datetime.fromtimestamp(self.last_completed).isoformat() if self.last_completed else None,
+                'last_duration_seconds': self.last_duration,
+                'last_error': self.last_error,
+                'overall_status': summary.get('overall_status'),
+            }
+
+    def run_cycle(self) -> Optional[CycleResult]:
+        """Run one cycle, recording its outcome (errors are logged, not raised)"""
+        start = time.monotonic()
+        try:
+            result = self.cycle()
+        except Exception as e:
+            logger.error(f"Health check cycle failed: {e}", exc_info=True)
+            with self._lock:
+                self.cycles += 1
+                self.failures += 1
+                self.last_error = str(e)
+                self.last_duration = time.monotonic() - start
+                self.last_completed = time.time()
+            return None
+
+        with self._lock:
+            self.cycles += 1
+            self.latest = result
+            self.last_success = self.last_completed = time.time()
+            self.last_error = None
+            self.last_duration = time.monotonic() - start
+        logger.info(f"Cycle {self.cycles} completed in {self.last_duration:.1f}s")
+        return result
+
+    def start_server(self) -> int:
+        """Start the HTTP server in a daemon thread; returns the bound port"""
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/healthz':
+                    healthy = daemon.is_healthy()
+                    self._send(200 if healthy else 503, 'text/plain', 'ok\n' if healthy else 'unhealthy\n')
+                elif path == '/livez':
+                    alive = daemon.is_alive()
+                    self._send(200 if alive else 503, 'text/plain', 'ok\n' if alive else 'no cycle completed recently\n')
+                elif path == '/status':
+                    self._send(200, 'application/json', json.dumps(daemon.status(), indent=2))
+                elif path in ('/results', '/report'):
+                    latest = daemon.latest
+                    if latest is None:
+                        self._send(503, 'text/plain', 'no results yet\n')
+                    elif path == '/results':
+                        self._send(200, 'application/json', latest.json_report)
+                    else:
+                        self._send(200, 'text/markdown; charset=utf-8', latest.markdown)
+                else:
+                    self._send(404, 'text/plain', 'not found\n')
+
+            def _send(self, code: int, content_type: str, body: str):
+                payload = body.encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"HTTP {self.address_string()} {format % args}")
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='healthcheck-http', daemon=True).start()
+        self.port = self._server.server_address[1]
+        logger.info(f"Serving results on http://{self.host}:{self.port}")
+        return self.port
+
+    def stop(self, *_):
+        """Stop after the current cycle (usable as a signal handler)"""
+        logger.info("Stopping daemon...")
+        self._stop.set()
+
+    def run_forever(self):
+        """Serve results and run cycles until SIGTERM / SIGINT"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.start_server()
+
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.run_cycle()
+            self._stop.wait(max(0.0, self.interval_seconds - (time.monotonic() - started)))
+
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Fleet Mode for Exchange Service Health Check
+
+Checks many services (targets from config/fleet.yaml) in one process.
+Targets are grouped by namespace; each namespace gets one Prometheus query
+per metric (pod / container regexes covering all its targets) and one
+Kubernetes list per resource type. Results are split per target locally
+by pod name prefix, so the number of queries grows with namespaces, not
+services. Each target is then analyzed exactly like a single-service run.
+"""
+
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from config_loader import alternation
+from prometheus_client import PrometheusClient
+from k8s_client import K8sClient
+from recording_rules import discover_recorded_series
+from health_check_common.run_profile import timed
+
+logger = logging.getLogger(__name__)
+
+STATUS_ORDER = {'CRITICAL': 0, 'WARNING': 1, 'HEALTHY': 2}
+STATUS_EMOJI = {'CRITICAL': '🔴', 'WARNING': '🟡', 'HEALTHY': '🟢'}
+
+
+def target_key(target: Dict[str, str]) -> str:
+    """Unique name of a target (namespace/service)"""
+    return f"{target['namespace']}/{target['service_name']}"
+
+
+def group_by_namespace(targets: List[Dict[str, str]]) -> Dict[str, List[Dict[str, str]]]:
+    """Targets grouped by namespace, preserving order"""
+    groups = defaultdict(list)
+    for target in targets:
+        groups[target['namespace']].append(target)
+    return dict(groups)
+
+
+def match_target(pod_name: Optional[str], targets: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """
+    Target owning a pod: longest service_name that is a '<service>-' prefix
+
+    Longest match keeps 'exchange-service-x' out of an 'exchange' target.
+    """
+    best = None
+    for target in targets:
+        prefix = f"{target['service_name']}-"
+        if pod_name and pod_name.startswith(prefix):
+            if best is None or len(target['service_name']) > len(best['service_name']):
+                best = target
+    return best
+
+
+def namespace_queries(
+    config,
+    namespace: str,
+    targets: List[Dict[str, str]],
+    start_time: datetime,
+    end_time: datetime
+) -> Dict[str, Any]:
+    """
+    build_queries() for every target of a namespace at once
+
+    Args:
+        config: ConfigLoader
+        namespace: Namespace
+        targets: Targets in this namespace
+        start_time: Window start
+        end_time: Window end
+
+    Returns:
+        Named queries (query_batch format) keyed '<namespace>:<name>'
+    """
+    variables = {
+        'namespace': namespace,
+        'pod_pattern': f"{alternation([t['service_name'] for t in targets])}-.*",
+        'container': alternation([t['container_name'] for t in targets]),
+    }
+
+    def promql(category: str, name: str) -> str:
+        return config.get_promql_query(category, name, **variables)
+
+    queries = {
+        'memory_series': {
+            'query': promql('memory', 'usage_over_time'),
+            'start': start_time,
+            'end': end_time,
+            'incremental': True,
+        },
+        'memory_avg': promql('memory', 'average_usage'),
+        'memory_max': promql('memory', 'max_usage'),
+        'memory_p95': promql('memory', 'p95_usage'),
+        'cpu_avg': promql('cpu', 'average_usage'),
+        'cpu_p95': promql('cpu', 'p95_usage'),
+    }
+    return {f"{namespace}:{name}": spec for name, spec in queries.items()}
+
+
+@timed('collect')
+def collect_fleet(
+    config,
+    prom: PrometheusClient,
+    k8s: K8sClient,
+    targets: List[Dict[str, str]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch data for all targets with namespace-wide queries
+
+    Args:
+        config: ConfigLoader
+        prom: Prometheus client
+        k8s: Kubernetes client
+        targets: Fleet targets (see ConfigLoader.get_fleet_targets)
+
+    Returns:
+        Dict mapping target_key to collect()-shaped data for that target
+    """
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=config.get_env('lookback_hours'))
+    groups = group_by_namespace(targets)
+    prom.cache.start_run()
+    discover_recorded_series(config, prom, groups)
+
+    # One concurrent batch for the whole fleet
+    queries = {}
+    for namespace, members in groups.items():
+        queries.update(namespace_queries(config, namespace, members, start_time, end_time))
+    batch = prom.query_batch(queries)
+    logger.info(f"Fleet: {len(queries)} Prometheus queries for {len(targets)} targets in {len(groups)} namespaces")
+
+    collected = {}
+    for namespace, members in groups.items():
+        # One Kubernetes list per resource type per namespace
+        deployments = k8s.list_deployments(namespace)
+        hpas = k8s.list_hpas(namespace)
+        pods = k8s.get_pods(namespace, f"app in ({','.join(sorted({t['service_name'] for t in members}))})")
+        oom_events = k8s.get_oom_events(namespace, '', since=start_time)
+
+        per_target = {
+            target_key(t): {
+                'start_time': start_time,
+                'queries': {},
+                'batch': {},
+                'deployment': deployments.get(t['deployment_name']),
+                'hpa': hpas.get(t['hpa_name']),
+                'pods': [],
+                'oom_events': [],
+            }
+            for t in members
+        }
+
+        for pod in pods:
+            owner = match_target(pod['name'], members)
+            if owner:
+                per_target[target_key(owner)]['pods'].append(pod)
+
+        for event in oom_events:
+            owner = match_target(event['involved_object']['name'], members)
+            if owner:
+                per_target[target_key(owner)]['oom_events'].append(event)
+
+        # Split each namespace-wide result by pod (and container) label
+        prefix = f"{namespace}:"
+        for name, spec in queries.items():
+            if not name.startswith(prefix):
+                continue
+            short_name = name[len(prefix):]
+            for data in per_target.values():
+                data['queries'][short_name] = spec
+                data['batch'][short_name] = []
+            for item in batch[name]:
+                labels = item.get('metric', {})
+                owner = match_target(labels.get('pod'), members)
+                if owner and labels.get('container', owner['container_name']) == owner['container_name']:
+                    per_target[target_key(owner)]['batch'][short_name].append(item)
+
+        collected.update(per_target)
+
+    return collected
+
+
+def render_summary(results: Dict[str, Any], generated_at: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    Fleet overview (one line per target, worst first)
+
+    Args:
+        results: Dict mapping target_key to CycleResult
+        generated_at: Report time (defaults to now)
+
+    Returns:
+        {'markdown': ..., 'json': ...}
+    """
+    generated_at = generated_at or datetime.now()
+    rows = []
+    for key, result in results.items():
+        summary = result.report_data['summary']
+        rows.append({
+            'target': key,
+            'overall_status': summary['overall_status'],
+            'issue_count': summary['issue_count'],
+            'critical_count': summary['critical_count'],
+            'warning_count': summary['warning_count'],
+        })
+    rows.sort(key=lambda row: (STATUS_ORDER.get(row['overall_status'], 3), row['target']))
+
+    counts = defaultdict(int)
+    for row in rows:
+        counts[row['overall_status']] += 1
+
+    lines = [
+        f"# Fleet Health Check ({len(rows)} services)",
+        f"",
+        f"**Generated**: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}  ",
+        f"**Status**: " + ', '.join(f"{STATUS_EMOJI.get(s, '⚪')} {s} {counts[s]}" for s in STATUS_ORDER if counts[s]),
+        f"",
+        f"| Service | Status | Issues | Critical | Warning |",
+        f"|---------|--------|--------|----------|---------|",
+    ]
+    for row in rows:
+        emoji = STATUS_EMOJI.get(row['overall_status'], '⚪')
+        lines.append(
+            f"| {row['target']} | {emoji} {row['overall_status']} | {row['issue_count']} "
+            f"| {row['critical_count']} | {row['warning_count']} |"
+        )
+
+    return {
+        'markdown': '\n'.join(lines) + '\n',
+        'json': json.dumps({'generated_at': generated_at.isoformat(), 'targets': rows}, indent=2, ensure_ascii=False),
+    }
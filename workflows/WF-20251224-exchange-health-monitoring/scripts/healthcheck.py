@@ -7,19 +7,33 @@ Orchestrates data collection, analysis, reporting, and notification.
 
 import os
 import sys
+import time
+import asyncio
 import logging
+import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, Optional, Tuple
 
 # Add script directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
 from config_loader import get_config
 from prometheus_client import PrometheusClient
+from health_check_common.query_cache import QueryCache
 from k8s_client import K8sClient
 from analyzer import HealthAnalyzer
 from reporter import Reporter
 from slack_notifier import SlackNotifier
+from daemon import CycleResult, HealthCheckDaemon
+from fleet import collect_fleet, render_summary, target_key
+from recording_rules import adiscover_recorded_series, discover_recorded_series
+from health_check_common.run_profile import RunProfile, span, timed
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime so the synchronous path does not load aiohttp
+    from async_prometheus_client import AsyncPrometheusClient
+    from async_k8s_client import AsyncK8sClient
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,67 +41,249 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-
-def main():
-    """Main health check workflow"""
-    logger.info("=== Exchange Service Health Check Started ===")
-
+# Sequential requests allowed per Kubernetes call in async mode (paged lists)
+K8S_CALL_REQUESTS = 3
+
+
+@timed('clients.init')
+def init_clients(config) -> Tuple[PrometheusClient, K8sClient]:
+    """Create the Prometheus and Kubernetes clients"""
+    prom = PrometheusClient(
+        config.get_env('prometheus_url'),
+        config.get_env('query_timeout'),
+        max_workers=config.get_env('query_concurrency'),
+        pool_size=config.get_env('prometheus_pool_size'),
+        max_retries=config.get_env('prometheus_max_retries'),
+        backoff_factor=config.get_env('prometheus_retry_backoff'),
+        max_points=config.get_threshold('collection', 'max_points', 288),
+        cache=QueryCache.from_env()
+    )
+    k8s = K8sClient(in_cluster=config.get_env('k8s_in_cluster'))
+    return prom, k8s
+
+
+@timed('clients.init')
+def init_async_clients(config) -> Tuple['AsyncPrometheusClient', 'AsyncK8sClient']:
+    """Create the asyncio Prometheus and Kubernetes clients (ASYNC_IO=true)"""
+    from async_prometheus_client import AsyncPrometheusClient
+    from async_k8s_client import AsyncK8sClient
+
+    prom = AsyncPrometheusClient(
+        config.get_env('prometheus_url'),
+        config.get_env('query_timeout'),
+        max_workers=config.get_env('query_concurrency'),
+        pool_size=config.get_env('prometheus_pool_size'),
+        max_retries=config.get_env('prometheus_max_retries'),
+        backoff_factor=config.get_env('prometheus_retry_backoff'),
+        max_points=config.get_threshold('collection', 'max_points', 288),
+        cache=QueryCache.from_env()
+    )
+    k8s = AsyncK8sClient(in_cluster=config.get_env('k8s_in_cluster'), timeout=config.get_env('query_timeout'))
+    return prom, k8s
+
+
+async def check_once_async(config) -> Tuple['AsyncPrometheusClient', CycleResult]:
+    """Connect, run one async check and close the clients"""
+    prom, k8s = init_async_clients(config)
     try:
-        # 1. Load configuration
-        logger.info("Loading configuration...")
-        config = get_config()
-        service_config = config.get_service_config()
-
-        # 2. Initialize clients
-        logger.info("Initializing clients...")
-        prom = PrometheusClient(config.get_env('prometheus_url'), config.get_env('query_timeout'))
-        k8s = K8sClient(in_cluster=True)
-
-        # Check connectivity
-        if not prom.check_connection():
+        if not await prom.check_connection():
             logger.error("Failed to connect to Prometheus")
             sys.exit(1)
+        return prom, await run_check_async(config, prom, k8s)
+    finally:
+        await prom.close()
+        await k8s.close()
+
+
+def build_queries(config, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+    """Named Prometheus queries for one check (query_batch format)"""
+    return {
+        'memory_series': {
+            'query': config.get_promql_query('memory', 'usage_over_time'),
+            'start': start_time,
+            'end': end_time,
+            'incremental': True,
+        },
+        'memory_avg': config.get_promql_query('memory', 'average_usage'),
+        'memory_max': config.get_promql_query('memory', 'max_usage'),
+        'memory_p95': config.get_promql_query('memory', 'p95_usage'),
+        'cpu_avg': config.get_promql_query('cpu', 'average_usage'),
+        'cpu_p95': config.get_promql_query('cpu', 'p95_usage'),
+    }
+
+
+@timed('collect')
+def collect(config, prom: PrometheusClient, k8s: K8sClient) -> Dict[str, Any]:
+    """
+    Fetch all Prometheus and Kubernetes data for one check
+
+    Prometheus queries are issued concurrently (total time ~ slowest query);
+    Kubernetes lookups follow in turn.
+
+    Returns:
+        Dict with start_time, queries, batch (raw results by name),
+        deployment, hpa, pods and oom_events
+    """
+    service_config = config.get_service_config()
+    namespace = service_config['namespace']
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=config.get_env('lookback_hours'))
+    prom.cache.start_run()
+    discover_recorded_series(config, prom, [namespace])
+    queries = build_queries(config, start_time, end_time)
+
+    return {
+        'start_time': start_time,
+        'queries': queries,
+        'batch': prom.query_batch(queries),
+        'deployment': k8s.get_deployment(service_config['deployment_name'], namespace),
+        'hpa': k8s.get_hpa(service_config['hpa_name'], namespace),
+        'pods': k8s.get_pods(namespace, f"app={service_config['service_name']}"),
+        'oom_events': k8s.get_oom_events(namespace, service_config['service_name'], since=start_time),
+    }
+
+
+@timed('collect')
+async def collect_async(config, prom: 'AsyncPrometheusClient', k8s: 'AsyncK8sClient') -> Dict[str, Any]:
+    """
+    collect() on one event loop: every Prometheus query and Kubernetes
+    lookup runs concurrently
+
+    QUERY_TIMEOUT bounds each HTTP request; the bound on a whole call leaves
+    room for the client's retries with backoff and for the several requests a
+    cached range query or a paged list may need. A call that still times out
+    or fails is logged and contributes its empty default, the same as a
+    failed call in the synchronous path.
+    """
+    service_config = config.get_service_config()
+    namespace = service_config['namespace']
+    timeout = config.get_env('query_timeout')
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=config.get_env('lookback_hours'))
+    prom.cache.start_run()
+    await adiscover_recorded_series(config, prom, [namespace])
+    queries = build_queries(config, start_time, end_time)
+
+    async def bounded(name: str, call: Awaitable, default: Any, budget: float) -> Any:
+        try:
+            return await asyncio.wait_for(call, budget)
+        except asyncio.TimeoutError:
+            logger.warning(f"{name} timed out after {budget:.0f}s")
+            return default
+        except Exception as e:
+            logger.error(f"{name} failed: {e}")
+            return default
+
+    def prom_budget(spec: Any) -> float:
+        if isinstance(spec, str):
+            return prom.request_budget()
+        return prom.request_budget(prom.range_requests(spec['start'], spec['end'], incremental=spec['incremental']))
+
+    async def prom_query(spec: Any) -> Any:
+        if isinstance(spec, str):
+            return await prom.query(spec)
+        return await prom.query_range(spec['query'], spec['start'], spec['end'], incremental=spec['incremental'])
+
+    # Kubernetes calls are not retried; lists may span a few pages
+    k8s_budget = timeout * K8S_CALL_REQUESTS
+    prom_results = [bounded(name, prom_query(spec), [], prom_budget(spec)) for name, spec in queries.items()]
+    deployment, hpa, pods, oom_events, *batch = await asyncio.gather(
+        bounded('deployment', k8s.get_deployment(service_config['deployment_name'], namespace), None, k8s_budget),
+        bounded('hpa', k8s.get_hpa(service_config['hpa_name'], namespace), None, k8s_budget),
+        bounded('pods', k8s.get_pods(namespace, f"app={service_config['service_name']}"), [], k8s_budget),
+        bounded('oom_events', k8s.get_oom_events(namespace, service_config['service_name'], since=start_time), [], k8s_budget),
+        *prom_results,
+    )
+
+    return {
+        'start_time': start_time,
+        'queries': queries,
+        'batch': dict(zip(queries, batch)),
+        'deployment': deployment,
+        'hpa': hpa,
+        'pods': pods,
+        'oom_events': oom_events,
+    }
+
+
+def run_check(config, prom: PrometheusClient, k8s: K8sClient) -> CycleResult:
+    """
+    Collect, analyze and render one health check
+
+    Args:
+        config: ConfigLoader
+        prom: Prometheus client
+        k8s: Kubernetes client
+
+    Returns:
+        CycleResult with report data and rendered Markdown / JSON
+    """
+    logger.info("Collecting metrics...")
+    return analyze(config, prom, collect(config, prom, k8s))
+
+
+async def run_check_async(config, prom: 'AsyncPrometheusClient', k8s: 'AsyncK8sClient') -> CycleResult:
+    """run_check() with concurrent async collection"""
+    logger.info("Collecting metrics (async)...")
+    return analyze(config, prom, await collect_async(config, prom, k8s))
+
+
+def analyze(
+    config,
+    prom: PrometheusClient,
+    data: Dict[str, Any],
+    service_config: Optional[Dict[str, str]] = None
+) -> CycleResult:
+    """
+    Analyze collected data and render the report
+
+    Args:
+        config: ConfigLoader
+        prom: Prometheus client (result conversion only, no queries)
+        data: Output of collect() / collect_async() / collect_fleet()
+        service_config: Target service (defaults to the env-configured service)
+
+    Returns:
+        CycleResult with report data and rendered Markdown / JSON
+    """
+    service_config = service_config or config.get_service_config()
+    batch = data['batch']
+    deployment = data['deployment']
+    hpa = data['hpa']
+    pods = data['pods']
+    oom_events = data['oom_events']
+
+    with span('analysis.convert', service=service_config['service_name']):
+        memory_series = prom.to_time_series(batch['memory_series'])
+        scalars = {
+            name: prom.to_scalar(batch[name], promql) or 0
+            for name, promql in data['queries'].items() if isinstance(promql, str)
+        }
 
-        # 3. Collect data
-        logger.info("Collecting metrics...")
-        end_time = datetime.now()
-        start_time = end_time - timedelta(hours=config.get_env('lookback_hours'))
-
-        # Memory metrics
-        memory_query = config.get_promql_query('memory', 'usage_over_time')
-        memory_series = prom.get_time_series(memory_query, start_time, end_time)
-
-        memory_current = config.get_promql_query('memory', 'current_usage')
-        memory_avg = prom.get_scalar_value(config.get_promql_query('memory', 'average_usage')) or 0
-        memory_max = prom.get_scalar_value(config.get_promql_query('memory', 'max_usage')) or 0
-        memory_p95 = prom.get_scalar_value(config.get_promql_query('memory', 'p95_usage')) or 0
-
-        # CPU metrics
-        cpu_avg = prom.get_scalar_value(config.get_promql_query('cpu', 'average_usage')) or 0
-        cpu_p95 = prom.get_scalar_value(config.get_promql_query('cpu', 'p95_usage')) or 0
-
-        # K8s resources
-        deployment = k8s.get_deployment(service_config['deployment_name'], service_config['namespace'])
-        hpa = k8s.get_hpa(service_config['hpa_name'], service_config['namespace'])
-        pods = k8s.get_pods(service_config['namespace'], f"app={service_config['service_name']}")
-        oom_events = k8s.get_oom_events(service_config['namespace'], service_config['service_name'], since=start_time)
-
-        # Extract resource specs
-        container_spec = deployment['containers'].get(service_config['container_name'], {}) if deployment else {}
-        resources = container_spec.get('resources', {})
-        memory_request = resources.get('requests', {}).get('memory', 0)
-        memory_limit = resources.get('limits', {}).get('memory', 0)
-        cpu_request = resources.get('requests', {}).get('cpu', 0)
-        cpu_limit = resources.get('limits', {}).get('cpu', 0)
-
-        # 4. Analyze data
-        logger.info("Analyzing metrics...")
-        analyzer = HealthAnalyzer(config.get_all_thresholds())
-
-        # Memory trend analysis
+    memory_avg = scalars['memory_avg']
+    memory_max = scalars['memory_max']
+    memory_p95 = scalars['memory_p95']
+    cpu_avg = scalars['cpu_avg']
+    cpu_p95 = scalars['cpu_p95']
+
+    # Extract resource specs
+    container_spec = deployment['containers'].get(service_config['container_name'], {}) if deployment else {}
+    resources = container_spec.get('resources', {})
+    memory_request = resources.get('requests', {}).get('memory', 0)
+    memory_limit = resources.get('limits', {}).get('memory', 0)
+    cpu_request = resources.get('requests', {}).get('cpu', 0)
+    cpu_limit = resources.get('limits', {}).get('cpu', 0)
+
+    # 4. Analyze data
+    logger.info("Analyzing metrics...")
+    analyzer = HealthAnalyzer(config.get_all_thresholds())
+
+    # Memory trend analysis
+    with span('analysis.memory_trend'):
         memory_trend = analyzer.analyze_memory_trend(memory_series)
 
-        # Resource allocation analysis
+    # Resource allocation analysis
+    with span('analysis.resource_allocation'):
         memory_allocation = analyzer.analyze_resource_allocation(
             memory_avg, memory_p95, memory_request, memory_limit, 'memory'
         )
@@ -95,8 +291,9 @@ def main():
             cpu_avg, cpu_p95, cpu_request, cpu_limit, 'cpu'
         )
 
-        # HPA behavior
-        total_restarts = sum(pod['restart_count'] for pod in pods)
+    # HPA behavior
+    total_restarts = sum(pod['restart_count'] for pod in pods)
+    with span('analysis.hpa'):
         hpa_analysis = analyzer.analyze_hpa_behavior(
             hpa['current_replicas'] if hpa else 0,
             hpa['min_replicas'] if hpa else 0,
@@ -106,107 +303,319 @@ def main():
             hpa['metrics'] if hpa else []
         )
 
-        # Events analysis
+    # Events analysis
+    with span('analysis.events'):
         events_analysis = analyzer.analyze_events(oom_events, total_restarts)
 
-        # Collect all issues
-        all_issues = []
-        all_issues.extend(memory_allocation.get('issues', []))
-        all_issues.extend(cpu_allocation.get('issues', []))
-        all_issues.extend(hpa_analysis.get('issues', []))
-        all_issues.extend(events_analysis.get('issues', []))
-
-        # Calculate overall status
-        overall_status = analyzer.calculate_overall_status(all_issues)
-
-        # 5. Generate report
-        logger.info("Generating report...")
-        report_data = {
-            'metadata': {
-                'generated_at': datetime.now().isoformat(),
-                'service': service_config['service_name'],
-                'namespace': service_config['namespace'],
-                'lookback_hours': config.get_env('lookback_hours'),
+    # Collect all issues
+    all_issues = []
+    all_issues.extend(memory_trend.get('issues', []))
+    all_issues.extend(memory_allocation.get('issues', []))
+    all_issues.extend(cpu_allocation.get('issues', []))
+    all_issues.extend(hpa_analysis.get('issues', []))
+    all_issues.extend(events_analysis.get('issues', []))
+
+    # Calculate overall status
+    overall_status = analyzer.calculate_overall_status(all_issues)
+
+    # 5. Generate report
+    logger.info("Generating report...")
+    report_data = {
+        'metadata': {
+            'generated_at': datetime.now().isoformat(),
+            'service': service_config['service_name'],
+            'namespace': service_config['namespace'],
+            'lookback_hours': config.get_env('lookback_hours'),
+        },
+        'summary': {
+            'overall_status': overall_status,
+            'issue_count': len(all_issues),
+            'critical_count': sum(1 for i in all_issues if i['severity'] == 'CRITICAL'),
+            'warning_count': sum(1 for i in all_issues if i['severity'] in ['WARNING', 'HIGH', 'MEDIUM']),
+        },
+        'metrics': {
+            'memory': {
+                'avg_mi': memory_avg / (1024**2),
+                'max_mi': memory_max / (1024**2),
+                'p95_mi': memory_p95 / (1024**2),
+                'limit_mi': memory_limit / (1024**2),
+                'usage_pct': (memory_avg / memory_limit * 100) if memory_limit > 0 else 0,
+                'slope_mb_per_hour': memory_trend.get('slope_mb_per_hour', 0),
             },
-            'summary': {
-                'overall_status': overall_status,
-                'issue_count': len(all_issues),
-                'critical_count': sum(1 for i in all_issues if i['severity'] == 'CRITICAL'),
-                'warning_count': sum(1 for i in all_issues if i['severity'] in ['WARNING', 'HIGH', 'MEDIUM']),
+            'cpu': {
+                'avg_cores': cpu_avg,
+                'p95_cores': cpu_p95,
             },
-            'metrics': {
+            'hpa': hpa or {},
+        },
+        'analysis': {
+            'memory_trend': memory_trend,
+            'resource_allocation': {
                 'memory': {
-                    'avg_mi': memory_avg / (1024**2),
-                    'max_mi': memory_max / (1024**2),
-                    'p95_mi': memory_p95 / (1024**2),
+                    'request_mi': memory_request / (1024**2),
                     'limit_mi': memory_limit / (1024**2),
-                    'usage_pct': (memory_avg / memory_limit * 100) if memory_limit > 0 else 0,
-                    'slope_mb_per_hour': memory_trend.get('slope_mb_per_hour', 0),
+                    **memory_allocation
                 },
                 'cpu': {
-                    'avg_cores': cpu_avg,
-                    'p95_cores': cpu_p95,
-                },
-                'hpa': hpa or {},
-            },
-            'analysis': {
-                'memory_trend': memory_trend,
-                'resource_allocation': {
-                    'memory': {
-                        'request_mi': memory_request / (1024**2),
-                        'limit_mi': memory_limit / (1024**2),
-                        **memory_allocation
-                    },
-                    'cpu': {
-                        'request_cores': cpu_request,
-                        'limit_cores': cpu_limit,
-                        **cpu_allocation
-                    },
+                    'request_cores': cpu_request,
+                    'limit_cores': cpu_limit,
+                    **cpu_allocation
                 },
-                'hpa': hpa_analysis,
-                'events': events_analysis,
             },
-            'issues': all_issues,
-        }
+            'hpa': hpa_analysis,
+            'events': events_analysis,
+        },
+        'issues': all_issues,
+    }
 
+    with span('report.render', service=service_config['service_name']):
         reporter = Reporter(use_emoji=True)
-        markdown_report = reporter.generate_markdown(report_data)
-        json_report = reporter.generate_json(report_data)
+        return CycleResult(report_data, reporter.generate_markdown(report_data), reporter.generate_json(report_data))
 
-        # 6. Save reports
-        logger.info("Saving reports...")
-        report_dir = Path(config.get_env('report_dir'))
-        report_dir.mkdir(parents=True, exist_ok=True)
 
-        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-        markdown_file = report_dir / f"health-check-{timestamp}.md"
-        json_file = report_dir / f"health-check-{timestamp}.json"
+@timed('report.save')
+def save_reports(config, result: CycleResult, name: Optional[str] = None) -> Tuple[Path, Path]:
+    """
+    Write Markdown and JSON reports to the report directory
 
-        markdown_file.write_text(markdown_report)
-        json_file.write_text(json_report)
+    Args:
+        config: ConfigLoader
+        result: Cycle result to save
+        name: File stem (defaults to health-check-<timestamp>)
 
-        logger.info(f"Reports saved: {markdown_file}, {json_file}")
+    Returns:
+        (markdown_file, json_file)
+    """
+    report_dir = Path(config.get_env('report_dir'))
+    report_dir.mkdir(parents=True, exist_ok=True)
+
+    name = name or f"health-check-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    markdown_file = report_dir / f"{name}.md"
+    json_file = report_dir / f"{name}.json"
+
+    markdown_file.write_text(result.markdown)
+    json_file.write_text(result.json_report)
+
+    logger.info(f"Reports saved: {markdown_file}, {json_file}")
+    return markdown_file, json_file
+
+
+def log_query_stats(prom: PrometheusClient):
+    """Log query cache counters and the requests the run memo answered"""
+    cache_stats = prom.cache.stats()
+    logger.info(f"Query cache ({cache_stats['mode']}): {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+    memo = prom.cache.memo.report()
+    logger.info(
+        f"Query memo: {memo['requests']} requests, {memo['executed']} executed, "
+        f"{memo['memo_hits']} served from memo, {memo['coalesced']} coalesced in flight"
+    )
+    for entry in memo['queries']:
+        logger.info(f"  saved {entry['hits'] + entry['coalesced']}x {entry['kind']}: {entry['query'][:120]}")
+
+
+def send_notification(config, result: CycleResult):
+    """Send the Markdown report to Slack"""
+    notifier = SlackNotifier(
+        bot_token=config.get_env('slack_bot_token'),
+        webhook_url=config.get_env('slack_webhook_url')
+    )
+
+    with span('slack.send') as attrs:
+        attrs['sent'] = notifier.send_report(result.markdown, config.get_env('slack_channel'))
+    if attrs['sent']:
+        logger.info("Slack notification sent successfully")
+    else:
+        logger.warning("Failed to send Slack notification")
+
+
+def finish_profile(profile: RunProfile, status: str):
+    """Stamp the run profile, log the slowest stages and write RUN_PROFILE_PATH / RUN_PROFILE_TEXTFILE"""
+    profile.finish(status)
+    if not profile.enabled:
+        return
+    logger.info(f"Run profile: {profile.duration:.2f}s, {status}")
+    for line in profile.summary_lines():
+        logger.info(f"  {line}")
+    for path in profile.write():
+        logger.info(f"Run profile written: {path}")
 
-        # 7. Send notification
-        logger.info("Sending Slack notification...")
-        notifier = SlackNotifier(
-            bot_token=config.get_env('slack_bot_token'),
-            webhook_url=config.get_env('slack_webhook_url')
-        )
 
-        if notifier.send_report(markdown_report, config.get_env('slack_channel')):
-            logger.info("Slack notification sent successfully")
+def main():
+    """Main health check workflow"""
+    logger.info("=== Exchange Service Health Check Started ===")
+    profile = RunProfile.from_env('exchange', mode='once').activate()
+    status = 'error'
+
+    try:
+        # 1. Load configuration
+        logger.info("Loading configuration...")
+        with span('config.load'):
+            config = get_config()
+
+        # 2. Initialize clients, 3-5. Collect, analyze, generate report
+        logger.info("Initializing clients...")
+        if config.get_env('async_io'):
+            prom, result = asyncio.run(check_once_async(config))
         else:
-            logger.warning("Failed to send Slack notification")
+            prom, k8s = init_clients(config)
+
+            # Check connectivity
+            if not prom.check_connection():
+                logger.error("Failed to connect to Prometheus")
+                sys.exit(1)
+
+            result = run_check(config, prom, k8s)
+        overall_status = result.report_data['summary']['overall_status']
+
+        # 6. Save reports
+        logger.info("Saving reports...")
+        save_reports(config, result)
+
+        # 7. Send notification
+        logger.info("Sending Slack notification...")
+        send_notification(config, result)
 
         # 8. Done
+        log_query_stats(prom)
+        status = 'success'
         logger.info(f"=== Health Check Completed: {overall_status} ===")
         sys.exit(0 if overall_status != 'CRITICAL' else 1)
 
     except Exception as e:
         logger.error(f"Health check failed: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        finish_profile(profile, status)
+
+
+def run_fleet(fleet_file: Optional[str] = None):
+    """
+    Fleet mode: check every target in the fleet config in one process
+
+    All targets share one Prometheus connection pool, one query cache and
+    one Kubernetes client; queries are issued per namespace and split per
+    target locally (see fleet.py). Writes a report per target plus a fleet
+    summary, and sends the summary to Slack.
+    """
+    logger.info("=== Exchange Service Fleet Health Check Started ===")
+    profile = RunProfile.from_env('exchange', mode='fleet').activate()
+    status = 'error'
+
+    try:
+        with span('config.load'):
+            config = get_config()
+            targets = config.get_fleet_targets(fleet_file)
+        prom, k8s = init_clients(config)
+
+        if not prom.check_connection():
+            logger.error("Failed to connect to Prometheus")
+            sys.exit(1)
+
+        logger.info("Collecting metrics...")
+        collected = collect_fleet(config, prom, k8s, targets)
+
+        results = {}
+        for target in targets:
+            key = target_key(target)
+            results[key] = analyze(config, prom, collected[key], target)
+            save_reports(
+                config, results[key],
+                name=f"health-check-{target['namespace']}-{target['service_name']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            )
+
+        summary = render_summary(results)
+        summary_result = CycleResult({'targets': summary['json']}, summary['markdown'], summary['json'])
+        save_reports(config, summary_result, name=f"fleet-summary-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        send_notification(config, summary_result)
+
+        statuses = [r.report_data['summary']['overall_status'] for r in results.values()]
+        log_query_stats(prom)
+        status = 'success'
+        logger.info(f"=== Fleet Health Check Completed: {len(results)} targets, {statuses.count('CRITICAL')} critical ===")
+        sys.exit(1 if 'CRITICAL' in statuses else 0)
+
+    except Exception as e:
+        logger.error(f"Fleet health check failed: {e}", exc_info=True)
+        sys.exit(1)
+    finally:
+        finish_profile(profile, status)
+
+
+def run_daemon():
+    """
+    Resident mode: evaluate every DAEMON_INTERVAL_SECONDS with shared clients
+
+    Clients, the HTTP connection pool, the query cache and the Kubernetes
+    informers are created once. Every cycle refreshes health-check-latest.*;
+    a timestamped report and a Slack notification are only produced when the
+    overall status changes. Each cycle gets its own run profile, so
+    RUN_PROFILE_PATH / RUN_PROFILE_TEXTFILE always describe the latest cycle.
+    """
+    logger.info("=== Exchange Service Health Check Daemon Started ===")
+
+    config = get_config()
+    service_config = config.get_service_config()
+    prom, k8s = init_clients(config)
+
+    while not prom.check_connection():
+        logger.error("Failed to connect to Prometheus, retrying in 30s")
+        time.sleep(30)
+
+    k8s.start_informers(service_config['namespace'])
+
+    previous_status = {'value': None}
+
+    def cycle() -> CycleResult:
+        profile = RunProfile.from_env('exchange', mode='daemon').activate()
+        status = 'error'
+        try:
+            result = run_check(config, prom, k8s)
+            overall_status = result.report_data['summary']['overall_status']
+            save_reports(config, result, name='health-check-latest')
+
+            if overall_status != previous_status['value']:
+                logger.info(f"Overall status changed: {previous_status['value']} -> {overall_status}")
+                save_reports(config, result)
+                send_notification(config, result)
+                previous_status['value'] = overall_status
+
+            log_query_stats(prom)
+            status = 'success'
+            return result
+        finally:
+            finish_profile(profile, status)
+
+    daemon = HealthCheckDaemon(
+        cycle,
+        interval_seconds=config.get_env('daemon_interval_seconds'),
+        host=config.get_env('daemon_host'),
+        port=config.get_env('daemon_port'),
+    )
+    try:
+        daemon.run_forever()
+    finally:
+        k8s.stop_informers()
+        prom.cache.close()
+    logger.info("=== Exchange Service Health Check Daemon Stopped ===")
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Exchange Service Health Check')
+    parser.add_argument(
+        '--daemon', action='store_true',
+        default=os.getenv('RUN_MODE', 'once') == 'daemon',
+        help='Stay resident and re-run on an interval (or set RUN_MODE=daemon)'
+    )
+    parser.add_argument(
+        '--fleet', nargs='?', const='', default=None, metavar='FLEET_YAML',
+        help='Check every target in a fleet config (default FLEET_CONFIG or config/fleet.yaml)'
+    )
+    args = parser.parse_args()
+
+    if args.fleet is not None:
+        run_fleet(args.fleet or None)
+    elif args.daemon:
+        run_daemon()
+    else:
+        main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+List-and-Watch Informer for Exchange Service Health Check
+
+Keeps an in-memory copy of one Kubernetes resource type in one namespace:
+a single initial list, then a watch stream (with bookmarks) that applies
+ADDED / MODIFIED / DELETED events. When the watch expires (410 Gone) the
+informer re-lists. Reads are served from memory.
+
+Each watch request also carries a client-side timeout, so a connection that
+dies silently (dropped NAT entry, API server failover) is noticed and the
+watch reopens from the last resourceVersion. is_current() reports whether
+the API server has been heard from recently; callers fall back to direct
+API calls while it has not.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+logger = logging.getLogger(__name__)
+
+# Server-side watch timeout; the stream is reopened from the last resourceVersion
+WATCH_TIMEOUT_SECONDS = 300
+# Client-side read timeout on top of the server-side one (detects dead connections)
+WATCH_REQUEST_MARGIN_SECONDS = 30
+# No event, bookmark or clean stream end for this long marks the cache stale
+STALE_AFTER_SECONDS = 2 * (WATCH_TIMEOUT_SECONDS + WATCH_REQUEST_MARGIN_SECONDS)
+# Delay before retrying after an unexpected watch error (doubles up to the max)
+RETRY_BACKOFF_SECONDS = 1
+RETRY_BACKOFF_MAX_SECONDS = 60
+
+
+class Informer:
+    """In-memory, watch-driven cache of one resource type in one namespace"""
+
+    def __init__(self, list_func: Callable, namespace: str, resource: str):
+        """
+        Initialize informer (call start() to begin listing/watching)
+
+        Args:
+            list_func: Namespaced list API method (e.g. CoreV1Api.list_namespaced_pod)
+            namespace: Namespace to watch
+            resource: Name used in log messages (e.g. 'pods')
+        """
+        self.list_func = list_func
+        self.namespace = namespace
+        self.resource = resource
+        self.resource_version: Optional[str] = None
+        self.list_calls = 0
+        self._items: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._last_seen = 0.0
+        self._current = True
+        self._watch: Optional[watch.Watch] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'Informer':
+        """Start the list/watch loop in a daemon thread"""
+        self._thread = threading.Thread(
+            target=self._run, name=f"informer-{self.resource}-{self.namespace}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching"""
+        self._stopped.set()
+        if self._watch:
+            self._watch.stop()
+
+    def wait_for_sync(self, timeout: Optional[float] = None) -> bool:
+        """Block until the initial list has been loaded; returns False on timeout"""
+        return self._synced.wait(timeout)
+
+    @property
+    def has_synced(self) -> bool:
+        return self._synced.is_set()
+
+    def is_current(self) -> bool:
+        """Synced, and the API server was heard from within STALE_AFTER_SECONDS"""
+        if not self._synced.is_set():
+            return False
+        age = time.monotonic() - self._last_seen
+        current = age < STALE_AFTER_SECONDS
+        if current != self._current:
+            self._current = current
+            if current:
+                logger.info(f"Informer {self.resource}/{self.namespace}: watch resumed")
+            else:
+                logger.warning(
+                    f"Informer {self.resource}/{self.namespace}: no watch activity for {age:.0f}s, "
+                    f"cache is stale"
+                )
+        return current
+
+    def get(self, name: str) -> Optional[Any]:
+        """Cached object by name (None if absent)"""
+        with self._lock:
+            return self._items.get(name)
+
+    def list(self, predicate: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        """Cached objects, optionally filtered"""
+        with self._lock:
+            items = list(self._items.values())
+        return [item for item in items if predicate is None or predicate(item)]
+
+    def _relist(self):
+        """Replace the cache with a full list and remember its resourceVersion"""
+        result = self.list_func(self.namespace)
+        self.list_calls += 1
+        with self._lock:
+            self._items = {item.metadata.name: item for item in result.items}
+        self.resource_version = result.metadata.resource_version
+        self._last_seen = time.monotonic()
+        self._synced.set()
+        logger.debug(f"Informer {self.resource}/{self.namespace}: listed {len(result.items)} objects")
+
+    def _apply(self, event: Dict[str, Any]):
+        """Apply one watch event to the cache"""
+        event_type = event['type']
+        raw_metadata = event['raw_object'].get('metadata', {})
+
+        if event_type != 'BOOKMARK':
+            obj = event['object']
+            with self._lock:
+                if event_type == 'DELETED':
+                    self._items.pop(obj.metadata.name, None)
+                else:
+                    self._items[obj.metadata.name] = obj
+
+        self.resource_version = raw_metadata.get('resourceVersion', self.resource_version)
+        self._last_seen = time.monotonic()
+
+    def _run(self):
+        backoff = RETRY_BACKOFF_SECONDS
+        while not self._stopped.is_set():
+            try:
+                if self.resource_version is None:
+                    self._relist()
+
+                self._watch = watch.Watch()
+                for event in self._watch.stream(
+                    self.list_func,
+                    self.namespace,
+                    resource_version=self.resource_version,
+                    allow_watch_bookmarks=True,
+                    timeout_seconds=WATCH_TIMEOUT_SECONDS,
+                    _request_timeout=WATCH_TIMEOUT_SECONDS + WATCH_REQUEST_MARGIN_SECONDS,
+                ):
+                    self._apply(event)
+                    if self._stopped.is_set():
+                        break
+                # The server closed the stream at its timeout: the connection was alive
+                self._last_seen = time.monotonic()
+                backoff = RETRY_BACKOFF_SECONDS
+
+            except ApiException as e:
+                if e.status == 410:
+                    # resourceVersion too old: start over with a fresh list
+                    logger.info(f"Informer {self.resource}/{self.namespace}: watch expired, re-listing")
+                    self.resource_version = None
+                    continue
+                logger.warning(f"Informer {self.resource}/{self.namespace}: watch failed: {e}")
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+
+            except Exception as e:
+                logger.warning(f"Informer {self.resource}/{self.namespace}: watch error: {e}")
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+
+
+def is_simple_selector(selector: Optional[str]) -> bool:
+    """True if a label selector only uses equality/existence terms (no in / notin)"""
+    return not selector or not any(
+        ' in ' in term or ' notin ' in term or '(' in term for term in selector.split(',')
+    )
+
+
+def match_labels(labels: Optional[Dict[str, str]], selector: Optional[str]) -> bool:
+    """
+    Evaluate an equality-based label selector against a label dict
+
+    Supports 'k=v', 'k==v', 'k!=v', 'k' and '!k' terms joined by commas;
+    check is_simple_selector() first and send set-based selectors to the
+    API server instead.
+
+    Args:
+        labels: Object labels
+        selector: Label selector string
+
+    Returns:
+        True if every term matches
+    """
+    labels = labels or {}
+    for term in (t.strip() for t in (selector or '').split(',')):
+        if not term:
+            continue
+        if '!=' in term:
+            key, value = (p.strip() for p in term.split('!=', 1))
+            if labels.get(key) == value:
+                return False
+        elif '=' in term:
+            key, value = (p.strip() for p in term.replace('==', '=').split('=', 1))
+            if labels.get(key) != value:
+                return False
+        elif term.startswith('!'):
+            if term[1:].strip() in labels:
+                return False
+        elif term not in labels:
+            return False
+
+    return True
@@ -3,16 +3,38 @@
 Kubernetes Client for Exchange Service Health Check
 
 Wrapper around Kubernetes Python client for querying cluster resources.
+Getters read from list-and-watch informers once start_informers() has been
+called for a namespace, and fall back to direct API calls otherwise (also
+while an informer's watch has gone quiet, see Informer.is_current). Direct
+calls request raw JSON (_preload_content=False) and page through lists, so
+only the fields exposed here are turned into Python objects.
 """
 
+import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterator, List, Any, Optional, Sequence, Tuple
 from datetime import datetime, timezone
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 
+from informer import Informer, is_simple_selector, match_labels
+from health_check_common.run_profile import timed
+
 logger = logging.getLogger(__name__)
 
+INFORMER_RESOURCES = ('deployments', 'pods', 'hpas', 'events')
+
+# Page size (limit) for raw list calls
+LIST_PAGE_SIZE = 500
+
+# Event fields that can be filtered from the informer cache (field selector key -> getter)
+EVENT_FIELDS = {
+    'reason': lambda e: e.reason,
+    'type': lambda e: e.type,
+    'involvedObject.name': lambda e: e.involved_object.name,
+    'involvedObject.kind': lambda e: e.involved_object.kind,
+}
+
 
 class K8sClient:
     """Client for querying Kubernetes resources"""
@@ -35,11 +57,65 @@ class K8sClient:
             self.core_v1 = client.CoreV1Api()
             self.apps_v1 = client.AppsV1Api()
             self.autoscaling_v2 = client.AutoscalingV2Api()
+            self.informers: Dict[Tuple[str, str], Informer] = {}
 
         except Exception as e:
             logger.error(f"Failed to initialize Kubernetes client: {e}")
             raise
 
+    def start_informers(
+        self,
+        namespace: str,
+        resources: Sequence[str] = INFORMER_RESOURCES,
+        sync_timeout: float = 30
+    ) -> bool:
+        """
+        Start list-and-watch informers for a namespace
+
+        Each resource type is listed once, then kept current by a watch
+        stream. Getters for this namespace read from memory afterwards.
+
+        Args:
+            namespace: Namespace to watch
+            resources: Resource types ('deployments', 'pods', 'hpas', 'events')
+            sync_timeout: Seconds to wait for the initial lists
+
+        Returns:
+            True if every informer finished its initial list in time
+        """
+        list_funcs = {
+            'deployments': self.apps_v1.list_namespaced_deployment,
+            'pods': self.core_v1.list_namespaced_pod,
+            'hpas': self.autoscaling_v2.list_namespaced_horizontal_pod_autoscaler,
+            'events': self.core_v1.list_namespaced_event,
+        }
+
+        started = []
+        for resource in resources:
+            key = (resource, namespace)
+            if key not in self.informers:
+                self.informers[key] = Informer(list_funcs[resource], namespace, resource).start()
+            started.append(self.informers[key])
+
+        synced = all(informer.wait_for_sync(sync_timeout) for informer in started)
+        if synced:
+            logger.info(f"Informers synced for {namespace}: {', '.join(resources)}")
+        else:
+            logger.warning(f"Informers for {namespace} not synced after {sync_timeout}s, using direct API calls")
+        return synced
+
+    def stop_informers(self):
+        """Stop all informers"""
+        for informer in self.informers.values():
+            informer.stop()
+        self.informers.clear()
+
+    def _informer(self, resource: str, namespace: str) -> Optional[Informer]:
+        """Synced informer with a live watch for resource/namespace, or None (use the API)"""
+        informer = self.informers.get((resource, namespace))
+        return informer if informer and informer.is_current() else None
+
+    @timed('k8s.get_deployment')
     def get_deployment(self, name: str, namespace: str) -> Optional[Dict[str, Any]]:
         """
         Get deployment information
@@ -51,21 +127,20 @@ class K8sClient:
         Returns:
             Deployment details or None if not found
         """
+        informer = self._informer('deployments', namespace)
+        if informer:
+            deployment = informer.get(name)
+            if deployment is None:
+                logger.warning(f"Deployment not found: {namespace}/{name}")
+                return None
+            return self._format_deployment(deployment)
+
         try:
-            deployment = self.apps_v1.read_namespaced_deployment(name, namespace)
-
-            return {
-                'name': deployment.metadata.name,
-                'namespace': deployment.metadata.namespace,
-                'replicas': {
-                    'desired': deployment.spec.replicas,
-                    'available': deployment.status.available_replicas or 0,
-                    'unavailable': deployment.status.unavailable_replicas or 0,
-                    'ready': deployment.status.ready_replicas or 0,
-                },
-                'containers': self._extract_container_specs(deployment.spec.template.spec.containers),
-                'created_at': deployment.metadata.creation_timestamp,
-            }
+            response = self.apps_v1.read_namespaced_deployment(name, namespace, _preload_content=False)
+            try:
+                return self._format_raw_deployment(json.loads(response.data))
+            finally:
+                response.release_conn()
 
         except ApiException as e:
             if e.status == 404:
@@ -74,32 +149,104 @@ class K8sClient:
                 logger.error(f"Failed to get deployment: {e}")
             return None
 
+    @timed('k8s.list_deployments')
+    def list_deployments(self, namespace: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get all deployments in a namespace (one list call, for fleet mode)
+
+        Args:
+            namespace: Namespace
+
+        Returns:
+            Dict mapping deployment name to deployment details
+        """
+        informer = self._informer('deployments', namespace)
+        if informer:
+            return {d.metadata.name: self._format_deployment(d) for d in informer.list()}
+
+        try:
+            deployments = self._list_raw(self.apps_v1.list_namespaced_deployment, namespace)
+            return {d['metadata']['name']: self._format_raw_deployment(d) for d in deployments}
+
+        except ApiException as e:
+            logger.error(f"Failed to list deployments: {e}")
+            return {}
+
+    def _format_deployment(self, deployment: Any) -> Dict[str, Any]:
+        """Convert a V1Deployment to the health check dict"""
+        return {
+            'name': deployment.metadata.name,
+            'namespace': deployment.metadata.namespace,
+            'replicas': {
+                'desired': deployment.spec.replicas,
+                'available': deployment.status.available_replicas or 0,
+                'unavailable': deployment.status.unavailable_replicas or 0,
+                'ready': deployment.status.ready_replicas or 0,
+            },
+            'containers': self._extract_container_specs(deployment.spec.template.spec.containers),
+            'created_at': deployment.metadata.creation_timestamp,
+        }
+
+    def _format_raw_deployment(self, deployment: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a raw JSON deployment to the health check dict"""
+        metadata = deployment.get('metadata') or {}
+        spec = deployment.get('spec') or {}
+        status = deployment.get('status') or {}
+        containers = ((spec.get('template') or {}).get('spec') or {}).get('containers') or []
+        return {
+            'name': metadata.get('name'),
+            'namespace': metadata.get('namespace'),
+            'replicas': {
+                'desired': spec.get('replicas'),
+                'available': status.get('availableReplicas') or 0,
+                'unavailable': status.get('unavailableReplicas') or 0,
+                'ready': status.get('readyReplicas') or 0,
+            },
+            'containers': {
+                container['name']: self._container_spec(
+                    container.get('image'),
+                    (container.get('resources') or {}).get('requests'),
+                    (container.get('resources') or {}).get('limits'),
+                )
+                for container in containers
+            },
+            'created_at': _parse_time(metadata.get('creationTimestamp')),
+        }
+
     def _extract_container_specs(self, containers: List[Any]) -> Dict[str, Dict[str, Any]]:
         """Extract resource specs from container definitions"""
         container_specs = {}
 
         for container in containers:
             resources = container.resources or client.V1ResourceRequirements()
-
-            requests = resources.requests or {}
-            limits = resources.limits or {}
-
-            container_specs[container.name] = {
-                'image': container.image,
-                'resources': {
-                    'requests': {
-                        'memory': self._parse_memory(requests.get('memory', '0')),
-                        'cpu': self._parse_cpu(requests.get('cpu', '0')),
-                    },
-                    'limits': {
-                        'memory': self._parse_memory(limits.get('memory', '0')),
-                        'cpu': self._parse_cpu(limits.get('cpu', '0')),
-                    },
-                },
-            }
+            container_specs[container.name] = self._container_spec(container.image, resources.requests, resources.limits)
 
         return container_specs
 
+    def _container_spec(
+        self,
+        image: Optional[str],
+        requests: Optional[Dict[str, str]],
+        limits: Optional[Dict[str, str]]
+    ) -> Dict[str, Any]:
+        """Build one container's image / resources entry"""
+        requests = requests or {}
+        limits = limits or {}
+
+        return {
+            'image': image,
+            'resources': {
+                'requests': {
+                    'memory': self._parse_memory(requests.get('memory', '0')),
+                    'cpu': self._parse_cpu(requests.get('cpu', '0')),
+                },
+                'limits': {
+                    'memory': self._parse_memory(limits.get('memory', '0')),
+                    'cpu': self._parse_cpu(limits.get('cpu', '0')),
+                },
+            },
+        }
+
     def _parse_memory(self, memory_str: str) -> int:
         """Parse memory string to bytes (e.g., '4Gi' -> 4294967296)"""
         if not memory_str or memory_str == '0':
@@ -145,6 +292,7 @@ class K8sClient:
             logger.warning(f"Failed to parse CPU: {cpu_str}")
             return 0.0
 
+    @timed('k8s.get_pods')
     def get_pods(self, namespace: str, label_selector: str) -> List[Dict[str, Any]]:
         """
         Get pods matching label selector
@@ -156,26 +304,45 @@ class K8sClient:
         Returns:
             List of pod details
         """
-        try:
-            pods = self.core_v1.list_namespaced_pod(namespace, label_selector=label_selector)
+        informer = self._informer('pods', namespace)
+        if informer and is_simple_selector(label_selector):
+            pods = informer.list(lambda pod: match_labels(pod.metadata.labels, label_selector))
+            return [self._format_pod(pod) for pod in pods]
 
-            pod_list = []
-            for pod in pods.items:
-                pod_list.append({
-                    'name': pod.metadata.name,
-                    'namespace': pod.metadata.namespace,
-                    'phase': pod.status.phase,
-                    'created_at': pod.metadata.creation_timestamp,
-                    'node': pod.spec.node_name,
-                    'restart_count': self._get_total_restarts(pod.status.container_statuses),
-                })
-
-            return pod_list
+        try:
+            return [
+                self._format_raw_pod(pod)
+                for pod in self._list_raw(self.core_v1.list_namespaced_pod, namespace, label_selector=label_selector)
+            ]
 
         except ApiException as e:
             logger.error(f"Failed to list pods: {e}")
             return []
 
+    def _format_pod(self, pod: Any) -> Dict[str, Any]:
+        """Convert a V1Pod to the health check dict"""
+        return {
+            'name': pod.metadata.name,
+            'namespace': pod.metadata.namespace,
+            'phase': pod.status.phase,
+            'created_at': pod.metadata.creation_timestamp,
+            'node': pod.spec.node_name,
+            'restart_count': self._get_total_restarts(pod.status.container_statuses),
+        }
+
+    def _format_raw_pod(self, pod: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a raw JSON pod to the health check dict"""
+        metadata = pod.get('metadata') or {}
+        status = pod.get('status') or {}
+        return {
+            'name': metadata.get('name'),
+            'namespace': metadata.get('namespace'),
+            'phase': status.get('phase'),
+            'created_at': _parse_time(metadata.get('creationTimestamp')),
+            'node': (pod.get('spec') or {}).get('nodeName'),
+            'restart_count': sum(s.get('restartCount') or 0 for s in status.get('containerStatuses') or []),
+        }
+
     def _get_total_restarts(self, container_statuses: Optional[List[Any]]) -> int:
         """Calculate total restart count across all containers"""
         if not container_statuses:
@@ -183,6 +350,7 @@ class K8sClient:
 
         return sum(status.restart_count for status in container_statuses)
 
+    @timed('k8s.get_hpa')
     def get_hpa(self, name: str, namespace: str) -> Optional[Dict[str, Any]]:
         """
         Get HorizontalPodAutoscaler information
@@ -194,19 +362,17 @@ class K8sClient:
         Returns:
             HPA details or None if not found
         """
+        informer = self._informer('hpas', namespace)
+        if informer:
+            hpa = informer.get(name)
+            if hpa is None:
+                logger.warning(f"HPA not found: {namespace}/{name}")
+                return None
+            return self._format_hpa(hpa)
+
         try:
             hpa = self.autoscaling_v2.read_namespaced_horizontal_pod_autoscaler(name, namespace)
-
-            return {
-                'name': hpa.metadata.name,
-                'namespace': hpa.metadata.namespace,
-                'min_replicas': hpa.spec.min_replicas,
-                'max_replicas': hpa.spec.max_replicas,
-                'current_replicas': hpa.status.current_replicas or 0,
-                'desired_replicas': hpa.status.desired_replicas or 0,
-                'metrics': self._extract_hpa_metrics(hpa.spec.metrics),
-                'current_metrics': self._extract_current_metrics(hpa.status.current_metrics),
-            }
+            return self._format_hpa(hpa)
 
         except ApiException as e:
             if e.status == 404:
@@ -215,6 +381,89 @@ class K8sClient:
                 logger.error(f"Failed to get HPA: {e}")
             return None
 
+    @timed('k8s.list_hpas')
+    def list_hpas(self, namespace: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get all HorizontalPodAutoscalers in a namespace (one list call, for fleet mode)
+
+        Args:
+            namespace: Namespace
+
+        Returns:
+            Dict mapping HPA name to HPA details
+        """
+        informer = self._informer('hpas', namespace)
+        if informer:
+            return {h.metadata.name: self._format_hpa(h) for h in informer.list()}
+
+        try:
+            hpas = self._list_raw(self.autoscaling_v2.list_namespaced_horizontal_pod_autoscaler, namespace)
+            return {h['metadata']['name']: self._format_raw_hpa(h) for h in hpas}
+
+        except ApiException as e:
+            logger.error(f"Failed to list HPAs: {e}")
+            return {}
+
+    def _format_hpa(self, hpa: Any) -> Dict[str, Any]:
+        """Convert a V2HorizontalPodAutoscaler to the health check dict"""
+        return {
+            'name': hpa.metadata.name,
+            'namespace': hpa.metadata.namespace,
+            'min_replicas': hpa.spec.min_replicas,
+            'max_replicas': hpa.spec.max_replicas,
+            'current_replicas': hpa.status.current_replicas or 0,
+            'desired_replicas': hpa.status.desired_replicas or 0,
+            'metrics': self._extract_hpa_metrics(hpa.spec.metrics),
+            'current_metrics': self._extract_current_metrics(hpa.status.current_metrics),
+        }
+
+    def _format_raw_hpa(self, hpa: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a raw JSON autoscaling/v2 HPA to the health check dict"""
+        metadata = hpa.get('metadata') or {}
+        spec = hpa.get('spec') or {}
+        status = hpa.get('status') or {}
+
+        metrics = []
+        for metric in spec.get('metrics') or []:
+            metric_dict = {'type': metric.get('type')}
+            if metric.get('type') == 'Resource':
+                resource = metric.get('resource') or {}
+                target = resource.get('target') or {}
+                metric_dict['name'] = resource.get('name')
+                if target.get('type') == 'Utilization':
+                    metric_dict['target'] = target.get('averageUtilization')
+                    metric_dict['unit'] = '%'
+                elif target.get('type') == 'AverageValue':
+                    metric_dict['target'] = target.get('averageValue')
+                    metric_dict['unit'] = 'value'
+            metrics.append(metric_dict)
+
+        current_metrics = []
+        for metric in status.get('currentMetrics') or []:
+            metric_dict = {'type': metric.get('type')}
+            if metric.get('type') == 'Resource':
+                resource = metric.get('resource') or {}
+                current = resource.get('current') or {}
+                metric_dict['name'] = resource.get('name')
+                if 'averageUtilization' in current:
+                    metric_dict['current'] = current['averageUtilization']
+                    metric_dict['unit'] = '%'
+                elif 'averageValue' in current:
+                    metric_dict['current'] = current['averageValue']
+                    metric_dict['unit'] = 'value'
+            current_metrics.append(metric_dict)
+
+        return {
+            'name': metadata.get('name'),
+            'namespace': metadata.get('namespace'),
+            'min_replicas': spec.get('minReplicas'),
+            'max_replicas': spec.get('maxReplicas'),
+            'current_replicas': status.get('currentReplicas') or 0,
+            'desired_replicas': status.get('desiredReplicas') or 0,
+            'metrics': metrics,
+            'current_metrics': current_metrics,
+        }
+
     def _extract_hpa_metrics(self, metrics: Optional[List[Any]]) -> List[Dict[str, Any]]:
         """Extract HPA metric targets"""
         if not metrics:
@@ -263,6 +512,7 @@ class K8sClient:
 
         return metric_list
 
+    @timed('k8s.get_events')
     def get_events(
         self,
         namespace: str,
@@ -280,51 +530,141 @@ class K8sClient:
         Returns:
             List of events
         """
-        try:
-            events = self.core_v1.list_namespaced_event(
-                namespace,
-                field_selector=field_selector
+        informer = self._informer('events', namespace)
+        terms = self._parse_event_selector(field_selector)
+        if informer and terms is not None:
+            events = informer.list(
+                lambda event: all(EVENT_FIELDS[field](event) == value for field, value in terms)
             )
+            event_list = [self._format_event(event) for event in events]
+        else:
+            try:
+                event_list = [
+                    self._format_raw_event(item)
+                    for item in self._list_raw(
+                        self.core_v1.list_namespaced_event, namespace, field_selector=field_selector
+                    )
+                ]
+
+            except ApiException as e:
+                logger.error(f"Failed to list events: {e}")
+                return []
+
+        # Filter by time if specified
+        if since:
+            since_utc = since.replace(tzinfo=timezone.utc)
+            event_list = [
+                event for event in event_list
+                if not event['last_timestamp'] or event['last_timestamp'].replace(tzinfo=timezone.utc) >= since_utc
+            ]
+
+        return event_list
+
+    def _list_raw(
+        self,
+        list_func: Callable,
+        namespace: str,
+        page_size: int = LIST_PAGE_SIZE,
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Page through a namespaced list call, yielding raw JSON items
 
-            event_list = []
-            for event in events.items:
-                event_time = event.last_timestamp or event.event_time
-
-                # Filter by time if specified
-                if since and event_time:
-                    if event_time.replace(tzinfo=timezone.utc) < since.replace(tzinfo=timezone.utc):
-                        continue
-
-                event_list.append({
-                    'type': event.type,
-                    'reason': event.reason,
-                    'message': event.message,
-                    'count': event.count or 1,
-                    'first_timestamp': event.first_timestamp,
-                    'last_timestamp': event_time,
-                    'involved_object': {
-                        'kind': event.involved_object.kind,
-                        'name': event.involved_object.name,
-                        'namespace': event.involved_object.namespace,
-                    },
-                })
-
-            return event_list
+        Requests the response without model deserialization
+        (_preload_content=False) and follows metadata.continue with
+        limit=page_size, so at most one page is held in memory.
 
-        except ApiException as e:
-            logger.error(f"Failed to list events: {e}")
-            return []
+        Args:
+            list_func: Namespaced list API method
+            namespace: Namespace
+            page_size: Items per page (limit)
+            **kwargs: Extra list arguments (field_selector, label_selector, ...)
 
+        Yields:
+            Items as plain dicts (camelCase keys, as returned by the API server)
+        """
+        token = None
+        while True:
+            if token:
+                kwargs['_continue'] = token
+            response = list_func(namespace, limit=page_size, _preload_content=False, **kwargs)
+            try:
+                page = json.loads(response.data)
+            finally:
+                response.release_conn()
+
+            yield from page.get('items') or []
+
+            token = (page.get('metadata') or {}).get('continue')
+            if not token:
+                return
+
+    def _parse_event_selector(self, field_selector: Optional[str]) -> Optional[List[Tuple[str, str]]]:
+        """Split 'field=value,...' into terms, or None if it needs the API server"""
+        terms = []
+        for term in filter(None, (field_selector or '').split(',')):
+            field, sep, value = term.partition('=')
+            field = field.strip()
+            if not sep or field.endswith('!') or field not in EVENT_FIELDS:
+                return None
+            terms.append((field, value.lstrip('=').strip()))
+        return terms
+
+    def _format_event(self, event: Any) -> Dict[str, Any]:
+        """Convert a CoreV1Event to the health check dict"""
+        event_time = event.last_timestamp or event.event_time
+        return {
+            'type': event.type,
+            'reason': event.reason,
+            'message': event.message,
+            'count': event.count or 1,
+            'first_timestamp': event.first_timestamp,
+            'last_timestamp': event_time,
+            'involved_object': {
+                'kind': event.involved_object.kind,
+                'name': event.involved_object.name,
+                'namespace': event.involved_object.namespace,
+            },
+        }
+
+    def _format_raw_event(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a raw JSON event to the health check dict"""
+        involved = item.get('involvedObject') or {}
+        return {
+            'type': item.get('type'),
+            'reason': item.get('reason'),
+            'message': item.get('message'),
+            'count': item.get('count') or 1,
+            'first_timestamp': _parse_time(item.get('firstTimestamp')),
+            'last_timestamp': _parse_time(item.get('lastTimestamp') or item.get('eventTime')),
+            'involved_object': {
+                'kind': involved.get('kind'),
+                'name': involved.get('name'),
+                'namespace': involved.get('namespace'),
+            },
+        }
+
+    @timed('k8s.get_oom_events')
     def get_oom_events(self, namespace: str, pod_prefix: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
-        """Get OOMKilled events for pods with specific prefix"""
-        all_events = self.get_events(namespace, since=since)
-
-        oom_events = []
-        for event in all_events:
-            if event['reason'] == 'OOMKilling' and event['involved_object']['name'].startswith(pod_prefix):
-                oom_events.append(event)
+        """
+        Get OOMKilled events for pods with specific prefix
 
-        return oom_events
+        The reason filter runs server-side (field selector); field selectors
+        only match exact names, so the pod prefix is checked here.
+        """
+        events = self.get_events(namespace, field_selector='reason=OOMKilling', since=since)
+        return [event for event in events if (event['involved_object']['name'] or '').startswith(pod_prefix)]
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse an RFC 3339 timestamp from a raw API object"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        logger.warning(f"Failed to parse timestamp: {value}")
+        return None
 
 
 if __name__ == '__main__':
@@ -6,28 +6,98 @@ Wrapper around Prometheus HTTP API for querying metrics.
 """
 
 import requests
+import urllib3
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import contextvars
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from urllib.parse import urljoin
 
+from health_check_common.prom_stream import decode_response
+from timeseries import TimeSeries, parse_matrix
+from health_check_common.query_cache import QueryCache
+from health_check_common.run_profile import span
+
 logger = logging.getLogger(__name__)
 
 
 class PrometheusClient:
     """Client for querying Prometheus metrics"""
 
-    def __init__(self, base_url: str, timeout: int = 30):
+    # Candidate range query resolutions in seconds (15s .. 1d)
+    STEP_CHOICES = (15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400)
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int = 30,
+        max_workers: int = 6,
+        pool_size: Optional[int] = None,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_points: int = 288,
+        cache: Optional[QueryCache] = None
+    ):
         """
         Initialize Prometheus client
 
         Args:
             base_url: Prometheus server URL (e.g., http://prometheus:9090)
             timeout: Query timeout in seconds
+            max_workers: Worker pool size for batched queries
+            pool_size: Keep-alive connections kept per host (defaults to max_workers)
+            max_retries: Retries for failed GET requests (connection errors, 429/5xx)
+            backoff_factor: Exponential backoff factor between retries in seconds
+            max_points: Default number of points per series for range queries without explicit step
+            cache: Optional persistent query cache (see health_check_common.query_cache)
         """
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.max_points = max(1, max_points)
         self.api_base = urljoin(self.base_url, '/api/v1/')
+        self.session = self._create_session(pool_size or self.max_workers, max_retries, backoff_factor)
+        self.cache = cache
+
+    def _create_session(self, pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+        """
+        Create pooled keep-alive HTTP session shared by all queries
+
+        Args:
+            pool_size: Maximum connections kept open per host
+            max_retries: Retry count for idempotent GET requests
+            backoff_factor: Exponential backoff factor between retries
+
+        Returns:
+            Configured requests session
+        """
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=retry)
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    def __enter__(self) -> 'PrometheusClient':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -45,24 +115,32 @@ class PrometheusClient:
         """
         url = urljoin(self.api_base, endpoint)
 
-        try:
-            response = requests.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-
-            data = response.json()
-
-            if data.get('status') != 'success':
-                error_msg = data.get('error', 'Unknown error')
-                raise Exception(f"Prometheus query failed: {error_msg}")
-
-            return data.get('data', {})
-
-        except requests.exceptions.Timeout:
-            logger.error(f"Prometheus query timeout after {self.timeout}s")
-            raise Exception(f"Prometheus query timeout (>{self.timeout}s)")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Prometheus request failed: {e}")
-            raise Exception(f"Prometheus request failed: {e}")
+        with span(f"prometheus.{endpoint}", query=params.get('query', '')) as attrs:
+            try:
+                with self.session.get(url, params=params, timeout=self.timeout, stream=True) as response:
+                    response.raise_for_status()
+
+                    # Decode series by series instead of buffering the whole body
+                    response.raw.decode_content = True
+                    data = decode_response(response.raw)
+
+                if data.get('status') != 'success':
+                    error_msg = data.get('error', 'Unknown error')
+                    raise Exception(f"Prometheus query failed: {error_msg}")
+
+                attrs['series'] = len(data.get('data', {}).get('result') or [])
+                return data.get('data', {})
+
+            except requests.exceptions.Timeout:
+                logger.error(f"Prometheus query timeout after {self.timeout}s")
+                raise Exception(f"Prometheus query timeout (>{self.timeout}s)")
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Prometheus request failed: {e}")
+                raise Exception(f"Prometheus request failed: {e}")
+            except (urllib3.exceptions.HTTPError, ValueError) as e:
+                # Raised while streaming the body (read timeout, dropped connection, truncated JSON)
+                logger.error(f"Prometheus response read failed: {e}")
+                raise Exception(f"Prometheus response read failed: {e}")
 
     def query(self, promql: str, time: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """
@@ -75,14 +153,18 @@ class PrometheusClient:
         Returns:
             List of result items with metrics and values
         """
-        params = {'query': promql}
-
-        if time:
-            params['time'] = time.timestamp()
+        def fetch(at: Optional[float]) -> List[Dict[str, Any]]:
+            params = {'query': promql}
+            if at is not None:
+                params['time'] = at
+            return self._make_request('query', params).get('result', [])
 
         try:
-            data = self._make_request('query', params)
-            result = data.get('result', [])
+            at = time.timestamp() if time else None
+            if self.cache:
+                result = self.cache.query(self.base_url, promql, fetch, at)
+            else:
+                result = fetch(at)
 
             logger.debug(f"Query returned {len(result)} results: {promql[:100]}...")
             return result
@@ -91,12 +173,35 @@ class PrometheusClient:
             logger.error(f"Instant query failed: {e}")
             return []
 
+    def adaptive_step(self, start: datetime, end: datetime, max_points: Optional[int] = None) -> str:
+        """
+        Pick the finest standard step that keeps a series within max_points
+
+        Args:
+            start: Start time
+            end: End time
+            max_points: Points per series the analysis needs (defaults to client setting)
+
+        Returns:
+            Step string (e.g., '5m' for 24h / 288 points, '1h' for 7d / 168 points)
+        """
+        window = max((end - start).total_seconds(), 0)
+        target = window / (max_points or self.max_points)
+        seconds = next((c for c in self.STEP_CHOICES if c >= target), self.STEP_CHOICES[-1])
+
+        for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+            if seconds % size == 0:
+                return f"{seconds // size}{unit}"
+        return f"{seconds}s"
+
     def query_range(
         self,
         promql: str,
         start: datetime,
         end: datetime,
-        step: str = '5m'
+        step: Optional[str] = None,
+        max_points: Optional[int] = None,
+        incremental: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Execute range query
@@ -105,21 +210,35 @@ class PrometheusClient:
             promql: PromQL query string
             start: Start time
             end: End time
-            step: Query resolution step (e.g., '5m', '1h')
+            step: Query resolution step (e.g., '5m', '1h'); chosen from the window when omitted
+            max_points: Points per series used to pick the step when step is omitted
+            incremental: Serve from the cache's series store and only fetch the delta since the last run
 
         Returns:
             List of result items with time series data
         """
-        params = {
-            'query': promql,
-            'start': start.timestamp(),
-            'end': end.timestamp(),
-            'step': step,
-        }
+        step = step or self.adaptive_step(start, end, max_points)
+
+        def fetch(range_start: float, range_end: float) -> List[Dict[str, Any]]:
+            params = {
+                'query': promql,
+                'start': range_start,
+                'end': range_end,
+                'step': step,
+            }
+            return self._make_request('query_range', params).get('result', [])
 
         try:
-            data = self._make_request('query_range', params)
-            result = data.get('result', [])
+            if self.cache and incremental:
+                result = self.cache.query_range_incremental(
+                    self.base_url, promql, start.timestamp(), end.timestamp(), step, fetch
+                )
+            elif self.cache:
+                result = self.cache.query_range(
+                    self.base_url, promql, start.timestamp(), end.timestamp(), step, fetch
+                )
+            else:
+                result = fetch(start.timestamp(), end.timestamp())
 
             logger.debug(f"Range query returned {len(result)} series: {promql[:100]}...")
             return result
@@ -138,8 +257,19 @@ class PrometheusClient:
         Returns:
             Scalar value or None if no result
         """
-        results = self.query(promql)
+        return self.to_scalar(self.query(promql), promql)
 
+    def to_scalar(self, results: List[Dict[str, Any]], promql: str = '') -> Optional[float]:
+        """
+        Convert instant query results into a single scalar value
+
+        Args:
+            results: Raw result list from an instant query
+            promql: Originating query (used for log messages only)
+
+        Returns:
+            Scalar value or None if no result
+        """
         if not results:
             logger.warning(f"No results for scalar query: {promql[:100]}...")
             return None
@@ -178,50 +308,97 @@ class PrometheusClient:
 
         return vector
 
-    def get_time_series(self, promql: str, start: datetime, end: datetime, step: str = '5m') -> Dict[str, List[Tuple[datetime, float]]]:
+    def get_time_series(
+        self,
+        promql: str,
+        start: datetime,
+        end: datetime,
+        step: Optional[str] = None,
+        max_points: Optional[int] = None
+    ) -> Dict[str, TimeSeries]:
         """
         Execute range query and return time series data
 
+        Only the delta since the previous run is fetched when a cache is
+        configured (see query_range incremental).
+
         Args:
             promql: PromQL query
             start: Start time
             end: End time
-            step: Query resolution
+            step: Query resolution (adaptive when omitted)
+            max_points: Points per series used to pick the step when step is omitted
 
         Returns:
-            Dict mapping pod name to list of (timestamp, value) tuples
+            Dict mapping pod name to TimeSeries
         """
-        results = self.query_range(promql, start, end, step)
+        return self.to_time_series(self.query_range(promql, start, end, step, max_points, incremental=True))
 
-        series_data = {}
+    def to_time_series(self, results: List[Dict[str, Any]]) -> Dict[str, TimeSeries]:
+        """
+        Convert range query results into per-pod columnar time series
 
-        for item in results:
-            try:
-                # Extract pod name from labels
-                labels = item.get('metric', {})
-                pod_name = labels.get('pod', 'unknown')
+        Args:
+            results: Raw result list from a range query
 
-                # Parse values (timestamps and values)
-                values = item.get('values', [])
-                series = []
+        Returns:
+            Dict mapping pod name to TimeSeries (epoch timestamps + values arrays)
+        """
+        return parse_matrix(results, key='pod')
 
-                for timestamp, value in values:
-                    try:
-                        dt = datetime.fromtimestamp(float(timestamp))
-                        val = float(value)
-                        series.append((dt, val))
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"Failed to parse time series point: {e}")
-                        continue
+    def query_batch(
+        self,
+        queries: Dict[str, Union[str, Dict[str, Any]]],
+        max_workers: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Execute a named set of queries concurrently
 
-                series_data[pod_name] = series
+        Args:
+            queries: Mapping of name to either a PromQL string (instant query) or
+                     a dict with 'query', 'start', 'end' and optional 'step',
+                     'max_points' or 'incremental' (range query)
+            max_workers: Worker pool size (defaults to the client setting)
 
-            except Exception as e:
-                logger.warning(f"Failed to parse time series: {e}")
-                continue
+        Returns:
+            Dict mapping each name to its raw result list (empty list on failure)
+        """
+        if not queries:
+            return {}
+
+        workers = min(max_workers or self.max_workers, len(queries))
+
+        def run(spec: Union[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+            if isinstance(spec, str):
+                return self.query(spec)
+            return self.query_range(
+                spec['query'], spec['start'], spec['end'], spec.get('step'), spec.get('max_points'),
+                spec.get('incremental', False)
+            )
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prom-query') as executor:
+            # Each task runs in a copy of the caller's context so its spans nest under the caller's
+            futures = {
+                name: executor.submit(contextvars.copy_context().run, run, spec) for name, spec in queries.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+
+        logger.debug(f"Batch of {len(queries)} queries completed with {workers} workers")
+        return results
+
+    def get_scalar_values(self, queries: Dict[str, str], max_workers: Optional[int] = None) -> Dict[str, Optional[float]]:
+        """
+        Execute a named set of scalar queries concurrently
 
-        logger.debug(f"Parsed {len(series_data)} time series")
-        return series_data
+        Args:
+            queries: Mapping of name to PromQL query that returns single value
+            max_workers: Worker pool size (defaults to the client setting)
+
+        Returns:
+            Dict mapping each name to its scalar value (None if no result)
+        """
+        results = self.query_batch(queries, max_workers)
+        return {name: self.to_scalar(results[name], promql) for name, promql in queries.items()}
 
     def check_connection(self) -> bool:
         """
@@ -244,7 +421,7 @@ class PrometheusClient:
         promql: str,
         start: datetime,
         end: datetime,
-        step: str = '5m'
+        step: Optional[str] = None
     ) -> Dict[str, float]:
         """
         Get aggregated statistics (min, max, avg) from time series
@@ -253,7 +430,7 @@ class PrometheusClient:
             promql: PromQL query
             start: Start time
             end: End time
-            step: Query resolution
+            step: Query resolution (adaptive when omitted)
 
         Returns:
             Dict with 'min', 'max', 'avg', 'current' values
@@ -264,24 +441,18 @@ class PrometheusClient:
             return {'min': 0.0, 'max': 0.0, 'avg': 0.0, 'current': 0.0}
 
         # Aggregate across all pods
-        all_values = []
-        current_values = []
-
-        for pod_name, series in series_data.items():
-            values = [val for _, val in series]
-            all_values.extend(values)
+        all_values = np.concatenate([series.values for series in series_data.values()])
 
-            # Current value is the last value
-            if values:
-                current_values.append(values[-1])
+        # Current value is the last value of each pod
+        current_values = [series.last for series in series_data.values() if len(series)]
 
-        if not all_values:
+        if not all_values.size:
             return {'min': 0.0, 'max': 0.0, 'avg': 0.0, 'current': 0.0}
 
         return {
-            'min': min(all_values),
-            'max': max(all_values),
-            'avg': sum(all_values) / len(all_values),
+            'min': float(all_values.min()),
+            'max': float(all_values.max()),
+            'avg': float(all_values.mean()),
             'current': sum(current_values) / len(current_values) if current_values else 0.0,
         }
 
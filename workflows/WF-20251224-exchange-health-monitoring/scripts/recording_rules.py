@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Recording Rules for Exchange Service Health Check
+
+Generates Prometheus recording rules for the expensive window queries listed
+under `recording_rules` in config/promql_queries.yaml (24h avg / max /
+quantile_over_time and the rate()[24h:5m] subqueries). Each rule evaluates the
+query template for a whole namespace (pod / container matchers widened to
+".+") and records it per pod/container as
+pod_container:<category>_<query>:<lookback>.
+
+Evaluation cost: each evaluation of a window rule re-reads the whole window
+of raw samples for every pod, so the window rules run every
+recording_rules.interval (default 1h, 24 evaluations a day; set it to the
+check cadence, e.g. --interval 24h for the daily CronJob alone or the daemon
+interval in daemon mode) rather than every 5m (288 a day). rate()[24h:5m]
+subqueries are not evaluated as such: their inner rate(...[5m]) is recorded
+once per rate_interval into pod_container:<metric>:rate5m by a separate
+group, and the window rules aggregate that series (288 stored points per
+pod) instead of computing 288 rates on every evaluation.
+
+At run time discover_recorded_series() asks Prometheus which of those series
+exist (one cheap query over the recorded names) and hands the result to
+ConfigLoader, whose get_promql_query() then reads the latest recorded value
+(last_over_time over one rule interval) with the original label selector
+instead of re-evaluating the window from raw samples. Namespaces (or
+lookbacks) without rules keep the raw expression.
+
+Recorded values are at most one rule interval old, which is well inside the
+24h windows they summarize.
+
+Usage:
+    python3 recording_rules.py                          # rules for SERVICE_NAMESPACE + fleet namespaces
+    python3 recording_rules.py -n forex-prod -n waas2-prod --lookback 24h -o rules.yaml
+    python3 recording_rules.py --prometheus-rule exchange-health-check   # PrometheusRule (prometheus-operator)
+"""
+
+import re
+import sys
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import yaml
+
+from config_loader import RECORD_PREFIX, alternation, get_config
+
+logger = logging.getLogger(__name__)
+
+# Rule scope: every pod / container of the namespace
+RULE_SCOPE = {'pod_pattern': '.+', 'container': '.+'}
+
+# rate(<metric>{<selector>}[<range>])[<window>:<resolution>] in a normalized expression
+RATE_SUBQUERY = re.compile(
+    r'rate\((?P<metric>[a-zA-Z_:][\w:]*)\{(?P<selector>[^{}]*)\}\[(?P<range>\w+)\]\)'
+    r'\[(?P<window>\w+):(?P<resolution>\w+)\]'
+)
+
+
+def normalize_expr(expr: str) -> str:
+    """Collapse a rendered multi-line template to one line"""
+    return re.sub(r'\s+([)}])', r'\1', re.sub(r'([({])\s+', r'\1', ' '.join(expr.split())))
+
+
+def split_rate_subqueries(expr: str, rate_interval: str, rate_rules: Dict[str, Dict[str, str]]) -> str:
+    """
+    Replace rate()[window:resolution] subqueries by a recorded rate series
+
+    Subqueries whose resolution equals rate_interval read
+    pod_container:<metric>:rate<range> over the window instead; the rule
+    recording that series is added to rate_rules (keyed by record name).
+    Other subqueries are left as they are.
+    """
+    def replace(match: re.Match) -> str:
+        if match.group('resolution') != rate_interval:
+            return match.group(0)
+        metric = re.sub(r'_total$', '', match.group('metric'))
+        record = f"{RECORD_PREFIX}{metric}:rate{match.group('range')}"
+        selector = match.group('selector')
+        rate_rules.setdefault(record, {
+            'record': record,
+            'expr': f"rate({match.group('metric')}{{{selector}}}[{match.group('range')}])",
+        })
+        return f"{record}{{{selector}}}[{match.group('window')}]"
+
+    return RATE_SUBQUERY.sub(replace, expr)
+
+
+def build_rules(
+    config,
+    namespaces: Iterable[str],
+    lookback: str,
+    interval: str,
+    rate_interval: str = '5m'
+) -> Dict[str, Any]:
+    """
+    Prometheus rule file content (per namespace: a rate group and a window group)
+
+    Args:
+        config: ConfigLoader
+        namespaces: Namespaces to record
+        lookback: Window the health check renders queries with (e.g., '24h')
+        interval: Evaluation interval of the window rules
+        rate_interval: Evaluation interval of the recorded inner rates (the subquery resolution)
+
+    Returns:
+        Dict with 'groups', ready for yaml.safe_dump
+    """
+    groups = []
+    for namespace in sorted(set(namespaces)):
+        rules = []
+        rate_rules: Dict[str, Dict[str, str]] = {}
+        for category, query_names in config.get_recording_rules().items():
+            for query_name in query_names:
+                expr = config.get_promql_query(
+                    category, query_name, recorded=False, namespace=namespace, lookback=lookback, **RULE_SCOPE
+                )
+                if not expr:
+                    continue
+                rules.append({
+                    'record': config.recording_rule_name(category, query_name, lookback),
+                    'expr': split_rate_subqueries(normalize_expr(expr), rate_interval, rate_rules),
+                })
+        # Inner rates first: Prometheus evaluates groups independently, the
+        # window rules only need the rate series to exist over the window
+        if rate_rules:
+            groups.append({
+                'name': f"health-check-{namespace}-rates",
+                'interval': rate_interval,
+                'rules': list(rate_rules.values()),
+            })
+        groups.append({'name': f"health-check-{namespace}", 'interval': interval, 'rules': rules})
+    return {'groups': groups}
+
+
+def prometheus_rule(name: str, namespace: str, rules: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap rule groups in a prometheus-operator PrometheusRule resource"""
+    return {
+        'apiVersion': 'monitoring.coreos.com/v1',
+        'kind': 'PrometheusRule',
+        'metadata': {'name': name, 'namespace': namespace, 'labels': {'app': 'exchange-health-check'}},
+        'spec': rules,
+    }
+
+
+def availability_query(config, namespaces: Iterable[str]) -> str:
+    """
+    One query listing which recorded series exist per namespace
+
+    Looks back one rule interval (a plain selector only sees samples from the
+    last 5m) and labels each count with the record name as 'record'.
+    """
+    lookback = f"{config.get_threshold('collection', 'lookback_hours', 24)}h"
+    interval = config.recording_rule_interval()
+    matcher = f'namespace=~"{alternation(list(namespaces))}"'
+    counts = [
+        f'label_replace(count by (namespace) (last_over_time({record}{{{matcher}}}[{interval}])), '
+        f'"record", "{record}", "", "")'
+        for record in (
+            config.recording_rule_name(category, query_name, lookback)
+            for category, query_names in config.get_recording_rules().items()
+            for query_name in query_names
+        )
+    ]
+    return ' or '.join(counts)
+
+
+def apply_availability(config, namespaces: List[str], result: List[Dict[str, Any]]):
+    """Pass the availability query result to ConfigLoader.set_recorded_series"""
+    found = {namespace: set() for namespace in namespaces}
+    for item in result:
+        labels = item.get('metric', {})
+        if labels.get('namespace') in found and labels.get('record'):
+            found[labels['namespace']].add(labels['record'])
+
+    for namespace, names in found.items():
+        config.set_recorded_series(namespace, names)
+        if names:
+            logger.info(f"Using {len(names)} recorded series in {namespace}")
+
+
+def discover_recorded_series(config, prom, namespaces: Iterable[str]):
+    """
+    Look up recorded series so get_promql_query() can use them
+
+    A failed lookup (or RECORDED_SERIES=off) leaves every query on its raw expression.
+
+    Args:
+        config: ConfigLoader
+        prom: PrometheusClient
+        namespaces: Namespaces about to be queried
+    """
+    namespaces = sorted(set(namespaces))
+    if config.get_env('recorded_series') == 'off' or not config.get_recording_rules():
+        return
+    apply_availability(config, namespaces, prom.query(availability_query(config, namespaces)))
+
+
+async def adiscover_recorded_series(config, prom, namespaces: Iterable[str]):
+    """discover_recorded_series() for AsyncPrometheusClient"""
+    namespaces = sorted(set(namespaces))
+    if config.get_env('recorded_series') == 'off' or not config.get_recording_rules():
+        return
+    apply_availability(config, namespaces, await prom.query(availability_query(config, namespaces)))
+
+
+def default_namespaces(config) -> List[str]:
+    """SERVICE_NAMESPACE plus the namespaces of the fleet config, if present"""
+    namespaces = [config.get_service_config()['namespace']]
+    try:
+        namespaces += [target['namespace'] for target in config.get_fleet_targets()]
+    except FileNotFoundError:
+        pass
+    return namespaces
+
+
+def main(argv: Optional[List[str]] = None):
+    """Print (or write) the recording rule file"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--namespace', action='append', help='Namespace to record (repeatable)')
+    parser.add_argument('--lookback', help='Query window (default collection.lookback_hours from thresholds.yaml)')
+    parser.add_argument(
+        '--interval',
+        help='Evaluation interval of the window rules (default recording_rules.interval); '
+             'match it to how often the health check runs'
+    )
+    parser.add_argument('--rate-interval', help='Evaluation interval of the recorded rates (default recording_rules.rate_interval)')
+    parser.add_argument('--prometheus-rule', metavar='NAME', help='Emit a PrometheusRule resource with this name')
+    parser.add_argument('--rule-namespace', default='monitoring', help='Namespace of the PrometheusRule resource')
+    parser.add_argument('-o', '--output', help='Write to file instead of stdout')
+    args = parser.parse_args(argv)
+
+    config = get_config()
+    lookback = args.lookback or f"{config.get_threshold('collection', 'lookback_hours', 24)}h"
+    interval = args.interval or config.recording_rule_interval()
+    rate_interval = args.rate_interval or (config.promql_queries.get('recording_rules') or {}).get('rate_interval', '5m')
+    rules = build_rules(config, args.namespace or default_namespaces(config), lookback, interval, rate_interval)
+    if args.prometheus_rule:
+        rules = prometheus_rule(args.prometheus_rule, args.rule_namespace, rules)
+
+    text = yaml.safe_dump(rules, sort_keys=False, width=1000)
+    if args.output:
+        Path(args.output).write_text(text)
+        print(f"Wrote {sum(len(g['rules']) for g in (rules.get('spec') or rules)['groups'])} rules to {args.output}", file=sys.stderr)
+    else:
+        print(text, end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -57,6 +57,13 @@ class Reporter:
             f"| Trend | {memory.get('slope_mb_per_hour', 0):+.1f} MB/h | {self._trend_indicator(memory.get('slope_mb_per_hour', 0))} |",
             "",
         ])
+        excluded = data.get('analysis', {}).get('memory_trend', {}).get('excluded_pods', {})
+        if excluded:
+            md.extend([
+                f"> Trend excludes {len(excluded)} pod(s) with too few samples: "
+                + ', '.join(f"{name} ({count})" for name, count in sorted(excluded.items())),
+                "",
+            ])
 
         # Resource allocation
         resources = data.get('analysis', {}).get('resource_allocation', {})
@@ -77,7 +84,7 @@ class Reporter:
             "",
             f"- Current Replicas: **{hpa.get('current_replicas', 0)}**",
             f"- Min/Max: {hpa.get('min_replicas', 0)} / {hpa.get('max_replicas', 0)}",
-            f"- Target Metrics: {', '.join(hpa.get('metrics', []))}",
+            f"- Target Metrics: {', '.join(self._format_hpa_metric(m) for m in hpa.get('metrics', []))}",
             "",
         ])
 
@@ -168,6 +175,14 @@ class Reporter:
         else:
             return '➡️ Stable' if self.use_emoji else 'STABLE'
 
+    def _format_hpa_metric(self, metric: Dict[str, Any]) -> str:
+        """Format an HPA metric target (e.g., 'cpu 70%')"""
+        name = metric.get('name', metric.get('type', ''))
+        if 'target' not in metric:
+            return name
+        unit = '%' if metric.get('unit') == '%' else ''
+        return f"{name} {metric['target']}{unit}"
+
 
 if __name__ == '__main__':
     # Test reporter
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Statistics Kernel for Exchange Service Health Check
+
+NumPy-only replacements for the few scipy.stats functions the analyzer
+needs, so a CronJob cold start does not pay for importing scipy:
+
+- linregress / linregress_batch: least-squares fit with r, two-sided
+  p-value (Student t) and slope standard error, same outputs as
+  scipy.stats.linregress
+- t_sf: Student t survival function via the regularized incomplete beta
+- quantiles and robust estimators (median, MAD, trimmed mean, Theil-Sen)
+
+scipy is only imported through scipy_stats() when a caller explicitly asks
+for a test this module does not implement.
+"""
+
+import math
+import numpy as np
+from typing import Any, Dict, NamedTuple, Sequence, Union
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+# Continued fraction settings for the incomplete beta function
+BETACF_MAX_ITERATIONS = 1000
+BETACF_EPSILON = 1e-15
+BETACF_TINY = 1e-300
+
+_lgamma = np.vectorize(math.lgamma, otypes=[np.float64])
+
+
+class LinregressResult(NamedTuple):
+    """Same fields as scipy.stats.linregress' result"""
+    slope: float
+    intercept: float
+    rvalue: float
+    pvalue: float
+    stderr: float
+
+
+def scipy_stats() -> Any:
+    """
+    Import scipy.stats on demand
+
+    Only for advanced tests not provided here; the regular analysis path
+    never calls this.
+    """
+    from scipy import stats
+    return stats
+
+
+# ----------------------------------------------------------------------
+# Distributions
+# ----------------------------------------------------------------------
+
+def _betacf(a: np.ndarray, b: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Continued fraction for the incomplete beta function (modified Lentz)"""
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = np.ones_like(x)
+    d = 1.0 - qab * x / qap
+    d = np.where(np.abs(d) < BETACF_TINY, BETACF_TINY, d)
+    d = 1.0 / d
+    h = d.copy()
+    active = np.ones(x.shape, dtype=bool)
+
+    for m in range(1, BETACF_MAX_ITERATIONS + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = np.where(np.abs(d) < BETACF_TINY, BETACF_TINY, d)
+        c = 1.0 + aa / c
+        c = np.where(np.abs(c) < BETACF_TINY, BETACF_TINY, c)
+        d = 1.0 / d
+        h = np.where(active, h * d * c, h)
+
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = np.where(np.abs(d) < BETACF_TINY, BETACF_TINY, d)
+        c = 1.0 + aa / c
+        c = np.where(np.abs(c) < BETACF_TINY, BETACF_TINY, c)
+        d = 1.0 / d
+        delta = d * c
+        h = np.where(active, h * delta, h)
+
+        active &= np.abs(delta - 1.0) > BETACF_EPSILON
+        if not active.any():
+            break
+
+    return h
+
+
+def betainc(a: ArrayLike, b: ArrayLike, x: ArrayLike) -> np.ndarray:
+    """
+    Regularized incomplete beta function I_x(a, b), element-wise
+
+    Args:
+        a: Shape parameter(s) > 0
+        b: Shape parameter(s) > 0
+        x: Point(s) in [0, 1]
+
+    Returns:
+        I_x(a, b) as float64 array
+    """
+    a, b, x = np.broadcast_arrays(
+        np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64), np.asarray(x, dtype=np.float64)
+    )
+    result = np.where(x <= 0, 0.0, 1.0)
+    inner = (x > 0) & (x < 1)
+    if not inner.any():
+        return result
+
+    a, b, x = a[inner], b[inner], x[inner]
+    log_front = _lgamma(a + b) - _lgamma(a) - _lgamma(b) + a * np.log(x) + b * np.log1p(-x)
+    front = np.exp(log_front)
+
+    # The continued fraction converges fast for x < (a+1)/(a+b+2); use symmetry otherwise
+    direct = x < (a + 1.0) / (a + b + 2.0)
+    value = np.empty_like(x)
+    if direct.any():
+        value[direct] = front[direct] * _betacf(a[direct], b[direct], x[direct]) / a[direct]
+    if (~direct).any():
+        flipped = ~direct
+        value[flipped] = 1.0 - front[flipped] * _betacf(b[flipped], a[flipped], 1.0 - x[flipped]) / b[flipped]
+
+    result[inner] = np.clip(value, 0.0, 1.0)
+    return result
+
+
+def t_sf(t: ArrayLike, df: ArrayLike) -> np.ndarray:
+    """
+    Student t survival function P(T > t), element-wise
+
+    Args:
+        t: t statistic(s)
+        df: Degrees of freedom (> 0)
+
+    Returns:
+        Upper tail probability as float64 array
+    """
+    t = np.asarray(t, dtype=np.float64)
+    df = np.asarray(df, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tail = 0.5 * betainc(df / 2.0, 0.5, df / (df + t * t))
+    return np.where(t >= 0, tail, 1.0 - tail)
+
+
+# ----------------------------------------------------------------------
+# Regression
+# ----------------------------------------------------------------------
+
+def linregress_batch(x: np.ndarray, y: np.ndarray, counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Least-squares line fit for many series at once (ragged layout)
+
+    Series are stored back to back in x / y; counts[i] is the length of
+    series i. All sums are segment reductions (np.bincount), so fitting a
+    thousand pods is a handful of vectorized passes over the samples.
+    Outputs match scipy.stats.linregress per segment; segments with fewer
+    than 3 points or constant x get NaN.
+
+    Args:
+        x: Concatenated x values
+        y: Concatenated y values
+        counts: Samples per series
+
+    Returns:
+        Dict of arrays (one entry per series): slope, intercept, r, p_value, stderr
+    """
+    counts = np.asarray(counts)
+    segments = np.repeat(np.arange(len(counts)), counts)
+    n = counts.astype(np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.bincount(segments, weights=x, minlength=len(counts)) / n
+        y_mean = np.bincount(segments, weights=y, minlength=len(counts)) / n
+        dx = x - x_mean[segments]
+        dy = y - y_mean[segments]
+        sxx = np.bincount(segments, weights=dx * dx, minlength=len(counts))
+        syy = np.bincount(segments, weights=dy * dy, minlength=len(counts))
+        sxy = np.bincount(segments, weights=dx * dy, minlength=len(counts))
+
+        valid = (counts >= 3) & (sxx > 0)
+        slope = np.where(valid, sxy / sxx, np.nan)
+        intercept = y_mean - slope * x_mean
+        r = np.where(syy > 0, sxy / np.sqrt(sxx * syy), 0.0)
+        r = np.where(valid, np.clip(r, -1.0, 1.0), np.nan)
+
+        df = n - 2
+        # Same small-denominator guard as scipy (perfect fits give p = 0)
+        t = r * np.sqrt(df / ((1.0 - r) * (1.0 + r) + 1e-20))
+        p_value = np.where(valid, 2 * t_sf(np.abs(np.nan_to_num(t)), np.maximum(df, 1)), np.nan)
+        stderr = np.where(valid, np.sqrt((1 - r ** 2) * syy / sxx / df), np.nan)
+
+    return {'slope': slope, 'intercept': intercept, 'r': r, 'p_value': p_value, 'stderr': stderr}
+
+
+def linregress(x: ArrayLike, y: ArrayLike) -> LinregressResult:
+    """
+    Least-squares line fit for one series (scipy.stats.linregress equivalent)
+
+    Args:
+        x: x values
+        y: y values (same length)
+
+    Returns:
+        LinregressResult(slope, intercept, rvalue, pvalue, stderr)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.shape != y.shape:
+        raise ValueError("x and y must have the same length")
+
+    fit = linregress_batch(x, y, np.array([len(x)]))
+    return LinregressResult(
+        float(fit['slope'][0]),
+        float(fit['intercept'][0]),
+        float(fit['r'][0]),
+        float(fit['p_value'][0]),
+        float(fit['stderr'][0]),
+    )
+
+
+# ----------------------------------------------------------------------
+# Quantiles and robust estimators
+# ----------------------------------------------------------------------
+
+def quantiles(values: ArrayLike, q: ArrayLike) -> np.ndarray:
+    """
+    Linear-interpolated quantiles (numpy 'linear' method, like pandas / PromQL quantile)
+
+    Args:
+        values: Samples (NaN ignored)
+        q: Quantile(s) in [0, 1]
+
+    Returns:
+        Quantile value(s); NaN when there are no samples
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return np.full(np.shape(q), np.nan)
+    return np.quantile(values, q)
+
+
+def median(values: ArrayLike) -> float:
+    """Median ignoring NaN"""
+    return float(quantiles(values, 0.5))
+
+
+def mad(values: ArrayLike, scale: float = 1.482602218505602) -> float:
+    """
+    Median absolute deviation
+
+    Args:
+        values: Samples (NaN ignored)
+        scale: Consistency factor (1/Phi^-1(3/4): MAD estimates sigma for normal data)
+
+    Returns:
+        Scaled MAD
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return float('nan')
+    return float(scale * np.median(np.abs(values - np.median(values))))
+
+
+def trimmed_mean(values: ArrayLike, proportion: float = 0.1) -> float:
+    """
+    Mean after cutting `proportion` of samples from each end (scipy.stats.trim_mean)
+
+    Args:
+        values: Samples (NaN ignored)
+        proportion: Fraction cut from each tail, in [0, 0.5)
+
+    Returns:
+        Trimmed mean
+    """
+    values = np.sort(np.asarray(values, dtype=np.float64))
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return float('nan')
+    cut = int(proportion * values.size)
+    return float(values[cut:values.size - cut].mean())
+
+
+def theil_sen_slope(x: ArrayLike, y: ArrayLike, max_points: int = 500) -> float:
+    """
+    Theil-Sen slope: median of pairwise slopes, robust to outliers/restarts
+
+    Args:
+        x: x values
+        y: y values
+        max_points: Evenly thin longer series first (pairs grow quadratically)
+
+    Returns:
+        Slope estimate (NaN with fewer than 2 distinct x values)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.size > max_points:
+        index = np.linspace(0, x.size - 1, max_points).astype(int)
+        x, y = x[index], y[index]
+
+    i, j = np.triu_indices(x.size, k=1)
+    dx = x[j] - x[i]
+    keep = dx != 0
+    if not keep.any():
+        return float('nan')
+    return float(np.median((y[j] - y[i])[keep] / dx[keep]))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Columnar Time Series for Exchange Service Health Check
+
+Compact representation of Prometheus range query results: one float64
+timestamp array and one float64 value array per series, with the label
+set kept alongside instead of repeated on every sample.
+"""
+
+import logging
+import numpy as np
+from typing import Dict, List, Any, Optional
+
+from health_check_common.prom_stream import Samples
+
+logger = logging.getLogger(__name__)
+
+
+class TimeSeries:
+    """Single Prometheus series stored as parallel numpy arrays"""
+
+    __slots__ = ('labels', 'timestamps', 'values')
+
+    def __init__(
+        self,
+        labels: Dict[str, str],
+        timestamps: np.ndarray,
+        values: np.ndarray
+    ):
+        """
+        Initialize time series
+
+        Args:
+            labels: Series label set (metric dict from Prometheus)
+            timestamps: Unix epoch seconds (float64)
+            values: Sample values (float64), same length as timestamps
+        """
+        self.labels = labels
+        self.timestamps = timestamps
+        self.values = values
+
+    @classmethod
+    def from_matrix_item(cls, item: Dict[str, Any]) -> 'TimeSeries':
+        """
+        Build a series from one entry of a range query 'matrix' result
+
+        Samples from the streaming decoder are wrapped without copying; a
+        plain [[timestamp, "value"], ...] list is converted in a single numpy
+        call. No per-sample Python objects are created either way, unless a
+        sample is malformed: then the list is parsed point by point and only
+        the bad samples are dropped.
+
+        Args:
+            item: Result entry with 'metric' and 'values' keys
+
+        Returns:
+            TimeSeries instance
+        """
+        values = item.get('values')
+        if isinstance(values, Samples):
+            return cls(
+                item.get('metric', {}),
+                np.frombuffer(values.timestamps, dtype=np.float64),
+                np.frombuffer(values.values, dtype=np.float64)
+            )
+
+        try:
+            samples = np.array(values or [], dtype=np.float64).reshape(-1, 2)
+        except (ValueError, TypeError):
+            return cls._from_irregular_pairs(item.get('metric', {}), values)
+        return cls(item.get('metric', {}), samples[:, 0].copy(), samples[:, 1].copy())
+
+    @classmethod
+    def _from_irregular_pairs(cls, labels: Dict[str, str], values: List[Any]) -> 'TimeSeries':
+        """Slow path for a sample list numpy rejects: keep every parsable point, skip the rest"""
+        timestamps, parsed = [], []
+        for pair in values:
+            try:
+                timestamp, value = float(pair[0]), float(pair[1])
+            except (ValueError, TypeError, IndexError, KeyError):
+                continue
+            timestamps.append(timestamp)
+            parsed.append(value)
+
+        skipped = len(values) - len(parsed)
+        logger.warning(f"Skipped {skipped} unparsable sample(s) of {len(values)} in series {labels}")
+        return cls(labels, np.array(timestamps, dtype=np.float64), np.array(parsed, dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __repr__(self) -> str:
+        return f"TimeSeries(labels={self.labels}, points={len(self)})"
+
+    @property
+    def last(self) -> Optional[float]:
+        """Most recent sample value, or None for an empty series"""
+        return float(self.values[-1]) if len(self.values) else None
+
+
+def parse_matrix(results: List[Dict[str, Any]], key: str = 'pod') -> Dict[str, TimeSeries]:
+    """
+    Convert range query results into columnar series keyed by a label
+
+    Args:
+        results: Raw result list from a range query
+        key: Label used as dict key (series without it are keyed 'unknown')
+
+    Returns:
+        Dict mapping label value to TimeSeries
+    """
+    series_data = {}
+
+    for item in results:
+        try:
+            series = TimeSeries.from_matrix_item(item)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Failed to parse time series: {e}")
+            continue
+
+        series_data[series.labels.get(key, 'unknown')] = series
+
+    logger.debug(f"Parsed {len(series_data)} time series")
+    return series_data
+
+
+def concat(series_data: Dict[str, TimeSeries]) -> TimeSeries:
+    """
+    Pool several series into one, ordered by timestamp
+
+    Args:
+        series_data: Dict of series to pool (e.g. all pods of a service)
+
+    Returns:
+        TimeSeries with empty labels holding every sample
+    """
+    if not series_data:
+        return TimeSeries({}, np.empty(0), np.empty(0))
+
+    timestamps = np.concatenate([s.timestamps for s in series_data.values()])
+    values = np.concatenate([s.values for s in series_data.values()])
+    order = np.argsort(timestamps, kind='stable')
+    return TimeSeries({}, timestamps[order], values[order])
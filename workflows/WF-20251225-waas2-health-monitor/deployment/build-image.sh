@@ -3,6 +3,7 @@ set -e
 
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 PROJECT_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
+REPO_ROOT="$(cd "$PROJECT_ROOT/../.." && pwd)"
 
 IMAGE_NAME="asia-east2-docker.pkg.dev/uu-prod/waas-prod/waas2-health-monitor"
 TAG="${1:-latest}"
@@ -11,8 +12,11 @@ echo "Building Docker image..."
 echo "Image: ${IMAGE_NAME}:${TAG}"
 echo ""
 
-# Copy health-check.py to deployment directory temporarily
-cp "${PROJECT_ROOT}/scripts/health-check.py" "${SCRIPT_DIR}/scripts/"
+# Stage both scripts and the shared health_check_common package in the build context
+mkdir -p "${SCRIPT_DIR}/scripts"
+cp "${PROJECT_ROOT}/scripts/health-check.py" "${PROJECT_ROOT}/scripts/health-check-v2.py" "${SCRIPT_DIR}/scripts/"
+rm -rf "${SCRIPT_DIR}/health-check-common"
+cp -R "${REPO_ROOT}/lib/health-check-common" "${SCRIPT_DIR}/health-check-common"
 
 # Build image
 docker build \
@@ -22,7 +26,8 @@ docker build \
   "${SCRIPT_DIR}"
 
 # Cleanup
-rm -f "${SCRIPT_DIR}/scripts/health-check.py"
+rm -f "${SCRIPT_DIR}/scripts/health-check.py" "${SCRIPT_DIR}/scripts/health-check-v2.py"
+rm -rf "${SCRIPT_DIR}/health-check-common"
 
 echo ""
 echo "Image built successfully!"
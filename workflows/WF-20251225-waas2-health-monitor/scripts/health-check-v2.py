@@ -6,15 +6,25 @@ Waas2 Tenant Services Health Check (v2 with Prometheus)
 
 import json
 import os
+import re
 import sys
 import subprocess
 import base64
-from datetime import datetime, timedelta
+import time
+import queue
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import urllib.request
 import urllib.parse
 import urllib.error
 
+from health_check_common.prom_stream import decode_response
+from health_check_common.query_cache import QueryCache
+from health_check_common.run_profile import RunProfile, span, timed
+
 NAMESPACE = "waas2-prod"
 TIME_WINDOW_HOURS = 24
 
@@ -37,13 +47,32 @@ SERVICES = [
 PROMETHEUS_URL = os.getenv("PROMETHEUS_URL", "")
 PROMETHEUS_USERNAME = os.getenv("PROMETHEUS_USERNAME", "")
 PROMETHEUS_PASSWORD = os.getenv("PROMETHEUS_PASSWORD", "")
+# One namespace-wide query per statistic instead of one per service
+BULK_METRICS = os.getenv("PROMETHEUS_BULK_METRICS", "true").lower() != "false"
+# Bulk metrics read the 24h windows precomputed by recording rules when Prometheus has them
+# (rules from the exchange workflow: recording_rules.py -n waas2-prod); RECORDED_SERIES=off disables.
+# RECORDING_RULE_INTERVAL must match the rules' evaluation interval.
+RECORDED_SERIES = os.getenv("RECORDED_SERIES", "auto").lower() != "off"
+RECORDING_RULE_INTERVAL = os.getenv("RECORDING_RULE_INTERVAL", "1h")
+RECORD_PREFIX = "pod_container:"
+# Persistent query cache (QUERY_CACHE_MODE=on/off/refresh, QUERY_CACHE_PATH, QUERY_CACHE_MAX_MB);
+# its run memo (QUERY_MEMO=on/off) answers repeated queries of this run once
+QUERY_CACHE = QueryCache.from_env()
+
+# Parallel check configuration
+CHECK_WORKERS = int(os.getenv("CHECK_WORKERS", "4"))
+SERVICE_DEADLINE_SECONDS = int(os.getenv("SERVICE_DEADLINE_SECONDS", "180"))
+# Caps in-flight kubectl / Prometheus requests at CHECK_WORKERS, including those still held
+# by checks that passed their deadline (each request has its own 30s timeout)
+REQUEST_SLOTS = threading.BoundedSemaphore(max(1, CHECK_WORKERS))
 
 
 def run_kubectl(args: List[str]) -> str:
     """Execute kubectl command and return output"""
     cmd = ["kubectl"] + args
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        with REQUEST_SLOTS, span(f"kubectl.{args[0]}", args=" ".join(args)):
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
         return result.stdout.strip()
     except subprocess.TimeoutExpired:
         return ""
@@ -52,39 +81,54 @@ def run_kubectl(args: List[str]) -> str:
         return ""
 
 
+def prometheus_get(endpoint: str, params: Dict) -> List[Dict]:
+    """GET a Prometheus API endpoint with basic auth, return data.result (raises on failure)"""
+    url = f"{PROMETHEUS_URL}/api/v1/{endpoint}?{urllib.parse.urlencode(params)}"
+
+    # Create request with basic auth
+    req = urllib.request.Request(url)
+    if PROMETHEUS_USERNAME and PROMETHEUS_PASSWORD:
+        credentials = f"{PROMETHEUS_USERNAME}:{PROMETHEUS_PASSWORD}"
+        encoded_credentials = base64.b64encode(credentials.encode()).decode()
+        req.add_header("Authorization", f"Basic {encoded_credentials}")
+
+    # Execute request, decoding the body as it streams in
+    with span(f"prometheus.{endpoint}", query=params.get("query", "")) as attrs:
+        with REQUEST_SLOTS, urllib.request.urlopen(req, timeout=30) as response:
+            data = decode_response(response)
+
+        if data.get("status") != "success":
+            raise RuntimeError(data.get("error", "unknown error"))
+        attrs["series"] = len(data.get("data", {}).get("result", []))
+    return data.get("data", {}).get("result", [])
+
+
 def query_prometheus(query: str, time_range: Optional[Tuple[datetime, datetime]] = None) -> Dict:
-    """Query Prometheus API with basic auth"""
+    """Query Prometheus API with basic auth (through the persistent query cache)"""
     if not PROMETHEUS_URL:
         return {"status": "error", "error": "PROMETHEUS_URL not set"}
 
     try:
-        # Build URL
         if time_range:
             # Range query
             start, end = time_range
-            params = {
-                "query": query,
-                "start": int(start.timestamp()),
-                "end": int(end.timestamp()),
-                "step": "5m"
-            }
-            url = f"{PROMETHEUS_URL}/api/v1/query_range?{urllib.parse.urlencode(params)}"
-        else:
-            # Instant query
-            params = {"query": query}
-            url = f"{PROMETHEUS_URL}/api/v1/query?{urllib.parse.urlencode(params)}"
-
-        # Create request with basic auth
-        req = urllib.request.Request(url)
-        if PROMETHEUS_USERNAME and PROMETHEUS_PASSWORD:
-            credentials = f"{PROMETHEUS_USERNAME}:{PROMETHEUS_PASSWORD}"
-            encoded_credentials = base64.b64encode(credentials.encode()).decode()
-            req.add_header("Authorization", f"Basic {encoded_credentials}")
-
-        # Execute request
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode())
-            return data
+            result = QUERY_CACHE.query_range(
+                PROMETHEUS_URL, query, start.timestamp(), end.timestamp(), "5m",
+                lambda range_start, range_end: prometheus_get("query_range", {
+                    "query": query,
+                    "start": int(range_start),
+                    "end": int(range_end),
+                    "step": "5m"
+                })
+            )
+            return {"status": "success", "data": {"resultType": "matrix", "result": result}}
+
+        # Instant query
+        result = QUERY_CACHE.query(
+            PROMETHEUS_URL, query,
+            lambda at: prometheus_get("query", {"query": query, "time": int(at)})
+        )
+        return {"status": "success", "data": {"resultType": "vector", "result": result}}
 
     except urllib.error.HTTPError as e:
         print(f"Prometheus HTTP error: {e.code} {e.reason}", file=sys.stderr)
@@ -97,7 +141,48 @@ def query_prometheus(query: str, time_range: Optional[Tuple[datetime, datetime]]
         return {"status": "error", "error": str(e)}
 
 
-def get_deployment_info(service: str) -> Dict:
+@timed("collect.snapshot")
+def load_cluster_snapshot() -> Dict:
+    """
+    List deployments, pods and events in NAMESPACE once and index them
+
+    Returns:
+        Dict with "deployments" (by name), "pods" (by app label) and
+        "events" (by involvedObject.name). A resource whose listing failed
+        is None so callers fall back to per-service kubectl calls.
+    """
+    snapshot = {"deployments": None, "pods": None, "events": None}
+
+    for resource in ("deployments", "pods", "events"):
+        output = run_kubectl(["get", resource, "-n", NAMESPACE, "-o", "json"])
+        if not output:
+            print(f"Snapshot: failed to list {resource}, falling back to per-service queries", file=sys.stderr)
+            continue
+
+        try:
+            items = json.loads(output).get("items", [])
+        except json.JSONDecodeError:
+            print(f"Snapshot: invalid JSON for {resource}, falling back to per-service queries", file=sys.stderr)
+            continue
+
+        index = {}
+        for item in items:
+            if resource == "deployments":
+                index[item.get("metadata", {}).get("name", "")] = item
+            elif resource == "pods":
+                app = item.get("metadata", {}).get("labels", {}).get("app", "")
+                index.setdefault(app, []).append(item)
+            else:
+                involved = item.get("involvedObject", {}).get("name", "")
+                index.setdefault(involved, []).append(item)
+
+        snapshot[resource] = index
+        print(f"Snapshot: {len(items)} {resource}", file=sys.stderr)
+
+    return snapshot
+
+
+def get_deployment_info(service: str, snapshot: Optional[Dict] = None) -> Dict:
     """Get deployment information"""
     result = {
         "exists": False,
@@ -105,45 +190,48 @@ def get_deployment_info(service: str) -> Dict:
         "resources": {"memory_limit": 0, "memory_request": 0, "cpu_limit": 0, "cpu_request": 0}
     }
 
-    check = run_kubectl(["get", "deployment", service, "-n", NAMESPACE, "-o", "json"])
-    if not check:
+    if snapshot and snapshot["deployments"] is not None:
+        data = snapshot["deployments"].get(service)
+    else:
+        check = run_kubectl(["get", "deployment", service, "-n", NAMESPACE, "-o", "json"])
+        try:
+            data = json.loads(check) if check else None
+        except json.JSONDecodeError:
+            data = None
+
+    if not data:
         return result
 
-    try:
-        data = json.loads(check)
-        result["exists"] = True
-        spec = data.get("spec", {})
-        status = data.get("status", {})
-
-        result["replicas"]["desired"] = spec.get("replicas", 0)
-        result["replicas"]["ready"] = status.get("readyReplicas", 0)
-        result["replicas"]["available"] = status.get("availableReplicas", 0)
-
-        # Extract resource limits/requests
-        containers = spec.get("template", {}).get("spec", {}).get("containers", [])
-        if containers:
-            resources = containers[0].get("resources", {})
-            limits = resources.get("limits", {})
-            requests = resources.get("requests", {})
-
-            # Parse memory (e.g., "512Mi" -> 512)
-            if "memory" in limits:
-                mem_str = limits["memory"]
-                result["resources"]["memory_limit"] = parse_memory(mem_str)
-            if "memory" in requests:
-                mem_str = requests["memory"]
-                result["resources"]["memory_request"] = parse_memory(mem_str)
-
-            # Parse CPU (e.g., "200m" -> 0.2)
-            if "cpu" in limits:
-                cpu_str = limits["cpu"]
-                result["resources"]["cpu_limit"] = parse_cpu(cpu_str)
-            if "cpu" in requests:
-                cpu_str = requests["cpu"]
-                result["resources"]["cpu_request"] = parse_cpu(cpu_str)
-
-    except json.JSONDecodeError:
-        pass
+    result["exists"] = True
+    spec = data.get("spec", {})
+    status = data.get("status", {})
+
+    result["replicas"]["desired"] = spec.get("replicas", 0)
+    result["replicas"]["ready"] = status.get("readyReplicas", 0)
+    result["replicas"]["available"] = status.get("availableReplicas", 0)
+
+    # Extract resource limits/requests
+    containers = spec.get("template", {}).get("spec", {}).get("containers", [])
+    if containers:
+        resources = containers[0].get("resources", {})
+        limits = resources.get("limits", {})
+        requests = resources.get("requests", {})
+
+        # Parse memory (e.g., "512Mi" -> 512)
+        if "memory" in limits:
+            mem_str = limits["memory"]
+            result["resources"]["memory_limit"] = parse_memory(mem_str)
+        if "memory" in requests:
+            mem_str = requests["memory"]
+            result["resources"]["memory_request"] = parse_memory(mem_str)
+
+        # Parse CPU (e.g., "200m" -> 0.2)
+        if "cpu" in limits:
+            cpu_str = limits["cpu"]
+            result["resources"]["cpu_limit"] = parse_cpu(cpu_str)
+        if "cpu" in requests:
+            cpu_str = requests["cpu"]
+            result["resources"]["cpu_request"] = parse_cpu(cpu_str)
 
     return result
 
@@ -173,69 +261,87 @@ def parse_cpu(cpu_str: str) -> float:
         return float(cpu_str)
 
 
-def get_pod_info(service: str) -> List[Dict]:
+def get_pod_info(service: str, snapshot: Optional[Dict] = None) -> List[Dict]:
     """Get pod information for a service"""
-    pods_json = run_kubectl([
-        "get", "pods", "-n", NAMESPACE,
-        "-l", f"app={service}",
-        "-o", "json"
-    ])
+    if snapshot and snapshot["pods"] is not None:
+        items = snapshot["pods"].get(service, [])
+    else:
+        pods_json = run_kubectl([
+            "get", "pods", "-n", NAMESPACE,
+            "-l", f"app={service}",
+            "-o", "json"
+        ])
+        try:
+            items = json.loads(pods_json).get("items", [])
+        except json.JSONDecodeError:
+            items = []
 
     pods = []
-    try:
-        data = json.loads(pods_json)
-        for pod in data.get("items", []):
-            pod_name = pod["metadata"]["name"]
-            status = pod["status"]
-
-            container_statuses = status.get("containerStatuses", [])
-            restart_count = 0
-            if container_statuses:
-                restart_count = container_statuses[0].get("restartCount", 0)
-
-            pods.append({
-                "name": pod_name,
-                "phase": status.get("phase", "Unknown"),
-                "restarts": restart_count,
-            })
-    except json.JSONDecodeError:
-        pass
+    for pod in items:
+        pod_name = pod["metadata"]["name"]
+        status = pod["status"]
+
+        container_statuses = status.get("containerStatuses", [])
+        restart_count = 0
+        if container_statuses:
+            restart_count = container_statuses[0].get("restartCount", 0)
+
+        pods.append({
+            "name": pod_name,
+            "phase": status.get("phase", "Unknown"),
+            "restarts": restart_count,
+        })
 
     return pods
 
 
-def get_events(service: str) -> Dict:
+def get_events(service: str, snapshot: Optional[Dict] = None) -> Dict:
     """Get events for a service"""
-    events_json = run_kubectl([
-        "get", "events", "-n", NAMESPACE,
-        "--field-selector", f"involvedObject.name={service}",
-        "-o", "json"
-    ])
+    if snapshot and snapshot["events"] is not None:
+        items = snapshot["events"].get(service, [])
+    else:
+        events_json = run_kubectl([
+            "get", "events", "-n", NAMESPACE,
+            "--field-selector", f"involvedObject.name={service}",
+            "-o", "json"
+        ])
+        try:
+            items = json.loads(events_json).get("items", [])
+        except json.JSONDecodeError:
+            items = []
 
     result = {"oom_killed": 0, "restarts": 0, "events": []}
 
-    try:
-        data = json.loads(events_json)
-        for event in data.get("items", []):
-            reason = event.get("reason", "")
-            message = event.get("message", "")
-
-            if "OOMKilled" in reason or "OOMKilled" in message:
-                result["oom_killed"] += 1
-            elif "BackOff" in reason or "CrashLoop" in reason:
-                result["restarts"] += 1
-
-            result["events"].append({
-                "reason": reason,
-                "message": message,
-                "time": event.get("lastTimestamp") or event.get("eventTime")
-            })
-    except json.JSONDecodeError:
-        pass
+    for event in items:
+        reason = event.get("reason", "")
+        message = event.get("message", "")
+
+        if "OOMKilled" in reason or "OOMKilled" in message:
+            result["oom_killed"] += 1
+        elif "BackOff" in reason or "CrashLoop" in reason:
+            result["restarts"] += 1
+
+        result["events"].append({
+            "reason": reason,
+            "message": message,
+            "time": event.get("lastTimestamp") or event.get("eventTime")
+        })
 
     return result
 
 
+def promql_alternation(values: List[str]) -> str:
+    """Regex matching any of the literal values, escaped for a double-quoted PromQL string"""
+    escaped = [re.escape(value).replace("\\", "\\\\") for value in sorted(set(values))]
+    return escaped[0] if len(escaped) == 1 else f"({'|'.join(escaped)})"
+
+
+def owning_service(pod: str, services: List[str]) -> Optional[str]:
+    """Service owning a pod: longest name that is a '<service>-' prefix of the pod name"""
+    owners = [service for service in services if pod.startswith(f"{service}-")]
+    return max(owners, key=len) if owners else None
+
+
 def get_memory_metrics(service: str) -> Dict:
     """Get memory metrics from Prometheus"""
     result = {
@@ -309,6 +415,135 @@ def get_cpu_metrics(service: str) -> Dict:
     return result
 
 
+@timed("collect.recorded_series")
+def recorded_series(records: List[str]) -> set:
+    """
+    Which recording-rule series exist in NAMESPACE (one query)
+
+    Looks back one rule interval, since rules evaluated less often than the
+    5m lookback of an instant query have no sample "now" between evaluations.
+    """
+    if not RECORDED_SERIES or not records:
+        return set()
+    query = " or ".join(
+        f'label_replace(count(last_over_time({record}{{namespace="{NAMESPACE}"}}[{RECORDING_RULE_INTERVAL}])), '
+        f'"record", "{record}", "", "")'
+        for record in records
+    )
+    data = query_prometheus(query)
+    if data.get("status") != "success":
+        return set()
+    return {r.get("metric", {}).get("record") for r in data.get("data", {}).get("result", [])} - {None}
+
+
+@timed("collect.bulk_metrics")
+def load_bulk_metrics(services: List[str]) -> Optional[Dict[str, Dict]]:
+    """
+    Get memory/CPU metrics for all services with one query per statistic
+
+    Sends namespace-wide `by (pod, container)` queries (including the
+    server-side quarter averages for the trend check) with the same pod and
+    container filters as the per-service queries, and splits the returned
+    vectors per service locally: a series counts for a service only if its
+    container is the service and the service is the longest '<service>-'
+    prefix of its pod, so other workloads reusing a container name are not
+    mixed in. Returns None if Prometheus is not configured or any query
+    fails, so callers fall back to per-service queries.
+
+    The 24h window statistics read the recording rules' series
+    (pod_container:<category>_<query>:24h, same naming as the exchange
+    workflow) when they exist instead of evaluating the windows from raw
+    samples.
+    """
+    if not PROMETHEUS_URL:
+        return None
+
+    names = promql_alternation(services)
+    selector = f'namespace="{NAMESPACE}", pod=~"{names}-.*", container=~"{names}"'
+    window = f"{TIME_WINDOW_HOURS}h"
+    # Statistic -> (recording rule series, raw window expression)
+    windows = {
+        "memory_avg": ("memory_average_usage", f'avg_over_time(container_memory_working_set_bytes{{{selector}}}[{window}])'),
+        "memory_max": ("memory_max_usage", f'max_over_time(container_memory_working_set_bytes{{{selector}}}[{window}])'),
+        "memory_p95": ("memory_p95_usage", f'quantile_over_time(0.95, container_memory_working_set_bytes{{{selector}}}[{window}])'),
+        "cpu": ("cpu_average_usage", f'avg_over_time(rate(container_cpu_usage_seconds_total{{{selector}}}[5m])[{window}:5m])'),
+    }
+    records = {name: f"{RECORD_PREFIX}{record}:{window}" for name, (record, _) in windows.items()}
+    available = recorded_series(list(records.values()))
+
+    def windowed(name: str) -> str:
+        if records[name] in available:
+            return f"last_over_time({records[name]}{{{selector}}}[{RECORDING_RULE_INTERVAL}])"
+        return windows[name][1]
+
+    queries = {
+        "memory_avg": f'avg by (pod, container) ({windowed("memory_avg")})',
+        "memory_max": f'max by (pod, container) ({windowed("memory_max")})',
+        "memory_p95": f'avg by (pod, container) ({windowed("memory_p95")})',
+        # Per-pod CPU is kept so both the average and the busiest pod can be derived locally
+        "cpu": windowed("cpu"),
+    }
+    queries["trend_first"], queries["trend_last"] = memory_trend_queries(selector, "pod, container")
+
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, query_prometheus, query)
+            for name, query in queries.items()
+        }
+        responses = {name: future.result() for name, future in futures.items()}
+
+    if any(data.get("status") != "success" for data in responses.values()):
+        print("Bulk metrics query failed, falling back to per-service queries", file=sys.stderr)
+        return None
+
+    def by_service(name: str) -> Dict[str, List[float]]:
+        grouped = {}
+        for r in responses[name].get("data", {}).get("result", []):
+            labels = r.get("metric", {})
+            service = owning_service(labels.get("pod", ""), services)
+            if service and labels.get("container") == service:
+                grouped.setdefault(service, []).append(float(r["value"][1]))
+        return grouped
+
+    memory_avg = by_service("memory_avg")
+    memory_max = by_service("memory_max")
+    memory_p95 = by_service("memory_p95")
+    cpu = by_service("cpu")
+    trend_first = by_service("trend_first")
+    trend_last = by_service("trend_last")
+
+    metrics = {}
+    for service in services:
+        memory = {"avg_mi": 0, "max_mi": 0, "p95_mi": 0, "available": False}
+        if memory_avg.get(service):
+            memory["avg_mi"] = int(sum(memory_avg[service]) / len(memory_avg[service]) / (1024 * 1024))
+            memory["available"] = True
+        if memory_max.get(service):
+            memory["max_mi"] = int(max(memory_max[service]) / (1024 * 1024))
+        if memory_p95.get(service):
+            memory["p95_mi"] = int(sum(memory_p95[service]) / len(memory_p95[service]) / (1024 * 1024))
+
+        cpu_result = {"avg_cores": 0, "max_cores": 0, "available": False}
+        if cpu.get(service):
+            cpu_result["avg_cores"] = sum(cpu[service]) / len(cpu[service])
+            cpu_result["max_cores"] = max(cpu[service])
+            cpu_result["available"] = True
+
+        # Same as the per-service trend query: quarter averages across the service's pods
+        growth_pct = None
+        if trend_first.get(service) and trend_last.get(service):
+            avg_first = sum(trend_first[service]) / len(trend_first[service])
+            avg_last = sum(trend_last[service]) / len(trend_last[service])
+            if avg_first > 0:
+                growth_pct = (avg_last - avg_first) / avg_first * 100
+
+        metrics[service] = {"memory": memory, "cpu": cpu_result, "memory_growth_pct": growth_pct}
+
+    recorded = f", {len(available)} from recording rules" if available else ""
+    print(f"Bulk metrics: {len(queries)} queries for {len(services)} services{recorded}", file=sys.stderr)
+    return metrics
+
+
 def check_availability(deployment: Dict) -> str:
     """1️⃣ 可用性檢查"""
     if not deployment["exists"]:
@@ -355,49 +590,52 @@ def check_memory_usage(memory_metrics: Dict, deployment: Dict) -> str:
         return "🔴"
 
 
-def check_memory_trend(service: str) -> str:
-    """4️⃣ 記憶體趨勢檢查（簡化版）"""
+def memory_trend_queries(selector: str, group_by: str = "") -> Tuple[str, str]:
+    """
+    Build server-side first/last quarter average queries for the trend check
+
+    Prometheus averages each quarter of the window (avg_over_time with offset)
+    so only two values per series are transferred instead of the 24h range.
+    """
+    quarter_minutes = max(TIME_WINDOW_HOURS * 60 // 4, 1)
+    aggregate = f"avg by ({group_by})" if group_by else "avg"
+    first = f'{aggregate} (avg_over_time(container_memory_working_set_bytes{{{selector}}}[{quarter_minutes}m] offset {quarter_minutes * 3}m))'
+    last = f'{aggregate} (avg_over_time(container_memory_working_set_bytes{{{selector}}}[{quarter_minutes}m]))'
+    return first, last
+
+
+def get_memory_growth(service: str) -> Optional[float]:
+    """Get last-quarter vs first-quarter memory growth (%) for a service"""
     if not PROMETHEUS_URL:
-        return "⚪"
+        return None
 
-    # Query memory over time to check trend
-    end = datetime.utcnow()
-    start = end - timedelta(hours=TIME_WINDOW_HOURS)
+    selector = f'namespace="{NAMESPACE}", pod=~"{service}-.*", container="{service}"'
+    averages = []
+    for query in memory_trend_queries(selector):
+        data = query_prometheus(query)
+        results = data.get("data", {}).get("result", []) if data.get("status") == "success" else []
+        if not results:
+            return None
+        averages.append(float(results[0]["value"][1]))
 
-    query = f'container_memory_working_set_bytes{{namespace="{NAMESPACE}", pod=~"{service}-.*", container="{service}"}}'
-    data = query_prometheus(query, time_range=(start, end))
+    avg_first, avg_last = averages
+    if avg_first == 0:
+        return None
+    return ((avg_last - avg_first) / avg_first) * 100
 
-    if data.get("status") != "success" or not data.get("data", {}).get("result"):
-        return "⚪"
 
-    results = data["data"]["result"]
-    if not results:
+def check_memory_trend(growth_pct: Optional[float]) -> str:
+    """4️⃣ 記憶體趨勢檢查（簡化版）"""
+    if growth_pct is None:
         return "⚪"
 
-    # Simple trend check: compare last 4h avg vs first 4h avg
-    try:
-        values = results[0]["values"]
-        if len(values) < 10:
-            return "⚪"
-
-        # Split into quarters
-        quarter = len(values) // 4
-        first_quarter = [float(v[1]) for v in values[:quarter]]
-        last_quarter = [float(v[1]) for v in values[-quarter:]]
-
-        avg_first = sum(first_quarter) / len(first_quarter)
-        avg_last = sum(last_quarter) / len(last_quarter)
-
-        growth_pct = ((avg_last - avg_first) / avg_first) * 100
-
-        if growth_pct > 20:  # 成長超過 20%
-            return "🔴"
-        elif growth_pct > 10:  # 成長 10-20%
-            return "🟡"
-        else:
-            return "🟢"
-    except:
-        return "⚪"
+    # Compare last-quarter avg vs first-quarter avg of the window
+    if growth_pct > 20:  # 成長超過 20%
+        return "🔴"
+    elif growth_pct > 10:  # 成長 10-20%
+        return "🟡"
+    else:
+        return "🟢"
 
 
 def check_cpu_usage(cpu_metrics: Dict, deployment: Dict) -> str:
@@ -472,28 +710,41 @@ def determine_overall_status(checks: Dict) -> str:
     return "🟢"
 
 
-def check_service(service: str) -> Dict:
+def check_service(service: str, snapshot: Optional[Dict] = None,
+                  bulk_metrics: Optional[Dict[str, Dict]] = None) -> Dict:
     """Perform complete health check for a service"""
     print(f"Checking {service}...", file=sys.stderr)
-
-    deployment = get_deployment_info(service)
-    pods = get_pod_info(service)
-    events = get_events(service)
-    memory_metrics = get_memory_metrics(service)
-    cpu_metrics = get_cpu_metrics(service)
-
-    checks = {
-        "availability": check_availability(deployment),
-        "stability": check_stability(pods, events),
-        "memory_usage": check_memory_usage(memory_metrics, deployment),
-        "memory_trend": check_memory_trend(service),
-        "cpu_usage": check_cpu_usage(cpu_metrics, deployment),
-        "error_rate": check_error_rate(),
-        "latency": check_latency(),
-        "scaling": check_scaling(deployment, memory_metrics, cpu_metrics),
-    }
-
-    status = determine_overall_status(checks)
+    with span("check.service", service=service):
+        return _check_service(service, snapshot, bulk_metrics)
+
+
+def _check_service(service: str, snapshot: Optional[Dict], bulk_metrics: Optional[Dict[str, Dict]]) -> Dict:
+    """Run the 8 checks for one service (inside its check.service span)"""
+    deployment = get_deployment_info(service, snapshot)
+    pods = get_pod_info(service, snapshot)
+    events = get_events(service, snapshot)
+    if bulk_metrics and service in bulk_metrics:
+        memory_metrics = bulk_metrics[service]["memory"]
+        cpu_metrics = bulk_metrics[service]["cpu"]
+        memory_growth = bulk_metrics[service]["memory_growth_pct"]
+    else:
+        memory_metrics = get_memory_metrics(service)
+        cpu_metrics = get_cpu_metrics(service)
+        memory_growth = get_memory_growth(service)
+
+    with span("analysis.checks"):
+        checks = {
+            "availability": check_availability(deployment),
+            "stability": check_stability(pods, events),
+            "memory_usage": check_memory_usage(memory_metrics, deployment),
+            "memory_trend": check_memory_trend(memory_growth),
+            "cpu_usage": check_cpu_usage(cpu_metrics, deployment),
+            "error_rate": check_error_rate(),
+            "latency": check_latency(),
+            "scaling": check_scaling(deployment, memory_metrics, cpu_metrics),
+        }
+
+        status = determine_overall_status(checks)
 
     # Build notes
     notes = []
@@ -534,6 +785,100 @@ def check_service(service: str) -> Dict:
     }
 
 
+def build_incomplete_result(service: str, reason: str) -> Dict:
+    """Build placeholder result for a service whose check did not finish"""
+    checks = {
+        "availability": "⚪",
+        "stability": "⚪",
+        "memory_usage": "⚪",
+        "memory_trend": "⚪",
+        "cpu_usage": "⚪",
+        "error_rate": "⚪",
+        "latency": "⚪",
+        "scaling": "⚪",
+    }
+
+    return {
+        "service": service,
+        "namespace": NAMESPACE,
+        "status": determine_overall_status(checks),
+        "checks": checks,
+        "notes": [reason],
+        "deployment": {},
+        "pods": [],
+        "memory_metrics": {},
+        "cpu_metrics": {},
+    }
+
+
+@timed("check.services")
+def check_services(services: List[str], snapshot: Optional[Dict] = None,
+                   bulk_metrics: Optional[Dict[str, Dict]] = None,
+                   workers: int = CHECK_WORKERS,
+                   deadline: int = SERVICE_DEADLINE_SECONDS) -> List[Dict]:
+    """
+    Check services concurrently with a per-service deadline
+
+    Results are returned in the same order as `services` regardless of
+    completion order. A service that exceeds its deadline (measured from the
+    moment its check starts) or raises is reported with ⚪ checks. Workers are
+    daemon threads so a stuck check never delays process exit. A replacement
+    worker keeps the remaining services moving, while REQUEST_SLOTS keeps the
+    requests in flight (the stuck check's included) at CHECK_WORKERS. Each
+    check runs in a copy of the caller's context, so its check.service span
+    is nested under check.services in the run profile.
+    """
+    context = contextvars.copy_context()
+    pending_services = queue.Queue()
+    for service in services:
+        pending_services.put(service)
+
+    finished = queue.Queue()
+    started = {}
+
+    def worker():
+        while True:
+            try:
+                service = pending_services.get_nowait()
+            except queue.Empty:
+                return
+
+            started[service] = time.monotonic()
+            try:
+                result = context.copy().run(check_service, service, snapshot, bulk_metrics)
+            except Exception as e:
+                print(f"Check failed for {service}: {e}", file=sys.stderr)
+                result = build_incomplete_result(service, f"Health check failed: {e}")
+            finished.put((service, result))
+
+    def start_worker():
+        threading.Thread(target=worker, name="check-worker", daemon=True).start()
+
+    for _ in range(max(1, min(workers, len(services)))):
+        start_worker()
+
+    results = {}
+    while len(results) < len(services):
+        try:
+            service, result = finished.get(timeout=1)
+            # A late result for a service that already timed out is discarded
+            results.setdefault(service, result)
+        except queue.Empty:
+            pass
+
+        now = time.monotonic()
+        for service, started_at in list(started.items()):
+            if service not in results and now - started_at > deadline:
+                print(f"Check for {service} exceeded {deadline}s deadline", file=sys.stderr)
+                results[service] = build_incomplete_result(service, f"Health check timed out after {deadline}s")
+                # Replace the stuck worker so remaining services keep the configured concurrency
+                if not pending_services.empty():
+                    start_worker()
+
+    return [results[service] for service in services]
+
+
+@timed("report.render")
 def generate_report(results: List[Dict]) -> str:
     """Generate Markdown report"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -671,18 +1016,26 @@ def send_to_slack(webhook_url: str, message: Dict):
         print(f"Failed to send Slack notification: {e}", file=sys.stderr)
 
 
-def main():
+def run_health_check() -> int:
+    """Check all services, save the report and notify Slack; returns the exit code"""
     print(f"Starting Waas2 Tenant Health Check at {datetime.now()}", file=sys.stderr)
     print(f"Namespace: {NAMESPACE}", file=sys.stderr)
     print(f"Time window: {TIME_WINDOW_HOURS} hours", file=sys.stderr)
     print(f"Prometheus: {PROMETHEUS_URL or 'Not configured'}", file=sys.stderr)
     print(f"Services: {len(SERVICES)}", file=sys.stderr)
+    print(f"Workers: {CHECK_WORKERS}, per-service deadline: {SERVICE_DEADLINE_SECONDS}s", file=sys.stderr)
     print("", file=sys.stderr)
 
-    results = []
-    for service in SERVICES:
-        result = check_service(service)
-        results.append(result)
+    snapshot = load_cluster_snapshot()
+    bulk_metrics = load_bulk_metrics(SERVICES) if BULK_METRICS else None
+    results = check_services(SERVICES, snapshot, bulk_metrics)
+    cache_stats = QUERY_CACHE.stats()
+    print(f"Query cache ({cache_stats['mode']}): {cache_stats['hits']} hits, {cache_stats['misses']} misses", file=sys.stderr)
+    memo = QUERY_CACHE.memo.report()
+    print(f"Query memo: {memo['requests']} requests, {memo['executed']} executed, "
+          f"{memo['memo_hits']} served from memo, {memo['coalesced']} coalesced in flight", file=sys.stderr)
+    for entry in memo["queries"]:
+        print(f"  saved {entry['hits'] + entry['coalesced']}x {entry['kind']}: {entry['query'][:120]}", file=sys.stderr)
 
     report = generate_report(results)
     print(report)
@@ -692,19 +1045,43 @@ def main():
 
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
     report_file = f"{report_dir}/health-check-{timestamp}.md"
-    with open(report_file, "w") as f:
+    with span("report.save"), open(report_file, "w") as f:
         f.write(report)
     print(f"\nReport saved to: {report_file}", file=sys.stderr)
 
     webhook_url = os.getenv("SLACK_WEBHOOK_URL")
     if webhook_url:
-        slack_message = generate_slack_message(results)
-        send_to_slack(webhook_url, slack_message)
+        with span("slack.send"):
+            slack_message = generate_slack_message(results)
+            send_to_slack(webhook_url, slack_message)
     else:
         print("SLACK_WEBHOOK_URL not set, skipping Slack notification", file=sys.stderr)
 
     red_count = len([r for r in results if r["status"] == "🔴"])
-    sys.exit(1 if red_count > 0 else 0)
+    return 1 if red_count > 0 else 0
+
+
+def finish_profile(profile: RunProfile, status: str):
+    """Stamp the run profile, print the slowest stages and write RUN_PROFILE_PATH / RUN_PROFILE_TEXTFILE"""
+    profile.finish(status)
+    if not profile.enabled:
+        return
+    print(f"Run profile: {profile.duration:.2f}s, {status}", file=sys.stderr)
+    for line in profile.summary_lines():
+        print(f"  {line}", file=sys.stderr)
+    for path in profile.write():
+        print(f"Run profile written: {path}", file=sys.stderr)
+
+
+def main():
+    profile = RunProfile.from_env("waas2").activate()
+    status = "error"
+    try:
+        exit_code = run_health_check()
+        status = "success"
+    finally:
+        finish_profile(profile, status)
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -11,6 +11,7 @@ Performs 4-item memory checks:
 Generates Markdown inspection report.
 """
 
+import os
 import subprocess
 import sys
 import json
@@ -18,14 +19,19 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
 from prometheus_client import PrometheusClient
+from health_check_common.query_cache import QueryCache
 from report_generator import ReportGenerator
+from health_check_common.run_profile import RunProfile, span, timed
 
 
 # Configuration
 NAMESPACE = "pigo-rel"
 KUBE_CONTEXT = "tp-hkidc-k8s"
 PROMETHEUS_URL = "http://monitoring-prometheus.monitoring.svc.cluster.local:9090"
+# auto: direct HTTP -> kubectl port-forward -> kubectl exec wget
+PROMETHEUS_TRANSPORT = os.getenv("PROMETHEUS_TRANSPORT", "auto")
 TIME_WINDOW_HOURS = 24
+REPORT_DIR = os.getenv("REPORT_DIR", "/Users/user/CLAUDE/workflows/WF-20251226-pigo-memory-inspection/data")
 
 # Thresholds
 USAGE_THRESHOLD_ATTENTION = 70.0  # 70%
@@ -40,13 +46,16 @@ class MemoryInspector:
     def __init__(self):
         self.namespace = NAMESPACE
         self.context = KUBE_CONTEXT
-        self.prom_client = PrometheusClient(PROMETHEUS_URL, NAMESPACE, KUBE_CONTEXT)
+        # Query cache: QUERY_CACHE_MODE=on/off/refresh, QUERY_CACHE_PATH, QUERY_CACHE_MAX_MB
+        self.prom_client = PrometheusClient(PROMETHEUS_URL, NAMESPACE, KUBE_CONTEXT, PROMETHEUS_TRANSPORT,
+                                            cache=QueryCache.from_env())
         self.report_gen = ReportGenerator(NAMESPACE)
 
     def run_kubectl(self, args: List[str]) -> str:
         """Execute kubectl command and return output"""
         cmd = ["kubectl"] + args + ["--context", self.context]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        with span(f"kubectl.{args[0]}", args=" ".join(args)):
+            result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode != 0:
             raise Exception(f"kubectl failed: {result.stderr}")
         return result.stdout.strip()
@@ -66,20 +75,66 @@ class MemoryInspector:
         print(f"發現 {len(deployments)} 個 deployment: {', '.join(deployments)}")
         return deployments
 
-    def get_deployment_pods(self, deployment: str) -> List[str]:
-        """Get pod names for a deployment"""
+    def discover_pods(self) -> Dict[str, List[str]]:
+        """List all pods in the namespace once and group them by app label"""
         output = self.run_kubectl([
             "get", "pods",
             "-n", self.namespace,
-            "-l", f"app={deployment}",
-            "-o", "jsonpath={.items[*].metadata.name}"
+            "-o", "json"
         ])
 
         if not output:
-            return []
+            return {}
+
+        pods_by_app = {}
+        for item in json.loads(output).get('items', []):
+            metadata = item.get('metadata', {})
+            app = metadata.get('labels', {}).get('app', '')
+            if app:
+                pods_by_app.setdefault(app, []).append(metadata.get('name', ''))
 
-        return output.split()
+        return pods_by_app
+
+    @timed('collect')
+    def collect_namespace_metrics(self, deployments: List[str]) -> Dict:
+        """
+        Fetch every memory metric once for the whole namespace
+
+        Returns:
+            Index with 'pods' (pod name -> metric values) and
+            'deployments' (deployment name -> pod names)
+        """
+        pod_pattern = '.*'
+        collectors = [
+            ('usage', '記憶體使用', lambda: self.prom_client.get_memory_usage(pod_pattern)),
+            ('limit', '記憶體限制', lambda: self.prom_client.get_memory_limits(pod_pattern)),
+            ('request', '記憶體請求', lambda: self.prom_client.get_memory_requests(pod_pattern)),
+            # Quarter averages are computed server-side; no raw 24h series is transferred
+            ('trend', '記憶體趨勢', lambda: self.prom_client.get_memory_growth(pod_pattern, TIME_WINDOW_HOURS)),
+            ('jvm', 'JVM Heap', lambda: self.prom_client.get_jvm_heap_usage(pod_pattern)),
+        ]
+
+        pods_by_app = self.discover_pods()
+        index = {
+            'pods': {},
+            'deployments': {d: pods_by_app.get(d, []) for d in deployments},
+        }
 
+        for metric, label, collect in collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                if metric != 'jvm':  # JVM metrics optional
+                    print(f"查詢{label}失敗: {e}")
+                continue
+
+            for pod, value in values.items():
+                index['pods'].setdefault(pod, {})[metric] = value
+
+        print(f"已收集 {len(index['pods'])} 個 Pod 的記憶體指標 ({len(collectors)} 次查詢)")
+        return index
+
+    @timed('analysis.usage')
     def analyze_memory_usage(self, usage_bytes: float, limit_bytes: float) -> Tuple[str, str]:
         """
         Analyze memory usage rate
@@ -103,6 +158,9 @@ class MemoryInspector:
         """
         Analyze 24h memory growth rate using quarter-based comparison
 
+        Client-side counterpart of get_memory_growth() for series from
+        get_memory_trend(); collect_namespace_metrics() does not use it.
+
         Args:
             values: List of (timestamp, bytes) tuples
 
@@ -122,6 +180,15 @@ class MemoryInspector:
         first_avg = sum(v[1] for v in first_quarter) / len(first_quarter)
         last_avg = sum(v[1] for v in last_quarter) / len(last_quarter)
 
+        return self.analyze_memory_growth(first_avg, last_avg)
+
+    def analyze_memory_growth(self, first_avg: float, last_avg: float) -> Tuple[float, str]:
+        """
+        Classify growth between first-quarter and last-quarter average memory
+
+        Returns:
+            (growth_pct, status_emoji)
+        """
         if first_avg == 0:
             return (0.0, '⚪')
 
@@ -134,6 +201,7 @@ class MemoryInspector:
         else:
             return (growth_pct, '🟢')
 
+    @timed('analysis.config')
     def analyze_config_sanity(self, usage_bytes: float, request_bytes: float,
                               limit_bytes: float) -> Tuple[str, str, str]:
         """
@@ -172,10 +240,76 @@ class MemoryInspector:
 
         return ('🟢', '配置合理', '')
 
-    def check_deployment_memory(self, deployment: str) -> Dict:
+    @timed('analysis.replicas')
+    def aggregate_replicas(self, pods: List[str], pod_index: Dict[str, Dict]) -> Dict:
+        """
+        Evaluate all replicas of a deployment in one pass
+
+        Args:
+            pods: Pod names of the deployment
+            pod_index: Pod name -> metric values (from collect_namespace_metrics)
+
+        Returns:
+            Dict with 'replicas' (per-pod rows), 'worst' (highest usage/limit
+            ratio, or highest usage when no limit is set), 'fastest_growth'
+            (replica with the largest 24h growth among those with trend data,
+            None if there are none) and
+            'summary' (replica_count, usage_pct_max/p95/spread)
+        """
+        rows = []
+        for pod in pods:
+            metrics = pod_index.get(pod, {})
+            usage = metrics.get('usage', 0)
+            limit = metrics.get('limit', 0)
+            row = {
+                'pod_name': pod,
+                'usage_bytes': usage,
+                'limit_bytes': limit,
+                'request_bytes': metrics.get('request', 0),
+                'usage_pct': (usage / limit) * 100 if limit > 0 else 0,
+                'jvm_heap_used': metrics.get('jvm', {}).get('heap_used', 0),
+                'growth_pct': None,
+                'trend_status': '⚪',
+            }
+            if 'trend' in metrics:
+                row['growth_pct'], row['trend_status'] = self.analyze_memory_growth(*metrics['trend'])
+            rows.append(row)
+
+        ratios = sorted(r['usage_pct'] for r in rows if r['limit_bytes'] > 0)
+        worst = max(rows, key=lambda r: (r['usage_pct'], r['usage_bytes']))
+        # ⚪ rows (no trend data, or a zero first-quarter average) report 0.0 growth; never pick them
+        growing = [r for r in rows if r['growth_pct'] is not None and r['trend_status'] != '⚪']
+
+        return {
+            'replicas': rows,
+            'worst': worst,
+            'fastest_growth': max(growing, key=lambda r: r['growth_pct']) if growing else None,
+            'summary': {
+                'replica_count': len(rows),
+                'usage_pct_max': ratios[-1] if ratios else 0,
+                'usage_pct_p95': self._percentile(ratios, 95),
+                'usage_pct_spread': (ratios[-1] - ratios[0]) if ratios else 0,
+            },
+        }
+
+    def _percentile(self, sorted_values: List[float], pct: float) -> float:
+        """Linear-interpolated percentile of an already sorted list"""
+        if not sorted_values:
+            return 0
+        rank = (len(sorted_values) - 1) * pct / 100
+        lower = int(rank)
+        upper = min(lower + 1, len(sorted_values) - 1)
+        return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+    @timed('analysis.deployment')
+    def check_deployment_memory(self, deployment: str, index: Dict) -> Dict:
         """
         Perform 4-item memory check for a deployment
 
+        Args:
+            deployment: Deployment name
+            index: Namespace metrics index from collect_namespace_metrics()
+
         Returns:
             Dict with check results
         """
@@ -196,50 +330,37 @@ class MemoryInspector:
             'config_message': '',
             'config_suggestion': '',
             'jvm_heap_used': 0,
+            'replica_count': 0,
+            'usage_pct_max': 0,
+            'usage_pct_p95': 0,
+            'usage_pct_spread': 0,
+            'growth_pod_name': '',
             'overall_status': '⚪'
         }
 
         # Get pods for this deployment
-        pods = self.get_deployment_pods(deployment)
+        pods = index['deployments'].get(deployment, [])
         if not pods:
             print(f"  未找到 {deployment} 的 Pod")
             return result
 
-        # Use first pod as representative (or aggregate)
-        pod = pods[0]
-        result['pod_name'] = pod
-        pod_pattern = pod.replace(pod.split('-')[-1], '.*')  # Convert pod-xxx to pod-.*
-
-        # 1. Get current memory usage
-        try:
-            usage_map = self.prom_client.get_memory_usage(pod_pattern)
-            if pod in usage_map:
-                result['usage_bytes'] = usage_map[pod]
-                print(f"  當前使用: {self._format_memory(result['usage_bytes'])}")
-        except Exception as e:
-            print(f"  查詢記憶體使用失敗: {e}")
-
-        # 2. Get memory limit
-        try:
-            limit_map = self.prom_client.get_memory_limits(pod_pattern)
-            if pod in limit_map:
-                result['limit_bytes'] = limit_map[pod]
-                print(f"  記憶體限制: {self._format_memory(result['limit_bytes'])}")
-        except Exception as e:
-            print(f"  查詢記憶體限制失敗: {e}")
-
-        # 3. Get memory request
-        try:
-            request_map = self.prom_client.get_memory_requests(pod_pattern)
-            if pod in request_map:
-                result['request_bytes'] = request_map[pod]
-                print(f"  記憶體請求: {self._format_memory(result['request_bytes'])}")
-        except Exception as e:
-            print(f"  查詢記憶體請求失敗: {e}")
-
-        # Calculate usage percentage
-        if result['limit_bytes'] > 0:
-            result['usage_pct'] = (result['usage_bytes'] / result['limit_bytes']) * 100
+        # Evaluate every replica in one pass; the worst pod drives the status
+        replicas = self.aggregate_replicas(pods, index['pods'])
+        result.update(replicas['summary'])
+        worst = replicas['worst']
+        result['pod_name'] = worst['pod_name']
+        result['usage_bytes'] = worst['usage_bytes']
+        result['limit_bytes'] = worst['limit_bytes']
+        result['request_bytes'] = worst['request_bytes']
+        result['usage_pct'] = worst['usage_pct']
+
+        print(f"  副本數: {len(pods)}, 最差 Pod: {worst['pod_name']}")
+        print(f"  當前使用: {self._format_memory(result['usage_bytes'])}")
+        print(f"  記憶體限制: {self._format_memory(result['limit_bytes'])}")
+        print(f"  記憶體請求: {self._format_memory(result['request_bytes'])}")
+        if len(pods) > 1:
+            print(f"  副本使用率: max {result['usage_pct_max']:.1f}% / "
+                  f"p95 {result['usage_pct_p95']:.1f}% / 差距 {result['usage_pct_spread']:.1f}pp")
 
         # 4. Analyze usage rate
         status, message = self.analyze_memory_usage(result['usage_bytes'], result['limit_bytes'])
@@ -247,17 +368,13 @@ class MemoryInspector:
         result['usage_message'] = message
         print(f"  使用率分析: {status} {message}")
 
-        # 5. Get memory trend (24h)
-        try:
-            trend_map = self.prom_client.get_memory_trend(pod_pattern, TIME_WINDOW_HOURS)
-            if pod in trend_map:
-                values = trend_map[pod]
-                growth, trend_status = self.analyze_memory_trend(values)
-                result['growth_pct'] = growth
-                result['trend_status'] = trend_status
-                print(f"  趨勢分析 (24h): {trend_status} 成長 {growth:+.1f}%")
-        except Exception as e:
-            print(f"  查詢記憶體趨勢失敗: {e}")
+        # 5. Memory trend (24h) - fastest-growing replica
+        trend = replicas['fastest_growth']
+        if trend:
+            result['growth_pct'] = trend['growth_pct']
+            result['trend_status'] = trend['trend_status']
+            result['growth_pod_name'] = trend['pod_name']
+            print(f"  趨勢分析 (24h): {trend['trend_status']} 成長 {trend['growth_pct']:+.1f}% ({trend['pod_name']})")
 
         # 6. Analyze config sanity
         config_status, config_msg, suggestion = self.analyze_config_sanity(
@@ -269,13 +386,9 @@ class MemoryInspector:
         print(f"  配置分析: {config_status} {config_msg}")
 
         # 7. Get JVM metrics (if available)
-        try:
-            jvm_map = self.prom_client.get_jvm_heap_usage(pod_pattern)
-            if pod in jvm_map and 'heap_used' in jvm_map[pod]:
-                result['jvm_heap_used'] = jvm_map[pod]['heap_used']
-                print(f"  JVM Heap: {self._format_memory(result['jvm_heap_used'])}")
-        except Exception:
-            pass  # JVM metrics optional
+        if worst['jvm_heap_used']:
+            result['jvm_heap_used'] = worst['jvm_heap_used']
+            print(f"  JVM Heap: {self._format_memory(result['jvm_heap_used'])}")
 
         # 8. Determine overall status
         statuses = [result['usage_status'], result['trend_status'], result['config_status']]
@@ -301,9 +414,11 @@ class MemoryInspector:
             print("未發現任何 deployment")
             return []
 
+        index = self.collect_namespace_metrics(deployments)
+
         results = []
         for deployment in deployments:
-            result = self.check_deployment_memory(deployment)
+            result = self.check_deployment_memory(deployment, index)
             results.append(result)
 
         print("\n" + "=" * 80)
@@ -315,9 +430,10 @@ class MemoryInspector:
         """Generate and save Markdown report"""
         print(f"\n生成報告: {output_file}")
 
-        report_content = self.report_gen.generate_full_report(results, PROMETHEUS_URL)
+        with span('report.render'):
+            report_content = self.report_gen.generate_full_report(results, PROMETHEUS_URL)
 
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with span('report.save'), open(output_file, 'w', encoding='utf-8') as f:
             f.write(report_content)
 
         print(f"✅ 報告已保存: {output_file}")
@@ -341,12 +457,27 @@ class MemoryInspector:
             return f"{value:.0f} {units[unit_idx]}"
 
 
+def finish_profile(profile: RunProfile, status: str):
+    """Stamp the run profile, print the slowest stages and write RUN_PROFILE_PATH / RUN_PROFILE_TEXTFILE"""
+    profile.finish(status)
+    if not profile.enabled:
+        return
+    print(f"執行剖析: {profile.duration:.2f}s ({status})")
+    for line in profile.summary_lines():
+        print(f"  {line}")
+    for path in profile.write():
+        print(f"執行剖析已寫入: {path}")
+
+
 def main():
     """Main entry point"""
     print("PIGO Memory Inspection Script v1.0")
     print("=" * 80)
 
-    inspector = MemoryInspector()
+    profile = RunProfile.from_env('pigo').activate()
+    status = 'error'
+    with span('clients.init'):
+        inspector = MemoryInspector()
 
     try:
         # Run inspection
@@ -358,7 +489,7 @@ def main():
 
         # Generate report
         timestamp = datetime.now().strftime("%Y%m%d")
-        output_file = f"/Users/user/CLAUDE/workflows/WF-20251226-pigo-memory-inspection/data/pigo-rel-memory-inspection-{timestamp}.md"
+        output_file = os.path.join(REPORT_DIR, f"pigo-rel-memory-inspection-{timestamp}.md")
 
         inspector.generate_report(results, output_file)
 
@@ -372,8 +503,16 @@ def main():
         print(f"  🔴 高風險: {risk_count}")
         print(f"  🟡 需關注: {attention_count}")
         print(f"  🟢 健康: {healthy_count}")
+        cache_stats = inspector.prom_client.cache.stats()
+        print(f"  查詢快取: {cache_stats['hits']} 命中 / {cache_stats['misses']} 未命中 ({cache_stats['mode']})")
+        memo = inspector.prom_client.cache.memo.report()
+        print(f"  查詢去重: {memo['requests']} 次請求 / {memo['executed']} 次實際查詢 "
+              f"({memo['memo_hits']} 次由本輪結果提供, {memo['coalesced']} 次合併進行中的請求)")
+        for entry in memo['queries']:
+            print(f"    省下 {entry['hits'] + entry['coalesced']} 次 {entry['kind']}: {entry['query'][:100]}")
         print("=" * 80)
 
+        status = 'success'
         sys.exit(0)
 
     except Exception as e:
@@ -382,6 +521,10 @@ def main():
         traceback.print_exc()
         sys.exit(1)
 
+    finally:
+        inspector.prom_client.close()
+        finish_profile(profile, status)
+
 
 if __name__ == "__main__":
     main()
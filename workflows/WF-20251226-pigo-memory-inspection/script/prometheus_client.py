@@ -1,20 +1,165 @@
 #!/usr/bin/env python3
 """
 Prometheus Client Module
-Handles Prometheus API queries via kubectl exec from within cluster
+Handles Prometheus API queries via direct HTTP, a kubectl port-forward tunnel,
+or kubectl exec (fallback) from within cluster
 """
 
+import atexit
+import http.client
+import queue
+import re
+import select
 import subprocess
-import json
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+from health_check_common.prom_stream import decode_response
+from health_check_common.query_cache import QueryCache
+from health_check_common.run_profile import span
+
+
+class HttpTransport:
+    """Direct HTTP access to Prometheus with a keep-alive connection pool"""
+
+    def __init__(self, base_url: str, pool_size: int = 4, timeout: int = 60):
+        parsed = urlparse(base_url)
+        self.name = 'http'
+        self.base_url = base_url.rstrip('/')
+        self.scheme = parsed.scheme or 'http'
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def get(self, path: str) -> Dict:
+        """GET path (e.g. /api/v1/query?...) and return the streamed, decoded JSON body"""
+        for attempt in range(2):
+            try:
+                conn = self.pool.get_nowait()
+            except queue.Empty:
+                conn = self._new_connection()
+
+            try:
+                conn.request('GET', self.base_path + path, headers={'Connection': 'keep-alive'})
+                response = conn.getresponse()
+                if response.status >= 400 and 'json' not in (response.getheader('Content-Type') or ''):
+                    body = response.read().decode('utf-8', 'replace')
+                    conn.close()
+                    raise Exception(f"Prometheus HTTP {response.status}: {body[:200]}")
+                data = decode_response(response)
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                # A pooled keep-alive connection may have been closed by the server; retry once
+                if attempt == 0:
+                    continue
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                try:
+                    self.pool.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+
+            return data
+
+        raise Exception("Prometheus request failed")
+
+    def set_timeout(self, timeout: int):
+        """Change the socket timeout for new and already pooled keep-alive connections"""
+        self.timeout = timeout
+        with self.pool.mutex:
+            for conn in self.pool.queue:
+                conn.timeout = timeout
+                if conn.sock:
+                    conn.sock.settimeout(timeout)
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PortForwardTransport(HttpTransport):
+    """HTTP access through one `kubectl port-forward` tunnel reused for the whole run"""
+
+    FORWARD_PATTERN = re.compile(r'Forwarding from 127\.0\.0\.1:(\d+)')
+
+    def __init__(self, prometheus_url: str, context: str, pool_size: int = 4,
+                 timeout: int = 60, startup_timeout: int = 15):
+        # monitoring-prometheus.monitoring.svc.cluster.local:9090 -> svc/monitoring-prometheus -n monitoring
+        parsed = urlparse(prometheus_url)
+        host_parts = (parsed.hostname or '').split('.')
+        if len(host_parts) < 2:
+            raise Exception(f"Cannot derive service/namespace from {prometheus_url}")
+        service, service_namespace = host_parts[0], host_parts[1]
+        remote_port = parsed.port or 80
 
-
-class PrometheusClient:
-    """Client for querying Prometheus from within Kubernetes cluster"""
+        cmd = [
+            "kubectl", "port-forward",
+            "-n", service_namespace,
+            "--context", context,
+            f"svc/{service}", f":{remote_port}"
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        atexit.register(self.close)
+
+        local_port = self._wait_for_port(startup_timeout)
+        # kubectl logs "Handling connection for ..." per connection; keep reading so the pipes never fill
+        for stream in (self.process.stdout, self.process.stderr):
+            threading.Thread(target=self._drain, args=(stream,), name='port-forward-drain', daemon=True).start()
+        super().__init__(f"http://127.0.0.1:{local_port}{parsed.path}", pool_size, timeout)
+        self.name = 'port-forward'
+
+    def _wait_for_port(self, startup_timeout: int) -> int:
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise Exception(f"kubectl port-forward exited: {self.process.stderr.read().strip()}")
+            ready, _, _ = select.select([self.process.stdout], [], [], 0.5)
+            if ready:
+                match = self.FORWARD_PATTERN.search(self.process.stdout.readline())
+                if match:
+                    return int(match.group(1))
+
+        self.close()
+        raise Exception("kubectl port-forward did not become ready")
+
+    @staticmethod
+    def _drain(stream):
+        for _ in stream:
+            pass
+
+    def close(self):
+        if hasattr(self, 'pool'):
+            super().close()
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class ExecTransport:
+    """Fallback access via `kubectl exec <pod> -- wget` (one exec per query)"""
 
     def __init__(self, prometheus_url: str, namespace: str, context: str):
-        self.prometheus_url = prometheus_url
+        self.name = 'exec'
+        self.prometheus_url = prometheus_url.rstrip('/')
         self.namespace = namespace
         self.context = context
         self.query_pod = None
@@ -37,18 +182,115 @@ class PrometheusClient:
         self.query_pod = result.stdout.strip()
         return self.query_pod
 
-    def _exec_wget(self, url: str) -> str:
-        """Execute wget from pod to access Prometheus"""
+    def get(self, path: str) -> Dict:
+        """Execute wget from pod to access Prometheus, decoding stdout as it streams"""
         pod = self._find_query_pod()
         cmd = [
             "kubectl", "exec", "-n", self.namespace,
             pod, "--context", self.context,
-            "--", "wget", "-qO-", url
+            "--", "wget", "-qO-", self.prometheus_url + path
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"Prometheus query failed: {result.stderr}")
-        return result.stdout
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            data = decode_response(process.stdout)
+        except ValueError:
+            data = None
+        finally:
+            process.stdout.close()
+        # stderr only carries short wget/kubectl messages
+        stderr = process.stderr.read().decode('utf-8', 'replace')
+        if process.wait() != 0 or data is None:
+            raise Exception(f"Prometheus query failed: {stderr}")
+        return data
+
+    def close(self):
+        pass
+
+
+class PrometheusClient:
+    """Client for querying Prometheus from within Kubernetes cluster"""
+
+    TRANSPORT_ORDER = ('http', 'port-forward', 'exec')
+    # Candidate range query resolutions in seconds (15s .. 1d)
+    STEP_CHOICES = (15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400)
+
+    def __init__(self, prometheus_url: str, namespace: str, context: str, transport: str = 'auto',
+                 cache: Optional[QueryCache] = None):
+        """
+        Args:
+            prometheus_url: In-cluster Prometheus URL
+            namespace: Namespace being inspected (also hosts the exec fallback pod)
+            context: kubectl context
+            transport: 'auto' (try http, then port-forward, then exec), or one of
+                       'http', 'port-forward', 'exec'
+            cache: Optional persistent query cache (see health_check_common.query_cache)
+        """
+        self.prometheus_url = prometheus_url
+        self.namespace = namespace
+        self.context = context
+        self.transport_mode = transport
+        self.transport = None
+        self.cache = cache
+        # In-cluster URLs repeat across clusters, so the cache key includes the context
+        self.cache_source = f"{context}/{prometheus_url}"
+
+    def _create_transport(self, name: str):
+        if name == 'http':
+            return HttpTransport(self.prometheus_url)
+        if name == 'port-forward':
+            return PortForwardTransport(self.prometheus_url, self.context)
+        if name == 'exec':
+            return ExecTransport(self.prometheus_url, self.namespace, self.context)
+        raise ValueError(f"Unknown Prometheus transport: {name}")
+
+    def _get_transport(self):
+        """Transport selected on first use"""
+        if self.transport:
+            return self.transport
+
+        with span('prometheus.connect', transport=self.transport_mode):
+            self.transport = self._select_transport()
+        return self.transport
+
+    def _select_transport(self):
+        """Create the configured transport; 'auto' probes candidates in order"""
+        if self.transport_mode != 'auto':
+            return self._create_transport(self.transport_mode)
+
+        probe_path = '/api/v1/query?' + urlencode({'query': 'vector(1)'})
+        for name in self.TRANSPORT_ORDER:
+            candidate = None
+            try:
+                candidate = self._create_transport(name)
+                if name == 'http':
+                    # Fail fast when the in-cluster DNS name is not reachable from here
+                    candidate.set_timeout(5)
+                candidate.get(probe_path)
+                if name != 'exec':
+                    # Also applies to the probe's pooled connection, which the first real query reuses
+                    candidate.set_timeout(60)
+                print(f"Prometheus transport: {name}")
+                return candidate
+            except Exception as e:
+                print(f"Prometheus transport {name} unavailable: {e}")
+                if candidate:
+                    candidate.close()
+
+        raise Exception("No Prometheus transport available")
+
+    def _get(self, endpoint: str, params: Dict) -> Dict:
+        """Query API endpoint through the selected transport and return parsed JSON"""
+        transport = self._get_transport()
+        with span(f"prometheus.{endpoint}", query=params.get('query', '')) as attrs:
+            data = transport.get(f"/api/v1/{endpoint}?{urlencode(params)}")
+            attrs['series'] = len(data.get('data', {}).get('result', []))
+        return data
+
+    def close(self):
+        """Release transport resources (connections, port-forward process)"""
+        if self.transport:
+            self.transport.close()
+            self.transport = None
 
     def query_instant(self, query: str, time: Optional[datetime] = None) -> Dict:
         """
@@ -61,21 +303,28 @@ class PrometheusClient:
         Returns:
             Prometheus API response data
         """
-        params = f"query={query}"
-        if time:
-            timestamp = int(time.timestamp())
-            params += f"&time={timestamp}"
+        def fetch(at: Optional[float]) -> List[Dict]:
+            params = {'query': query}
+            if at is not None:
+                params['time'] = int(at)
 
-        url = f"{self.prometheus_url}/api/v1/query?{params}"
-        response = self._exec_wget(url)
-        data = json.loads(response)
+            data = self._get('query', params)
 
-        if data.get('status') != 'success':
-            raise Exception(f"Prometheus query failed: {data.get('error', 'unknown error')}")
+            if data.get('status') != 'success':
+                raise Exception(f"Prometheus query failed: {data.get('error', 'unknown error')}")
 
-        return data.get('data', {})
+            return data.get('data', {}).get('result', [])
 
-    def query_range(self, query: str, start: datetime, end: datetime, step: str = "5m") -> Dict:
+        at = time.timestamp() if time else None
+        if self.cache:
+            result = self.cache.query(self.cache_source, query, fetch, at)
+        else:
+            result = fetch(at)
+
+        return {'resultType': 'vector', 'result': result}
+
+    def query_range(self, query: str, start: datetime, end: datetime, step: str = "5m",
+                    incremental: bool = False) -> Dict:
         """
         Execute range Prometheus query
 
@@ -84,26 +333,45 @@ class PrometheusClient:
             start: Start time
             end: End time
             step: Query resolution (e.g., "5m", "1h")
+            incremental: Serve from the cache's series store and only fetch the delta since the last run
 
         Returns:
             Prometheus API response data
         """
-        start_ts = int(start.timestamp())
-        end_ts = int(end.timestamp())
-
         # Convert step string to seconds
         step_seconds = self._parse_step(step)
 
-        url = (f"{self.prometheus_url}/api/v1/query_range?"
-               f"query={query}&start={start_ts}&end={end_ts}&step={step_seconds}")
-
-        response = self._exec_wget(url)
-        data = json.loads(response)
+        def fetch(range_start: float, range_end: float) -> List[Dict]:
+            data = self._get('query_range', {
+                'query': query,
+                'start': int(range_start),
+                'end': int(range_end),
+                'step': step_seconds,
+            })
+
+            if data.get('status') != 'success':
+                raise Exception(f"Prometheus range query failed: {data.get('error', 'unknown error')}")
+
+            return data.get('data', {}).get('result', [])
+
+        if self.cache and incremental:
+            result = self.cache.query_range_incremental(
+                self.cache_source, query, start.timestamp(), end.timestamp(), step_seconds, fetch
+            )
+        elif self.cache:
+            result = self.cache.query_range(
+                self.cache_source, query, start.timestamp(), end.timestamp(), step_seconds, fetch
+            )
+        else:
+            result = fetch(start.timestamp(), end.timestamp())
 
-        if data.get('status') != 'success':
-            raise Exception(f"Prometheus range query failed: {data.get('error', 'unknown error')}")
+        return {'resultType': 'matrix', 'result': result}
 
-        return data.get('data', {})
+    def adaptive_step(self, hours: float, max_points: int = 288) -> str:
+        """Pick the finest standard step that keeps a series within max_points (24h -> 5m)"""
+        target = hours * 3600 / max_points
+        seconds = next((c for c in self.STEP_CHOICES if c >= target), self.STEP_CHOICES[-1])
+        return f"{seconds}s"
 
     def _parse_step(self, step: str) -> int:
         """Convert step string (5m, 1h) to seconds"""
@@ -207,13 +475,19 @@ class PrometheusClient:
 
         return requests
 
-    def get_memory_trend(self, pod_pattern: str, hours: int = 24) -> Dict[str, List[Tuple[int, float]]]:
+    def get_memory_trend(self, pod_pattern: str, hours: int = 24,
+                         max_points: int = 288) -> Dict[str, List[Tuple[int, float]]]:
         """
         Get memory usage trend for pods over time
 
+        Full range series, for ad-hoc analysis: the inspection run itself
+        uses get_memory_growth() (computed server-side) and does not call
+        this, so runs get no delta fetching from the series store.
+
         Args:
             pod_pattern: Regex pattern for pod names
             hours: Number of hours to look back
+            max_points: Points per series the analysis needs; the step adapts to the window
 
         Returns:
             Dict mapping pod names to list of (timestamp, value) tuples
@@ -227,7 +501,8 @@ class PrometheusClient:
                 f'container!="",'
                 f'container!="POD"}}')
 
-        result = self.query_range(query, start, end, step="5m")
+        # Only the part of the window not fetched by earlier runs is queried
+        result = self.query_range(query, start, end, step=self.adaptive_step(hours, max_points), incremental=True)
 
         trends = {}
         for item in result.get('result', []):
@@ -250,6 +525,43 @@ class PrometheusClient:
 
         return aggregated
 
+    def get_memory_growth(self, pod_pattern: str, hours: int = 24) -> Dict[str, Tuple[float, float]]:
+        """
+        Get first-quarter and last-quarter average memory per pod, computed server-side
+
+        Pushes the quarter averaging into Prometheus (avg_over_time over the
+        first and last quarter of the window) so only two numbers per pod are
+        transferred instead of the whole range series.
+
+        Args:
+            pod_pattern: Regex pattern for pod names
+            hours: Window length in hours
+
+        Returns:
+            Dict mapping pod names to (first_quarter_avg, last_quarter_avg) in bytes;
+            pods without data in both quarters are omitted
+        """
+        quarter_minutes = max(int(hours * 60 / 4), 1)
+        selector = (f'container_memory_working_set_bytes{{'
+                    f'namespace="{self.namespace}",'
+                    f'pod=~"{pod_pattern}",'
+                    f'container!="",'
+                    f'container!="POD"}}')
+
+        first = self.query_instant(
+            f'sum by (pod) (avg_over_time({selector}[{quarter_minutes}m] offset {quarter_minutes * 3}m))')
+        last = self.query_instant(f'sum by (pod) (avg_over_time({selector}[{quarter_minutes}m]))')
+
+        first_avg = {item['metric'].get('pod', ''): float(item['value'][1]) for item in first.get('result', [])}
+
+        growth = {}
+        for item in last.get('result', []):
+            pod = item['metric'].get('pod', '')
+            if pod in first_avg:
+                growth[pod] = (first_avg[pod], float(item['value'][1]))
+
+        return growth
+
     def get_jvm_heap_usage(self, pod_pattern: str) -> Dict[str, Dict[str, float]]:
         """
         Get JVM heap memory metrics (if available)
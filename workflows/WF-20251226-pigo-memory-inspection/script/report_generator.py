@@ -103,7 +103,12 @@ class ReportGenerator:
         detail += f"| 當前使用 | {self._format_memory(result.get('usage_bytes', 0))} |\n"
         detail += f"| 限制 (Limit) | {self._format_memory(result.get('limit_bytes', 0))} |\n"
         detail += f"| 請求 (Request) | {self._format_memory(result.get('request_bytes', 0))} |\n"
-        detail += f"| **使用率** | **{result.get('usage_pct', 0):.1f}%** {result.get('usage_status', '⚪')} |\n\n"
+        detail += f"| **使用率** | **{result.get('usage_pct', 0):.1f}%** {result.get('usage_status', '⚪')} |\n"
+        if result.get('replica_count', 0) > 1:
+            detail += f"| 副本數 | {result['replica_count']} (以上為使用率最高的 Pod) |\n"
+            detail += f"| 副本使用率 P95 | {result.get('usage_pct_p95', 0):.1f}% |\n"
+            detail += f"| 副本使用率差距 | {result.get('usage_pct_spread', 0):.1f}pp |\n"
+        detail += "\n"
 
         usage_status = result.get('usage_status', '⚪')
         if usage_status == '🔴':
@@ -119,6 +124,8 @@ class ReportGenerator:
         trend_status = result.get('trend_status', '⚪')
 
         detail += f"**成長率**: {growth:+.1f}% {trend_status}\n"
+        if result.get('growth_pod_name') and result.get('growth_pod_name') != pod:
+            detail += f"**成長最快的副本**: {result['growth_pod_name']}\n"
 
         if trend_status == '🔴':
             detail += "**狀態**: 🔴 記憶體成長過快，可能存在記憶體洩漏\n\n"